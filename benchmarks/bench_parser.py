@@ -0,0 +1,122 @@
+"""
+bench_parser.py
+
+Measures parse throughput of every installed Parser backend over the saved
+books.toscrape.com fixtures and checks that all backends agree.
+
+Usage:
+    python -m benchmarks.bench_parser [--repeat N] [--json results.json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from typing import Dict, List
+
+from scraper.parser import Parser, available_backends
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixtures(directory: str = FIXTURES_DIR) -> Dict[str, List[str]]:
+    """
+    Load saved pages grouped by kind.
+
+    Args:
+        directory (str): Fixture directory.
+
+    Returns:
+        Dict[str, List[str]]: {"listing": [...], "detail": [...]} HTML documents.
+    """
+    pages = {"listing": [], "detail": []}
+    for kind in pages:
+        for path in sorted(glob.glob(os.path.join(directory, f"{kind}_*.html"))):
+            with open(path, "r", encoding="utf-8") as f:
+                pages[kind].append(f.read())
+    return pages
+
+
+def extract(kind: str, html: str, backend: str, detail_only: bool = False):
+    """
+    Run the extraction the crawler performs for a page kind.
+    """
+    parser = Parser(html, backend=backend, detail_only=detail_only)
+    if kind == "listing":
+        return list(parser.iter_products()), parser.get_next_page_link(), parser.get_category_links()
+    return (parser.get_category_name(), parser.get_title(), parser.get_price(),
+            parser.get_availability(), parser.get_product_info())
+
+
+def bench_backend(backend: str, pages: Dict[str, List[str]], repeat: int) -> Dict[str, float]:
+    """
+    Time a backend over all fixture pages.
+
+    Args:
+        backend (str): Parser backend name.
+        pages (Dict[str, List[str]]): Fixtures from load_fixtures.
+        repeat (int): Number of passes over the fixtures.
+
+    Returns:
+        Dict[str, float]: Pages per second for each page kind, plus
+        detail pages parsed with detail_only=True.
+    """
+    results = {}
+    runs = [(kind, kind, False) for kind in pages] + [("detail_only", "detail", True)]
+    for name, kind, detail_only in runs:
+        documents = pages[kind]
+        if not documents:
+            continue
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for html in documents:
+                extract(kind, html, backend, detail_only)
+        elapsed = time.perf_counter() - start
+        results[f"{name}_pages_per_sec"] = round(repeat * len(documents) / elapsed, 1)
+    return results
+
+
+def check_agreement(pages: Dict[str, List[str]], backends: List[str]) -> List[str]:
+    """
+    Compare every backend's output, full and detail_only, with html.parser.
+
+    Returns:
+        List[str]: Backends whose results differ.
+    """
+    mismatched = []
+    for backend in backends:
+        for kind, documents in pages.items():
+            expected = [extract(kind, html, "html.parser") for html in documents]
+            if ([extract(kind, html, backend) for html in documents] != expected
+                    or kind == "detail" and [extract(kind, html, backend, True) for html in documents] != expected):
+                mismatched.append(backend)
+                break
+    return mismatched
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Parser backends")
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the fixtures")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    pages = load_fixtures()
+    backends = available_backends()
+    mismatched = check_agreement(pages, backends)
+
+    results = {backend: bench_backend(backend, pages, args.repeat) for backend in backends}
+    print(f"{'backend':<12} {'listing/s':>10} {'detail/s':>10} {'partial/s':>10}")
+    for backend, numbers in results.items():
+        flag = "  (results differ!)" if backend in mismatched else ""
+        print(f"{backend:<12} {numbers.get('listing_pages_per_sec', 0):>10} "
+              f"{numbers.get('detail_pages_per_sec', 0):>10} "
+              f"{numbers.get('detail_only_pages_per_sec', 0):>10}{flag}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"repeat": args.repeat, "mismatched": mismatched, "backends": results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+bench_pipeline.py
+
+End-to-end crawl benchmark against the local stand-in server.
+
+Starts benchmarks.server in a child process and crawls the whole generated
+catalogue with each pipeline: the sequential Crawler ("sync"), the Crawler
+with threaded detail fetches ("threaded") and the AsyncCrawler ("async").
+Each pipeline runs in a fresh process, so its peak RSS and CPU time are its
+own. Reports pages/sec, request latency p50/p99 (from utils.metrics), peak
+RSS and CPU time per page. Results can be saved as JSON and compared with an
+earlier run to spot regressions.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--books N] [--latency S] [--error-rate F]
+        [--pipelines sync,threaded,async] [--json results.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, Optional
+
+from benchmarks.server import ServerProcess, SiteOptions
+from scraper.async_collector import AsyncCollector
+from scraper.async_crawler import AsyncCrawler
+from scraper.collector import Collector
+from scraper.crawler import Crawler
+from scraper.parser import DEFAULT_BACKEND
+from scraper.retry import RetryPolicy
+from utils.metrics import Metrics
+
+PIPELINES = ("sync", "threaded", "async")
+
+# Retries with a short backoff, so injected errors cost round trips rather
+# than sleeping.
+BENCH_RETRY = dict(attempts=5, backoff=0.01, max_backoff=0.1)
+
+
+def crawl_sync(base_url: str, workers: int, metrics: Metrics, parser_backend: str) -> int:
+    collector = Collector(base_url, delay=0, retry=RetryPolicy(**BENCH_RETRY), pool_size=workers,
+                          metrics=metrics)
+    crawler = Crawler(collector, parser_backend=parser_backend, detail_workers=workers, metrics=metrics)
+    return sum(1 for _ in crawler.crawl())
+
+
+async def crawl_async(base_url: str, concurrency: int, metrics: Metrics, parser_backend: str) -> int:
+    async with AsyncCollector(base_url, delay=0, max_in_flight=concurrency, retry=RetryPolicy(**BENCH_RETRY),
+                              metrics=metrics) as collector:
+        crawler = AsyncCrawler(collector, parser_backend=parser_backend, metrics=metrics)
+        return sum([1 async for _ in crawler.crawl()])
+
+
+def run_pipeline(pipeline: str, base_url: str, concurrency: int, parser_backend: str) -> Dict[str, object]:
+    """
+    Crawl the catalogue once with one pipeline; meant to run in a fresh process.
+
+    Args:
+        pipeline (str): "sync", "threaded" or "async".
+        base_url (str): Benchmark server URL.
+        concurrency (int): Threads (threaded) or requests in flight (async).
+        parser_backend (str): Parser backend.
+
+    Returns:
+        Dict[str, object]: Measurements of the run.
+    """
+    metrics = Metrics()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    if pipeline == "async":
+        books = asyncio.run(crawl_async(base_url, concurrency, metrics, parser_backend))
+    else:
+        books = crawl_sync(base_url, concurrency if pipeline == "threaded" else 1, metrics, parser_backend)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    pages = sum(entry["value"] for entry in metrics.to_dict()["counters"].get("http_requests_total", [])
+                if entry["labels"]["status"] == "200")
+    latency = metrics.histogram("http_request_seconds", phase="total")
+    return {
+        "books": books,
+        "pages": pages,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(pages / elapsed, 1),
+        "latency_p50_ms": round(latency.percentile(0.5) * 1000, 2) if latency else None,
+        "latency_p99_ms": round(latency.percentile(0.99) * 1000, 2) if latency else None,
+        "cpu_ms_per_page": round(cpu * 1000 / pages, 3) if pages else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "retries": metrics.counter("http_retries_total"),
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Returns:
+        Optional[float]: Peak resident set size of this process in MiB, or
+        None where the resource module is unavailable (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> list:
+    """
+    Print the change in throughput and CPU per page against a baseline run.
+
+    Args:
+        results (Dict[str, dict]): Current results per pipeline.
+        baseline (Dict[str, dict]): Results of an earlier run.
+        threshold (float): Relative slowdown reported as a regression.
+
+    Returns:
+        list: Pipelines that regressed.
+    """
+    regressed = []
+    for pipeline, numbers in results.items():
+        old = baseline.get(pipeline)
+        if not old:
+            continue
+        speed = numbers["pages_per_sec"] / old["pages_per_sec"] - 1
+        line = f"{pipeline:<10} pages/sec {speed:+.1%}"
+        if numbers.get("cpu_ms_per_page") and old.get("cpu_ms_per_page"):
+            line += f", CPU/page {numbers['cpu_ms_per_page'] / old['cpu_ms_per_page'] - 1:+.1%}"
+        if speed < -threshold:
+            regressed.append(pipeline)
+            line += "  REGRESSION"
+        print(line)
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the crawl pipelines against a local server")
+    parser.add_argument("--books", type=int, default=1000, help="catalogue size (default: 1000)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--pipelines", default=",".join(PIPELINES),
+                        help=f"comma-separated subset of {', '.join(PIPELINES)}")
+    parser.add_argument("--concurrency", type=int, default=10,
+                        help="threads (threaded) or requests in flight (async) (default: 10)")
+    parser.add_argument("--parser", default=DEFAULT_BACKEND, help=f"parser backend (default: {DEFAULT_BACKEND})")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="slowdown reported as a regression by --compare (default: 0.1)")
+    args = parser.parse_args(argv)
+
+    pipelines = [name for name in args.pipelines.split(",") if name]
+    unknown = set(pipelines) - set(PIPELINES)
+    if unknown:
+        parser.error(f"unknown pipelines: {', '.join(sorted(unknown))}")
+    options = SiteOptions(args.books, args.latency, args.jitter, args.error_rate)
+
+    results = {}
+    with ServerProcess(options) as server:
+        for pipeline in pipelines:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                results[pipeline] = pool.submit(run_pipeline, pipeline, server.base_url,
+                                                args.concurrency, args.parser).result()
+
+    print(f"{'pipeline':<10} {'books':>6} {'pages/s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'CPU ms/pg':>10} {'RSS MiB':>8} {'retries':>8}")
+    for pipeline, r in results.items():
+        print(f"{pipeline:<10} {r['books']:>6} {r['pages_per_sec']:>9} {r['latency_p50_ms']:>8} "
+              f"{r['latency_p99_ms']:>8} {r['cpu_ms_per_page']:>10} {r['peak_rss_mb']:>8} {r['retries']:>8g}")
+
+    report = {
+        "config": dict(options._asdict(), concurrency=args.concurrency, parser=args.parser),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("Warning: baseline was run with a different configuration")
+        if compare(results, baseline["results"], args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
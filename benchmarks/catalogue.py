@@ -0,0 +1,384 @@
+"""
+catalogue.py
+
+Generates pages that mirror the markup of books.toscrape.com: the
+paginated "All products" listing, category listings and book detail pages.
+Used to write the saved parser fixtures and by the benchmark server.
+"""
+
+import hashlib
+import os
+import random
+from typing import List, NamedTuple, Optional
+
+PAGE_SIZE = 20
+
+CATEGORIES = [
+    "Travel", "Mystery", "Historical Fiction", "Sequential Art", "Classics",
+    "Philosophy", "Romance", "Womens Fiction", "Fiction", "Childrens",
+    "Religion", "Nonfiction", "Music", "Default", "Science Fiction",
+    "Sports and Games", "Add a comment", "Fantasy", "New Adult", "Young Adult",
+    "Science", "Poetry", "Paranormal", "Art", "Psychology", "Autobiography",
+    "Parenting", "Adult Fiction", "Humor", "Horror", "History",
+    "Food and Drink", "Christian Fiction", "Business", "Biography",
+    "Thriller", "Contemporary", "Spirituality", "Academic", "Self Help",
+    "Historical", "Christian", "Suspense", "Short Stories", "Novels",
+    "Health", "Politics", "Cultural", "Erotica", "Crime",
+]
+
+_WORDS = (
+    "light attic velvet soumission sharp objects sapiens requiem red tide "
+    "dirty little secrets coming woman boys boat black maria starving hearts "
+    "shakespeare sonnets set me free scott pilgrim rip it up start again "
+    "our band could be your life olio mesaerion the rise of the creative class"
+).split()
+
+_RATINGS = ("One", "Two", "Three", "Four", "Five")
+
+
+class CatalogueBook(NamedTuple):
+    """
+    One generated book.
+    """
+    book_id: int
+    title: str
+    slug: str
+    price: str
+    stock: int
+    category: str
+    rating: str
+    upc: str
+
+
+def category_slug(name: str, index: int) -> str:
+    """
+    Return the URL slug books.toscrape.com uses for a category.
+    """
+    return f"{name.lower().replace(' ', '-')}_{index + 2}"
+
+
+def generate_books(count: int = 1000, seed: int = 7) -> List[CatalogueBook]:
+    """
+    Generate a deterministic catalogue.
+
+    Args:
+        count (int): Number of books.
+        seed (int): Random seed.
+
+    Returns:
+        List[CatalogueBook]: Books in listing order.
+    """
+    rng = random.Random(seed)
+    books = []
+    for i in range(count):
+        book_id = count - i
+        title = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(2, 6))).title()
+        slug = f"{title.lower().replace(' ', '-')}_{book_id}"
+        stock = 0 if rng.random() < 0.05 else rng.randint(1, 22)
+        books.append(CatalogueBook(
+            book_id=book_id,
+            title=title,
+            slug=slug,
+            price=f"{rng.uniform(10, 60):.2f}",
+            stock=stock,
+            category=rng.choice(CATEGORIES),
+            rating=rng.choice(_RATINGS),
+            upc=hashlib.md5(slug.encode()).hexdigest()[:16],
+        ))
+    return books
+
+
+def _page_head(title: str, prefix: str) -> str:
+    return f"""<!DOCTYPE html>
+<!--[if lt IE 7]>      <html lang="en-us" class="no-js lt-ie9 lt-ie8 lt-ie7"> <![endif]-->
+<!--[if IE 7]>         <html lang="en-us" class="no-js lt-ie9 lt-ie8"> <![endif]-->
+<!--[if IE 8]>         <html lang="en-us" class="no-js lt-ie9"> <![endif]-->
+<!--[if gt IE 8]><!--> <html lang="en-us" class="no-js"> <!--<![endif]-->
+    <head>
+        <title>
+    {title} | Books to Scrape - Sandbox
+</title>
+        <meta http-equiv="content-type" content="text/html; charset=UTF-8" />
+        <meta name="created" content="24th Jun 2016 09:29" />
+        <meta name="description" content="" />
+        <meta name="viewport" content="width=device-width" />
+        <meta name="robots" content="NOARCHIVE,NOCACHE" />
+        <link rel="shortcut icon" href="{prefix}static/oscar/favicon.ico" />
+        <link rel="stylesheet" type="text/css" href="{prefix}static/oscar/css/styles.css" />
+        <link rel="stylesheet" href="{prefix}static/oscar/js/bootstrap-datetimepicker/bootstrap-datetimepicker.css" />
+        <link rel="stylesheet" type="text/css" href="{prefix}static/oscar/css/datetimepicker.css" />
+    </head>
+    <body id="default" class="default">
+        <header class="header container-fluid">
+            <div class="page_inner">
+                <div class="row">
+                    <div class="col-sm-8 h1"><a href="{prefix}index.html">Books to Scrape</a><small> We love being scraped!</small>
+</div>
+                </div>
+            </div>
+        </header>
+        <div class="container-fluid page">
+            <div class="page_inner">
+"""
+
+
+def _page_foot(prefix: str) -> str:
+    return f"""            </div><!-- /page_inner -->
+        </div><!-- /container-fluid -->
+    <footer class="footer container-fluid">
+    </footer>
+        <!-- jQuery -->
+        <script src="http://ajax.googleapis.com/ajax/libs/jquery/1.9.1/jquery.min.js"></script>
+        <script>window.jQuery || document.write('<script src="{prefix}static/oscar/js/jquery/jquery-1.9.1.min.js"><\\/script>')</script>
+        <script type="text/javascript" src="{prefix}static/oscar/js/bootstrap3/bootstrap.min.js"></script>
+        <script src="{prefix}static/oscar/js/oscar/ui.js" type="text/javascript" charset="utf-8"></script>
+        <script type="text/javascript">
+            $(function() {{
+                oscar.init();
+                oscar.search.init();
+            }});
+        </script>
+    </body>
+</html>
+"""
+
+
+def _stars(rating: str) -> str:
+    stars = "".join("\n                    <i class=\"icon-star\"></i>" for _ in range(5))
+    return f'<p class="star-rating {rating}">{stars}\n                </p>'
+
+
+def _availability(book: CatalogueBook, detail: bool) -> str:
+    if book.stock == 0:
+        return '<p class="outofstock availability">\n    <i class="icon-remove"></i>\n        Out of stock\n</p>'
+    text = f"In stock ({book.stock} available)" if detail else "In stock"
+    return f'<p class="instock availability">\n    <i class="icon-ok"></i>\n        {text}\n</p>'
+
+
+def render_listing(books: List[CatalogueBook], page: int, page_count: int, total: int,
+                   heading: str = "All products", prefix: str = "",
+                   catalogue_prefix: str = "catalogue/", next_href: Optional[str] = None) -> str:
+    """
+    Render one listing page.
+
+    Args:
+        books (List[CatalogueBook]): Books shown on this page.
+        page (int): 1-based page number.
+        page_count (int): Total number of pages.
+        total (int): Total number of results.
+        heading (str): Page heading ("All products" or a category name).
+        prefix (str): Relative prefix from this page to the site root.
+        catalogue_prefix (str): Relative prefix from this page to /catalogue/.
+        next_href (Optional[str]): Href of the "next" link.
+
+    Returns:
+        str: HTML document.
+    """
+    nav = "".join(
+        f"""
+                <li>
+                    <a href="{catalogue_prefix}category/books/{category_slug(name, i)}/index.html">
+                        {name}
+                    </a>
+                </li>"""
+        for i, name in enumerate(CATEGORIES)
+    )
+    items = "".join(
+        f"""
+                                <li class="col-xs-6 col-sm-4 col-md-3 col-lg-3">
+    <article class="product_pod">
+            <div class="image_container">
+                    <a href="{catalogue_prefix}{b.slug}/index.html"><img src="{prefix}media/cache/{b.upc[:2]}/{b.upc[2:4]}/{b.upc}.jpg" alt="{b.title}" class="thumbnail"></a>
+            </div>
+                {_stars(b.rating)}
+            <h3><a href="{catalogue_prefix}{b.slug}/index.html" title="{b.title}">{b.title[:20]}...</a></h3>
+            <div class="product_price">
+        <p class="price_color">£{b.price}</p>
+{_availability(b, detail=False)}
+    <form>
+        <button type="submit" class="btn btn-primary btn-block" data-loading-text="Adding...">Add to basket</button>
+    </form>
+            </div>
+    </article>
+</li>"""
+        for b in books
+    )
+    pager = ""
+    if page_count > 1:
+        next_link = f'\n                                        <li class="next"><a href="{next_href}">next</a></li>' if next_href else ""
+        pager = f"""
+                            <div>
+                                <ul class="pager">
+                                    <li class="current">
+                                        Page {page} of {page_count}
+                                    </li>{next_link}
+                                </ul>
+                            </div>"""
+    first = (page - 1) * PAGE_SIZE + 1
+    return _page_head(heading, prefix) + f"""    <ul class="breadcrumb">
+        <li>
+            <a href="{prefix}index.html">Home</a>
+        </li>
+        <li class="active">{heading}</li>
+    </ul>
+                <div class="row">
+                    <aside class="sidebar col-sm-4 col-md-3">
+                        <div id="promotions_left">
+                        </div>
+    <div class="side_categories">
+        <ul class="nav nav-list">
+                <li>
+                    <a href="{catalogue_prefix}category/books_1/index.html">
+                        Books
+                    </a>
+                    <ul>{nav}
+                    </ul>
+                </li>
+        </ul>
+    </div>
+                    </aside>
+                    <div class="col-sm-8 col-md-9">
+                <div class="page-header action">
+                    <h1>{heading}</h1>
+                </div>
+    <div id="messages">
+    </div>
+                <form method="get" class="form-horizontal">
+                    <div style="display:none">
+                    </div>
+                        <strong>{total}</strong> results - showing <strong>{first}</strong> to <strong>{first + len(books) - 1}</strong>.
+                </form>
+                <section>
+                    <div class="alert alert-warning" role="alert"><strong>Warning!</strong> This is a demo website for web scraping purposes. Prices and ratings here were randomly assigned and have no real meaning.</div>
+                    <div>
+                        <ol class="row">{items}
+                        </ol>{pager}
+                    </div>
+                </section>
+                    </div>
+                </div><!-- /row -->
+""" + _page_foot(prefix)
+
+
+def render_detail(book: CatalogueBook) -> str:
+    """
+    Render a book detail page (served at /catalogue/<slug>/index.html).
+
+    Args:
+        book (CatalogueBook): The book.
+
+    Returns:
+        str: HTML document.
+    """
+    prefix = "../../"
+    cat_index = CATEGORIES.index(book.category)
+    description = " ".join(_WORDS[(book.book_id + i) % len(_WORDS)] for i in range(180)).capitalize()
+    return _page_head(book.title, prefix) + f"""    <ul class="breadcrumb">
+        <li>
+            <a href="../../index.html">Home</a>
+        </li>
+        <li>
+            <a href="../category/books_1/index.html">Books</a>
+        </li>
+        <li>
+            <a href="../category/books/{category_slug(book.category, cat_index)}/index.html">{book.category}</a>
+        </li>
+        <li class="active">{book.title}</li>
+    </ul>
+    <div id="messages">
+    </div>
+    <div class="content">
+        <div id="promotions">
+        </div>
+        <div id="content_inner">
+<article class="product_page"><!-- Start of product page -->
+    <div class="row">
+        <div class="col-sm-6">
+            <div id="product_gallery" class="carousel">
+                <div class="thumbnail">
+                    <div class="carousel-inner">
+                        <div class="item active">
+                            <img src="../../media/cache/{book.upc[:2]}/{book.upc[2:4]}/{book.upc}.jpg" alt="{book.title}" />
+                        </div>
+                    </div>
+                </div>
+            </div>
+        </div>
+        <div class="col-sm-6 product_main">
+            <h1>{book.title}</h1>
+<p class="price_color">£{book.price}</p>
+{_availability(book, detail=True)}
+    {_stars(book.rating)}
+    <hr/>
+    <div class="alert alert-warning" role="alert"><strong>Warning!</strong> This is a demo website for web scraping purposes. Prices and ratings here were randomly assigned and have no real meaning.</div>
+        </div><!-- /col-sm-6 -->
+    </div><!-- /row -->
+    <div id="product_description" class="sub-header">
+        <h2>Product Description</h2>
+    </div>
+    <p>{description}. ...more</p>
+    <div class="sub-header">
+        <h2>Product Information</h2>
+    </div>
+<table class="table table-striped">
+        <tr>
+            <th>UPC</th><td>{book.upc}</td>
+        </tr>
+        <tr>
+            <th>Product Type</th><td>Books</td>
+        </tr>
+        <tr>
+            <th>Price (excl. tax)</th><td>£{book.price}</td>
+        </tr>
+        <tr>
+            <th>Price (incl. tax)</th><td>£{book.price}</td>
+        </tr>
+        <tr>
+            <th>Tax</th><td>£0.00</td>
+        </tr>
+        <tr>
+            <th>Availability</th>
+            <td>{"In stock (%d available)" % book.stock if book.stock else "Out of stock"}</td>
+        </tr>
+        <tr>
+            <th>Number of reviews</th>
+            <td>0</td>
+        </tr>
+</table>
+    <section>
+        <div id="reviews" class="reviews">
+            <form id="add_review_form" method="post" action="./reviews/add/#addreview">
+            </form>
+        </div>
+    </section>
+</article><!-- End of product page -->
+        </div>
+    </div>
+""" + _page_foot(prefix)
+
+
+def write_fixtures(directory: str):
+    """
+    Write the saved parser fixtures: two listing pages and three detail pages.
+
+    Args:
+        directory (str): Output directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    books = generate_books()
+    page_count = (len(books) + PAGE_SIZE - 1) // PAGE_SIZE
+    pages = {
+        "listing_index.html": render_listing(books[:PAGE_SIZE], 1, page_count, len(books),
+                                             next_href="catalogue/page-2.html"),
+        "listing_page_2.html": render_listing(books[PAGE_SIZE:2 * PAGE_SIZE], 2, page_count, len(books),
+                                              prefix="../", catalogue_prefix="", next_href="page-3.html"),
+    }
+    for book in books[:3]:
+        pages[f"detail_{book.book_id}.html"] = render_detail(book)
+    for name, html in pages.items():
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            f.write(html)
+
+
+if __name__ == "__main__":
+    write_fixtures(os.path.join(os.path.dirname(__file__), "fixtures"))
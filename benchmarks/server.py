@@ -0,0 +1,215 @@
+"""
+server.py
+
+Local stand-in for books.toscrape.com serving a generated catalogue.
+
+Pages are rendered by benchmarks.catalogue (and cached after the first
+request) at the same paths as the real site: the paginated listing at
+/index.html and /catalogue/page-N.html, category listings under
+/catalogue/category/books/, and detail pages at /catalogue/<slug>/index.html.
+Every response can be delayed by a fixed latency plus random jitter, and a
+fraction of requests can fail with 503, to benchmark the pipelines under
+realistic network conditions without touching the real site.
+
+Usage:
+    python -m benchmarks.server [--books N] [--latency S] [--error-rate F] [--port P]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+from typing import Dict, List, NamedTuple, Optional
+
+from aiohttp import web
+
+from benchmarks.catalogue import CATEGORIES, PAGE_SIZE, CatalogueBook, category_slug, generate_books
+from benchmarks.catalogue import render_detail, render_listing
+
+
+class SiteOptions(NamedTuple):
+    """
+    Shape of the served catalogue and the injected faults.
+    """
+    books: int = 1000
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 7
+
+
+class CatalogueSite:
+    """
+    Request handler for a generated catalogue.
+
+    Attributes:
+        requests (int): Requests served, including injected errors.
+        errors (int): Injected 503 responses.
+    """
+
+    def __init__(self, options: SiteOptions = SiteOptions()):
+        """
+        Generate the catalogue.
+
+        Args:
+            options (SiteOptions): Catalogue size, latency and error injection.
+        """
+        self.options = options
+        self.books = generate_books(options.books, options.seed)
+        self.page_count = max(1, (len(self.books) + PAGE_SIZE - 1) // PAGE_SIZE)
+        self._by_slug = {book.slug: book for book in self.books}
+        self._by_category: Dict[str, List[CatalogueBook]] = {}
+        for book in self.books:
+            slug = category_slug(book.category, CATEGORIES.index(book.category))
+            self._by_category.setdefault(slug, []).append(book)
+        self._pages: Dict[str, Optional[str]] = {}
+        self._rng = random.Random(options.seed)
+        self.requests = 0
+        self.errors = 0
+
+    def render(self, path: str) -> Optional[str]:
+        """
+        Render the page at a path (relative to the site root).
+
+        Args:
+            path (str): Request path without the leading slash.
+
+        Returns:
+            Optional[str]: HTML, or None if there is no such page.
+        """
+        if path not in self._pages:
+            self._pages[path] = self._render(path)
+        return self._pages[path]
+
+    def _render(self, path: str) -> Optional[str]:
+        parts = path.split("/")
+        if path in ("", "index.html"):
+            return self._listing(self.books, 1, "All products", "", "catalogue/", "catalogue/page-2.html")
+        if len(parts) == 2 and parts[0] == "catalogue" and parts[1].startswith("page-"):
+            page = _page_number(parts[1])
+            return self._listing(self.books, page, "All products", "../", "", f"page-{page + 1}.html")
+        if len(parts) == 3 and parts[0] == "catalogue" and parts[2] == "index.html":
+            book = self._by_slug.get(parts[1])
+            return render_detail(book) if book else None
+        if len(parts) == 5 and parts[:3] == ["catalogue", "category", "books"]:
+            books = self._by_category.get(parts[3])
+            page = 1 if parts[4] == "index.html" else _page_number(parts[4])
+            if books is None or page is None:
+                return None
+            heading = books[0].category
+            return self._listing(books, page, heading, "../../../../", "../../../", f"page-{page + 1}.html")
+        return None
+
+    def _listing(self, books: List[CatalogueBook], page: Optional[int], heading: str, prefix: str,
+                 catalogue_prefix: str, next_href: str) -> Optional[str]:
+        page_count = max(1, (len(books) + PAGE_SIZE - 1) // PAGE_SIZE)
+        if page is None or not 1 <= page <= page_count:
+            return None
+        shown = books[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        return render_listing(shown, page, page_count, len(books), heading=heading, prefix=prefix,
+                              catalogue_prefix=catalogue_prefix,
+                              next_href=next_href if page < page_count else None)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """
+        aiohttp handler: delay, maybe fail, then serve the page.
+        """
+        self.requests += 1
+        delay = self.options.latency + self._rng.uniform(0, self.options.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        path = request.path.lstrip("/")
+        if path == "robots.txt":
+            return web.Response(text="User-agent: *\n")
+        if self._rng.random() < self.options.error_rate:
+            self.errors += 1
+            return web.Response(status=503, text="Service Unavailable")
+        html = self.render(path)
+        if html is None:
+            raise web.HTTPNotFound()
+        return web.Response(text=html, content_type="text/html")
+
+
+def _page_number(name: str) -> Optional[int]:
+    number = name[len("page-"):-len(".html")]
+    return int(number) if name.startswith("page-") and name.endswith(".html") and number.isdigit() else None
+
+
+async def start_server(site: CatalogueSite, host: str = "127.0.0.1", port: int = 0) -> web.AppRunner:
+    """
+    Start serving a site on the running event loop.
+
+    Args:
+        site (CatalogueSite): Site to serve.
+        host (str): Interface to bind.
+        port (int): Port; 0 picks a free one.
+
+    Returns:
+        web.AppRunner: Runner (``runner.addresses[0][1]`` is the port);
+        call ``await runner.cleanup()`` to stop.
+    """
+    app = web.Application()
+    app.router.add_get("/{path:.*}", site.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def _serve_forever(options: SiteOptions, conn):
+    async def main():
+        runner = await start_server(CatalogueSite(options))
+        conn.send(runner.addresses[0][1])
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+class ServerProcess:
+    """
+    Runs a CatalogueSite in a child process, so the server's CPU time and
+    memory are not charged to the benchmarked client.
+    """
+
+    def __init__(self, options: SiteOptions = SiteOptions()):
+        """
+        Args:
+            options (SiteOptions): Catalogue size, latency and error injection.
+        """
+        self.options = options
+        self.base_url = None
+        self._process = None
+
+    def __enter__(self) -> "ServerProcess":
+        parent, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve_forever, args=(self.options, child), daemon=True)
+        self._process.start()
+        if not parent.poll(30):
+            self._process.terminate()
+            raise RuntimeError("benchmark server did not start")
+        self.base_url = f"http://127.0.0.1:{parent.recv()}/"
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._process.terminate()
+        self._process.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a generated books.toscrape.com catalogue")
+    parser.add_argument("--books", type=int, default=1000, help="number of books (default: 1000)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on (default: 8000)")
+    args = parser.parse_args(argv)
+
+    site = CatalogueSite(SiteOptions(args.books, args.latency, args.jitter, args.error_rate))
+    app = web.Application()
+    app.router.add_get("/{path:.*}", site.handle)
+    print(f"Serving {len(site.books)} books on http://127.0.0.1:{args.port}/")
+    web.run_app(app, host="127.0.0.1", port=args.port, print=None, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,13 +12,15 @@ Enhancements:
 - Improved error handling for empty data/chart edge case
 """
 
+import sys
 import tkinter as tk
 from tkinter import ttk, messagebox
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import json
+from utils.file_handler import iter_books_from_file
 from utils.analyzer import count_books_per_category, average_price_per_category, get_unavailable_books
-from models.data_models import Book
+from utils.book_table import BookTable
+from utils.book_store import SqliteBookStore
 
 class ScraperGUI(tk.Tk):
     """
@@ -29,8 +31,10 @@ class ScraperGUI(tk.Tk):
         super().__init__()
         self.title("Book Scraper Data Viewer (Improved)")
         self.geometry("850x630")
-        self.books = self.load_books(json_path)
         self.json_path = json_path
+        self.store = SqliteBookStore(json_path) if json_path.endswith(".db") else None
+        self.books = self.load_books(json_path)
+        self.table = self.make_table()
 
         self.create_menu()
         self.create_widgets()
@@ -40,16 +44,32 @@ class ScraperGUI(tk.Tk):
 
     def load_books(self, json_path):
         """
-        Load book data from json_path into Book objects.
+        Load book data from json_path (.json, .jsonl, .csv or a .db store)
+        into Book objects. Books are streamed from disk straight into the
+        sorted list.
         """
         try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            return sorted([Book(**item) for item in data], key=lambda b: b.title)
+            if self.store is not None:
+                return list(self.store.iter_books())
+            return sorted(iter_books_from_file(json_path), key=lambda b: b.title)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load data: {e}")
             return []
 
+    def make_table(self):
+        """
+        Return the object the summaries and charts are computed from. A
+        SQLite store answers them with SQL; other files get a BookTable,
+        or the plain list of books if their prices mix currencies.
+        """
+        if self.store is not None:
+            return self.store
+        try:
+            return BookTable.from_books(self.books)
+        except ValueError as e:
+            messagebox.showwarning("Warning", f"Price summaries mix currencies: {e}")
+            return self.books
+
     def create_menu(self):
         """
         Add a menu bar with refresh and about options.
@@ -72,6 +92,7 @@ class ScraperGUI(tk.Tk):
         Reload book data and refresh widgets/charts.
         """
         self.books = self.load_books(self.json_path)
+        self.table = self.make_table()
         for child in self.winfo_children():
             if isinstance(child, ttk.Notebook):
                 child.destroy()
@@ -111,15 +132,11 @@ class ScraperGUI(tk.Tk):
             tree.column(col, anchor="center")
 
         for book in self.books:
-            # Ensure price is formatted even if loaded as a string
-            try:
-                price_val = float(book.price)
-                price_display = f"£{price_val:.2f}"
-            except (ValueError, TypeError):
-                price_display = f"{book.price}"
+            # Book.price is rebuilt from the parsed amount, so it is already
+            # normalized to "£12.34" (raw text is kept only if unparsable)
             tree.insert("", tk.END, values=(
                 book.title,
-                price_display,
+                book.price,
                 book.category,
                 book.availability
             ))
@@ -128,13 +145,13 @@ class ScraperGUI(tk.Tk):
         summary = tk.Text(tab1, height=10, font=('TkDefaultFont', 10))
         summary.pack(fill=tk.X, pady=(4, 2))
         summary.insert(tk.END, "== Category Counts ==\n")
-        for k, v in count_books_per_category(self.books).items():
+        for k, v in count_books_per_category(self.table).items():
             summary.insert(tk.END, f"  {k}: {v}\n")
         summary.insert(tk.END, "\n== Average Price per Category ==\n")
-        for k, v in average_price_per_category(self.books).items():
+        for k, v in average_price_per_category(self.table).items():
             summary.insert(tk.END, f"  {k}: £{v:.2f}\n")
         summary.insert(tk.END, "\n== Unavailable Books ==\n")
-        unavailable = list(get_unavailable_books(self.books))
+        unavailable = list(get_unavailable_books(self.table))
         if unavailable:
             for book in unavailable:
                 summary.insert(tk.END, f"  {book.title}\n")
@@ -156,8 +173,8 @@ class ScraperGUI(tk.Tk):
             lbl.pack(pady=30)
             return
 
-        counts = count_books_per_category(self.books)
-        prices = average_price_per_category(self.books)
+        counts = count_books_per_category(self.table)
+        prices = average_price_per_category(self.table)
 
         fig, axs = plt.subplots(1, 2, figsize=(9, 4))
         fig.suptitle("Scraped Book Data Summary", fontsize=14)
@@ -188,5 +205,5 @@ class ScraperGUI(tk.Tk):
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=1)
 
 if __name__ == "__main__":
-    app = ScraperGUI()
+    app = ScraperGUI(*sys.argv[1:2])
     app.mainloop()
\ No newline at end of file
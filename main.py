@@ -5,184 +5,501 @@ Entry point for the Python Web Scraping Midterm Project.
 Coordinates data collection, parsing, storage, and analysis.
 """
 import os
-import sys
+import argparse
 import asyncio
+import contextlib
 import logging
+import signal
+from concurrent.futures import ProcessPoolExecutor
 
 from scraper.collector import Collector
 from scraper.async_collector import AsyncCollector
-from scraper.parser import Parser
-from models.data_models import Book
-from utils.file_handler import save_books_to_json, save_books_to_csv, load_books_from_json
-from utils.analyzer import count_books_per_category, average_price_per_category, get_unavailable_books
-from urllib.parse import urljoin, urlparse  # Added import for urljoin and urlparse
-import os
-import os
+from scraper.crawler import Crawler, RecrawlIndex, listing_seeds
+from scraper.async_crawler import AsyncCrawler
+from scraper.sharded_crawler import iter_shard_books, sharded_crawl
+from scraper.cache import ResponseCache
+from scraper.checkpoint import CrawlJournal
+from scraper.retry import RetryPolicy
+from scraper.robots import RobotsCache
+from scraper.parser import BACKENDS, resolve_backend
+from utils.file_handler import (
+    CsvBookWriter, JsonArrayBookWriter, JsonLinesBookWriter, MultiBookWriter, ParquetBookWriter,
+    iter_books_from_file
+)
+from utils.book_store import SqliteBookStore
+from utils.logging_setup import setup_logging
+from utils.metrics import Metrics
+from utils.analyzer import (
+    CategoryAggregator, count_books_per_category, average_price_per_category, get_unavailable_books
+)
+
+logger = logging.getLogger(__name__)
+
 
+BASE_URL = "http://books.toscrape.com/"
+OUTPUT_DIR = "data"
+PROGRESS_EVERY = 100
+JOURNAL_FILE = "crawl.journal"
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("scraper.log", mode='w'),
-        logging.StreamHandler() # Log to console as well
+
+def open_writers(output_dir: str, sqlite: bool = False, parquet: bool = False,
+                 metrics: Metrics = None) -> MultiBookWriter:
+    """
+    Open streaming writers for books.json, books.jsonl and books.csv.
+
+    Args:
+        output_dir (str): Output directory.
+        sqlite (bool): Also upsert every book into books.db.
+        parquet (bool): Also write books.parquet (requires pyarrow).
+        metrics (Metrics): Records writer flush times.
+
+    Returns:
+        MultiBookWriter: Writer that appends each book to all outputs.
+    """
+    writers = [
+        JsonArrayBookWriter(os.path.join(output_dir, "books.json")),
+        JsonLinesBookWriter(os.path.join(output_dir, "books.jsonl")),
+        CsvBookWriter(os.path.join(output_dir, "books.csv")),
     ]
-)
+    if sqlite:
+        writers.append(SqliteBookStore(os.path.join(output_dir, "books.db")))
+    if parquet:
+        writers.append(ParquetBookWriter(os.path.join(output_dir, "books.parquet")))
+    return MultiBookWriter(writers, metrics)
 
-logger = logging.getLogger(__name__)
+
+def load_index(output_dir: str) -> RecrawlIndex:
+    """
+    Index the books saved by the previous run for a recrawl.
+
+    Args:
+        output_dir (str): Output directory holding books.json.
+
+    Returns:
+        RecrawlIndex: The index (empty when there is no usable previous output).
+    """
+    path = os.path.join(output_dir, "books.json")
+    if not os.path.exists(path):
+        logger.info("No previous %s, recrawling everything", path)
+        return RecrawlIndex()
+    try:
+        index = RecrawlIndex.from_books(iter_books_from_file(path))
+    except ValueError as e:
+        logger.warning("Could not read %s, recrawling everything: %s", path, e)
+        return RecrawlIndex()
+    logger.info("Loaded %d known books from %s", len(index), path)
+    return index
+
+
+def open_journal(output_dir: str, resume: bool = False) -> CrawlJournal:
+    """
+    Open the crawl journal in the output directory.
+
+    Args:
+        output_dir (str): Output directory.
+        resume (bool): Continue from the journal of an interrupted crawl
+            instead of starting a new one.
+
+    Returns:
+        CrawlJournal: The journal; delete it by leaving its ``with`` block
+        normally, keep it by leaving with an exception.
+    """
+    path = os.path.join(output_dir, JOURNAL_FILE)
+    if resume and not os.path.exists(path):
+        logger.info("No journal at %s, starting a new crawl", path)
+    return CrawlJournal(path, resume=resume)
+
+
+def log_resume(journal: CrawlJournal):
+    """
+    Log how much work a resumed crawl took from its journal.
+
+    Args:
+        journal (CrawlJournal): Journal used by the crawler.
+    """
+    if journal.replayed_pages or journal.replayed_books:
+        logger.info("Resume reused %d listing pages and %d books from the journal",
+                    journal.replayed_pages, journal.replayed_books)
+
+
+def exit_on_sigterm(signum, frame):
+    """
+    SIGTERM handler: unwind like Ctrl+C so the crawl journal is checkpointed.
+    """
+    raise KeyboardInterrupt(f"received signal {signum}")
+
+
+def log_recrawl(index: RecrawlIndex):
+    """
+    Log how many detail pages a recrawl skipped.
+
+    Args:
+        index (RecrawlIndex): Index used by the crawler, or None.
+    """
+    if index is not None:
+        logger.info("Recrawl reused %d stored categories and fetched %d detail pages",
+                    index.reused, index.missed)
 
 
-async def async_scrape():
-    base_url = "http://books.toscrape.com/"
-    output_dir = "data"
+def sitemap_seeds(urls: list, follow_categories: bool = False) -> list:
+    """
+    Pick the listing pages to seed a crawl with from the sitemap URLs.
+
+    Args:
+        urls (list): Page URLs from the sitemaps named in robots.txt.
+        follow_categories (bool): Also seed category listing pages.
+
+    Returns:
+        list: Listing page URLs; empty when the sitemap lists none.
+    """
+    seeds = listing_seeds(BASE_URL, urls, follow_categories)
+    if seeds:
+        logger.info("Seeding the crawl with %d listing pages from the sitemap", len(seeds),
+                    extra={"seeds": len(seeds)})
+    else:
+        logger.warning("No listing pages found in the sitemap; following links instead")
+    return seeds
+
+
+def store_book(book, writer: MultiBookWriter, stats: CategoryAggregator):
+    """
+    Write a freshly scraped book and fold it into the running statistics.
+
+    Args:
+        book (Book): Scraped book.
+        writer (MultiBookWriter): Output files.
+        stats (CategoryAggregator): Running per-category statistics.
+    """
+    writer.write(book)
+    stats.add(book)
+    if stats.total % PROGRESS_EVERY == 0:
+        counts = stats.count_per_category()
+        logger.info("Scraped %d books in %d categories", stats.total, len(counts),
+                    extra={"books": stats.total, "categories": len(counts)})
+
+
+def write_metrics(metrics: Metrics, output_dir: str, prometheus: str = None):
+    """
+    Save the run metrics to metrics.json (and a Prometheus text file) and
+    log the headline latencies.
+
+    Args:
+        metrics (Metrics): Metrics collected during the run.
+        output_dir (str): Output directory.
+        prometheus (str): Optional path for the Prometheus text format.
+    """
+    metrics.set("run_seconds", metrics.to_dict()["elapsed_seconds"])
+    path = os.path.join(output_dir, "metrics.json")
+    metrics.write_json(path)
+    if prometheus:
+        metrics.write_prometheus(prometheus)
+    for name, labels in (("http_request_seconds", {"phase": "ttfb"}),
+                         ("http_request_seconds", {"phase": "download"}),
+                         ("parse_seconds", {"page": "listing"}),
+                         ("parse_seconds", {"page": "detail"})):
+        histogram = metrics.histogram(name, **labels)
+        if histogram is not None:
+            logger.info("%s %s: n=%d p50=%.4fs p99=%.4fs max=%.4fs", name, labels, histogram.count,
+                        histogram.percentile(0.5), histogram.percentile(0.99), histogram.max)
+    logger.info("Metrics written to %s", path)
+
+
+def report(stats: CategoryAggregator):
+    """
+    Log summary statistics collected during the crawl.
+
+    Args:
+        stats (CategoryAggregator): Statistics fed with every scraped book.
+    """
+    counts = count_books_per_category(stats)
+    logger.info("Books per category: %s", counts, extra={"books_per_category": counts})
+    averages = {category: round(price, 2) for category, price in average_price_per_category(stats).items()}
+    logger.info("Average price per category: %s", averages, extra={"average_price_per_category": averages})
+    titles = [book.title for book in get_unavailable_books(stats)]
+    logger.info("Unavailable books (%d): %s", len(titles), ", ".join(titles) or "none",
+                extra={"unavailable_books": titles})
+
+
+async def async_scrape(crawl: bool = False, follow_categories: bool = False,
+                       cache: ResponseCache = None, parser_backend: str = "auto",
+                       parse_workers: int = 0, recrawl: bool = False, sqlite: bool = False,
+                       parquet: bool = False, retry: RetryPolicy = None, adaptive: bool = False,
+                       delay: float = 1.0, resume: bool = False, metrics: Metrics = None,
+                       sitemap: bool = False):
+    """
+    Scrape books with AsyncCollector.
+
+    Args:
+        crawl (bool): Follow pagination across the whole catalogue
+            instead of stopping after the first listing page.
+        follow_categories (bool): Also walk category index pages.
+        cache (ResponseCache): Optional HTTP response cache.
+        parser_backend (str): HTML parser backend ("auto" picks the fastest installed).
+        parse_workers (int): Size of the process pool used for HTML parsing;
+            0 parses on the event loop.
+        recrawl (bool): Only fetch detail pages of products that are new or
+            changed since the books.json of the previous run.
+        sqlite (bool): Also store books (with price history) in data/books.db.
+        parquet (bool): Also write data/books.parquet.
+        retry (RetryPolicy): Retry policy for transient HTTP failures.
+        adaptive (bool): Tune per-host concurrency (AIMD) from latency and
+            errors, below the rate set by ``delay``.
+        delay (float): Minimum interval between requests (seconds); 0
+            removes the rate limit.
+        resume (bool): Continue an interrupted crawl from its journal.
+        metrics (Metrics): Records request, parse, queue and writer timings.
+        sitemap (bool): Seed the crawl with the listing pages of the
+            sitemaps named in robots.txt.
+    """
+    base_url = BASE_URL
+    output_dir = OUTPUT_DIR
     os.makedirs(output_dir, exist_ok=True)
+    parser_backend = resolve_backend(parser_backend)
+    index = load_index(output_dir) if recrawl else None
+
+    stats = CategoryAggregator()
+    executor = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+    try:
+        async with AsyncCollector(base_url, delay=delay, cache=cache, retry=retry, adaptive=adaptive,
+                                  metrics=metrics, robots=RobotsCache()) as ac:
+            allowed = await ac.check_robots_txt()
+            if not allowed:
+                logger.warning("Scraping disallowed by robots.txt. Exiting.")
+                return
+            seeds = sitemap_seeds(await ac.sitemap_urls(), follow_categories) if sitemap else []
+            with open_journal(output_dir, resume) as journal:
+                crawler = AsyncCrawler(ac, follow_pagination=crawl, follow_categories=follow_categories,
+                                       parser_backend=parser_backend, parse_executor=executor,
+                                       parse_workers=parse_workers or None, index=index,
+                                       journal=journal, metrics=metrics)
+                with open_writers(output_dir, sqlite, parquet, metrics) as writer:
+                    async with contextlib.aclosing(crawler.crawl(seeds=seeds)) as books:
+                        async for book in books:
+                            store_book(book, writer, stats)
+                log_resume(journal)
+            if adaptive:
+                limits = ac.current_limits()
+                logger.info("Adaptive concurrency limits: %s", limits)
+                if metrics is not None:
+                    for host, limit in limits.items():
+                        metrics.set("concurrency_limit", limit, host=host)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    log_recrawl(index)
+    logger.info("Saved %d books to %s", writer.count, output_dir, extra={"books": writer.count})
+    report(stats)
 
-    books = []
-    async with AsyncCollector(base_url) as ac:
-        allowed = await ac.check_robots_txt()
-        if not allowed:
-            print("Scraping disallowed by robots.txt. Exiting.")
-            return
-        paths = [""]  # Extend as needed
-        responses = await ac.fetch_multi(paths)
-
-        # Gather all book listing info
-        raw_book_entries = []
-        for path, html in responses.items():
-            if not isinstance(html, str):
-                print(f"Failed to fetch {path}: {html}")
-                continue
-            try:
-                parser = Parser(html)
-                titles = parser.get_all_titles()
-                prices = parser.get_all_prices()
-                urls = parser.get_product_links()
-                availability_list = parser.get_availability_list()
-
-                for title, price, url, availability in zip(titles, prices, urls, availability_list):
-                    detail_url = urljoin(base_url, url)
-                    parsed_detail_url = urlparse(detail_url).path.lstrip('/')
-                    raw_book_entries.append({
-                        "title": title,
-                        "price": price,
-                        "url": detail_url,
-                        "availability": availability,
-                        "fetch_path": parsed_detail_url,
-                    })
-            except Exception as err:
-                print(f"Error processing path {path}: {err}")
-
-        # Batch fetch all detail pages concurrently
-        detail_fetch_tasks = [
-            ac.fetch(entry["fetch_path"]) for entry in raw_book_entries
-        ]
-        detail_html_results = await asyncio.gather(*detail_fetch_tasks, return_exceptions=True)
-
-        for entry, detail_result in zip(raw_book_entries, detail_html_results):
-            if isinstance(detail_result, Exception):
-                print(f"[DEBUG] Failed to fetch detail page for {entry['title']} at {entry['url']}: {detail_result}")
-                category = "Unknown"
-            else:
-                try:
-                    detail_parser = Parser(detail_result)
-                    category = detail_parser.get_category_name() or "Unknown"
-                    print(f"[DEBUG] Category for {entry['title']}: {category}")
-                except Exception as exc:
-                    print(f"[DEBUG] Error parsing category for {entry['title']} at {entry['url']}: {exc}")
-                    category = "Unknown"
-            book = Book(
-                title=entry["title"],
-                price=entry["price"],
-                url=entry["url"],
-                availability=entry["availability"],
-                category=category
-            )
-            books.append(book)
-        save_books_to_json(books, os.path.join(output_dir, "books.json"))
-        save_books_to_csv(books, os.path.join(output_dir, "books.csv"))
-
-    # No changes needed here, but ensure full content for completeness
-    loaded_books = load_books_from_json(os.path.join(output_dir, "books.json"))
-    print("\nBooks per category:")
-    print(count_books_per_category(loaded_books))
-
-    print("\nAverage price per category:")
-    print(average_price_per_category(loaded_books))
-
-    print("\nUnavailable books:")
-    for book in get_unavailable_books(loaded_books):
-        print(f"- {book.title}")
-
-
-def sync_scrape():
-    base_url = "http://books.toscrape.com/"
-    output_dir = "data"
+
+def sync_scrape(crawl: bool = False, follow_categories: bool = False,
+                cache: ResponseCache = None, parser_backend: str = "auto", recrawl: bool = False,
+                sqlite: bool = False, parquet: bool = False, retry: RetryPolicy = None,
+                delay: float = 1.0, workers: int = 1, resume: bool = False,
+                metrics: Metrics = None, sitemap: bool = False):
+    """
+    Scrape books with the synchronous Collector.
+
+    Args:
+        crawl (bool): Follow pagination across the whole catalogue
+            instead of stopping after the first listing page.
+        follow_categories (bool): Also walk category index pages.
+        cache (ResponseCache): Optional HTTP response cache.
+        parser_backend (str): HTML parser backend ("auto" picks the fastest installed).
+        recrawl (bool): Only fetch detail pages of products that are new or
+            changed since the books.json of the previous run.
+        sqlite (bool): Also store books (with price history) in data/books.db.
+        parquet (bool): Also write data/books.parquet.
+        retry (RetryPolicy): Retry policy for transient HTTP failures.
+        delay (float): Minimum interval between requests (seconds), shared
+            by all worker threads.
+        workers (int): Threads fetching detail pages concurrently.
+        resume (bool): Continue an interrupted crawl from its journal.
+        metrics (Metrics): Records request, parse and writer timings.
+        sitemap (bool): Seed the crawl with the listing pages of the
+            sitemaps named in robots.txt.
+    """
+    base_url = BASE_URL
+    output_dir = OUTPUT_DIR
     os.makedirs(output_dir, exist_ok=True)
 
-    collector = Collector(base_url)
+    parser_backend = resolve_backend(parser_backend)
+    collector = Collector(base_url, delay=delay, cache=cache, retry=retry, pool_size=max(workers, 1),
+                          metrics=metrics, robots=RobotsCache())
     if not collector.check_robots_txt():
-        print("Scraping is disallowed by robots.txt. Exiting.")
+        logger.warning("Scraping is disallowed by robots.txt. Exiting.")
         return
+    seeds = sitemap_seeds(collector.sitemap_urls(), follow_categories) if sitemap else []
 
-    html = collector.fetch()
+    index = load_index(output_dir) if recrawl else None
+    stats = CategoryAggregator()
+    with open_journal(output_dir, resume) as journal:
+        crawler = Crawler(collector, follow_pagination=crawl, follow_categories=follow_categories,
+                          parser_backend=parser_backend, index=index, detail_workers=workers,
+                          journal=journal, metrics=metrics)
+        with open_writers(output_dir, sqlite, parquet, metrics) as writer:
+            for book in crawler.crawl(seeds=seeds):
+                store_book(book, writer, stats)
+        log_resume(journal)
 
-    parser = Parser(html)
-    titles = parser.get_all_titles()
-    prices = parser.get_all_prices()
-    urls = parser.get_product_links()
-    availability_list = parser.get_availability_list()
-    category_name = parser.get_category_name() or "Unknown"
+    log_recrawl(index)
+    logger.info("Saved %d books to %s", writer.count, output_dir, extra={"books": writer.count})
+    report(stats)
 
-    books = []
-    from urllib.parse import urljoin, urlparse
 
-    for title, price, url, availability in zip(titles, prices, urls, availability_list):
-        # Ensure correct resolution of relative links (may have '../')
-        # urljoin will handle '../', but path for fetch must not start with '/'
-        detail_url = urljoin(base_url, url)
-        parsed = urlparse(detail_url)
-        fetch_path = parsed.path.lstrip('/')  # collector.fetch expects no leading slash
+def sharded_scrape(processes: int, crawl: bool = False, follow_categories: bool = False,
+                   parser_backend: str = "auto", sqlite: bool = False, parquet: bool = False,
+                   retries: int = 3, delay: float = 1.0, concurrency: int = 10, sitemap: bool = False,
+                   metrics: Metrics = None):
+    """
+    Scrape books with several worker processes sharing one frontier.
 
-        print(f"[DEBUG] Book: {title} | href: {url} | detail_url: {detail_url} | fetch_path: {fetch_path}")
+    Each process writes its own shard file; the shards are then merged into
+    the regular outputs and the per-shard statistics into one report.
 
-        try:
-            detail_html = collector.fetch(fetch_path)
-        except Exception as e:
-            print(f"Failed to fetch detail page for {title} at {detail_url}: {e}")
-            category = "Unknown"
-        else:
-            detail_parser = Parser(detail_html)
-            category = detail_parser.get_category_name() or "Unknown"
-            print(f"[DEBUG] Category for {title}: {category}")
-        book = Book(
-            title=title,
-            price=price,
-            url=detail_url,
-            availability=availability,
-            category=category
-        )
-        books.append(book)
+    Args:
+        processes (int): Worker processes.
+        crawl (bool): Follow pagination across the whole catalogue
+            instead of stopping after the first listing page.
+        follow_categories (bool): Also walk category index pages.
+        parser_backend (str): HTML parser backend ("auto" picks the fastest installed).
+        sqlite (bool): Also store books (with price history) in data/books.db.
+        parquet (bool): Also write data/books.parquet.
+        retries (int): Attempts per request for transient failures.
+        delay (float): Minimum interval between requests (seconds), shared
+            by all processes; 0 disables rate limiting. A longer robots.txt
+            Crawl-delay takes precedence.
+        concurrency (int): Requests in flight per process.
+        sitemap (bool): Seed the frontier with the listing pages of the
+            sitemaps named in robots.txt.
+        metrics (Metrics): Receives the request and parse metrics of every
+            shard, and the writer timings of the merge.
+    """
+    base_url = BASE_URL
+    output_dir = OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+
+    collector = Collector(base_url, robots=RobotsCache())
+    if not collector.check_robots_txt():
+        logger.warning("Scraping is disallowed by robots.txt. Exiting.")
+        return
+    crawl_delay = collector.robots_rules().crawl_delay
+    if crawl_delay and crawl_delay > delay:
+        delay = crawl_delay
+    seeds = sitemap_seeds(collector.sitemap_urls(), follow_categories) if sitemap else []
 
-    save_books_to_json(books, os.path.join(output_dir, "books.json"))
-    save_books_to_csv(books, os.path.join(output_dir, "books.csv"))
+    shards, _ = sharded_crawl(base_url, os.path.join(output_dir, "shards"), processes,
+                              follow_pagination=crawl, follow_categories=follow_categories,
+                              rate=1.0 / delay if delay > 0 else None, concurrency=concurrency,
+                              parser_backend=resolve_backend(parser_backend), retries=retries,
+                              seeds=seeds, metrics=metrics)
+    # Statistics are rebuilt from the merged books, which are unique by URL.
+    stats = CategoryAggregator()
+    with open_writers(output_dir, sqlite, parquet, metrics) as writer:
+        for book in iter_shard_books(shards):
+            store_book(book, writer, stats)
 
-    loaded_books = load_books_from_json(os.path.join(output_dir, "books.json"))
-    print("\nBooks per category:")
-    print(count_books_per_category(loaded_books))
+    logger.info("Saved %d books from %d shards to %s", writer.count, len(shards), output_dir,
+                extra={"books": writer.count, "shards": len(shards)})
+    report(stats)
 
-    print("\nAverage price per category:")
-    print(average_price_per_category(loaded_books))
 
-    print("\nUnavailable books:")
-    for book in get_unavailable_books(loaded_books):
-        print(f"- {book.title}")
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parse command line options.
+    """
+    parser = argparse.ArgumentParser(description="Scrape books.toscrape.com")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="use the asynchronous collector")
+    parser.add_argument("--crawl", action="store_true",
+                        help="follow pagination and crawl the full catalogue")
+    parser.add_argument("--categories", action="store_true",
+                        help="also crawl category index pages (implies --crawl)")
+    parser.add_argument("--parser", choices=("auto",) + BACKENDS, default="auto",
+                        help="HTML parser backend (default: fastest installed)")
+    parser.add_argument("--parse-workers", type=int, default=os.cpu_count() or 1,
+                        help="processes used for HTML parsing in async mode; 0 parses on the event loop "
+                             "(default: number of CPUs)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="disable the on-disk HTTP response cache")
+    parser.add_argument("--cache-ttl", type=float, default=0.0,
+                        help="seconds a cached page is reused without revalidation (default: 0)")
+    parser.add_argument("--delay", type=float, default=1.0,
+                        help="minimum seconds between requests to the site (default: 1.0)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="sync mode: threads fetching detail pages concurrently (default: 1)")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="crawl with N worker processes sharing one frontier and rate budget, "
+                             "then merge their outputs (the response cache is not used)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="async mode: tune concurrency per host from latency and errors (AIMD); "
+                             "--delay still caps the request rate (pass --delay 0 to lift the cap)")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="attempts per request for transient failures (429, 5xx, timeouts); "
+                             "1 disables retries (default: 3)")
+    parser.add_argument("--sitemap", action="store_true",
+                        help="queue the listing pages of the sitemaps named in robots.txt up front "
+                             "instead of discovering them page by page (implies --crawl)")
+    parser.add_argument("--recrawl", action="store_true",
+                        help="reuse categories from the previous books.json and only fetch detail "
+                             "pages of new or changed products (not used with --processes)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted crawl from data/crawl.journal without "
+                             "re-fetching the pages it finished (not used with --processes)")
+    parser.add_argument("--prometheus", metavar="FILE",
+                        help="also write the run metrics to FILE in the Prometheus text format "
+                             "(data/metrics.json is always written)")
+    parser.add_argument("--log-level", default="INFO", choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+                        help="log level (default: INFO)")
+    parser.add_argument("--log-format", default="json", choices=("json", "text"),
+                        help="console and scraper.log format (default: json, one object per line)")
+    parser.add_argument("--log-sample", type=int, default=100,
+                        help="keep one in N per-item DEBUG events (default: 100; 1 keeps all)")
+    parser.add_argument("--sqlite", action="store_true",
+                        help="also upsert books into data/books.db, keeping per-run price history")
+    parser.add_argument("--parquet", action="store_true",
+                        help="also write data/books.parquet (typed, zstd-compressed; requires pyarrow)")
+    args = parser.parse_args(argv)
+    if args.processes > 0:
+        for flag, value in (("--recrawl", args.recrawl), ("--resume", args.resume)):
+            if value:
+                parser.error(f"{flag} cannot be used with --processes")
+    return args
 
 
 if __name__ == "__main__":
-    if '--async' in sys.argv:
-        print("Running in ASYNC scraping mode")
-        asyncio.run(async_scrape())
-    else:
-        print("Running in SYNC scraping mode")
-        sync_scrape()
+    args = parse_args()
+    listener = setup_logging(args.log_level, "scraper.log", json_format=args.log_format == "json",
+                             sample_rate=args.log_sample)
+    crawl = args.crawl or args.categories or args.sitemap
+    cache = None if args.no_cache else ResponseCache(os.path.join(OUTPUT_DIR, "http_cache.sqlite"),
+                                                     ttl=args.cache_ttl)
+    retry = RetryPolicy(attempts=args.retries)
+    signal.signal(signal.SIGTERM, exit_on_sigterm)
+    metrics = Metrics()
+    try:
+        if args.processes > 0:
+            logger.info("Running in SHARDED scraping mode with %d processes", args.processes)
+            sharded_scrape(args.processes, crawl=crawl, follow_categories=args.categories,
+                           parser_backend=args.parser, sqlite=args.sqlite, parquet=args.parquet,
+                           retries=args.retries, delay=args.delay, sitemap=args.sitemap, metrics=metrics)
+        elif args.use_async:
+            logger.info("Running in ASYNC scraping mode")
+            asyncio.run(async_scrape(crawl=crawl, follow_categories=args.categories, cache=cache,
+                                     parser_backend=args.parser, parse_workers=args.parse_workers,
+                                     recrawl=args.recrawl, sqlite=args.sqlite,
+                                     parquet=args.parquet, retry=retry, adaptive=args.adaptive,
+                                     delay=args.delay, resume=args.resume, metrics=metrics,
+                                     sitemap=args.sitemap))
+        else:
+            logger.info("Running in SYNC scraping mode")
+            sync_scrape(crawl=crawl, follow_categories=args.categories, cache=cache,
+                        parser_backend=args.parser, recrawl=args.recrawl, sqlite=args.sqlite,
+                        parquet=args.parquet, retry=retry, delay=args.delay, workers=args.workers,
+                        resume=args.resume, metrics=metrics, sitemap=args.sitemap)
+    finally:
+        # Written for failed and interrupted runs too: that is when they matter most.
+        write_metrics(metrics, OUTPUT_DIR, args.prometheus)
+        if cache is not None:
+            cache.close()
+        listener.stop()
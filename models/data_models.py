@@ -3,9 +3,96 @@ data_models.py
 
 Defines data structures for scraped information 
 using object-oriented principles.
+
+Book keeps its fields in __slots__ and parses the price and availability
+once, on construction: the price becomes an integer number of pence plus a
+currency code, and availability an Availability value plus an optional
+stock count. The original strings are rebuilt on demand, so to_dict()
+returns the same data as before.
 """
 
-from typing import List
+import re
+import sys
+from enum import Enum
+from typing import List, Optional, Tuple
+
+CURRENCY_CODES = {"£": "GBP", "$": "USD", "€": "EUR"}
+CURRENCY_SYMBOLS = {code: symbol for symbol, code in CURRENCY_CODES.items()}
+# Currency of prices written without a symbol, e.g. "51.77".
+DEFAULT_CURRENCY = "GBP"
+
+_PRICE_RE = re.compile(r"^([£$€])?(\d+)(?:\.(\d{1,2}))?$")
+_STOCK_RE = re.compile(r"\((\d+) available\)")
+
+
+class Availability(Enum):
+    """
+    Normalized stock status of a book.
+    """
+    IN_STOCK = "In stock"
+    OUT_OF_STOCK = "Out of stock"
+    UNKNOWN = "Unknown"
+
+
+def parse_price(price: str) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Parse a price string such as "£51.77" (or the mis-decoded "Â£51.77").
+    A bare amount such as "51.77" is taken to be in DEFAULT_CURRENCY.
+
+    Args:
+        price (str): Price text.
+
+    Returns:
+        Tuple[Optional[int], Optional[str]]: Amount in pence (minor units) and
+        ISO currency code, or (None, None) if the text is not a price.
+    """
+    match = _PRICE_RE.match(price.strip().replace("Â", ""))
+    if not match:
+        return None, None
+    symbol, units, cents = match.groups()
+    return (int(units) * 100 + int((cents or "0").ljust(2, "0")),
+            CURRENCY_CODES[symbol] if symbol else DEFAULT_CURRENCY)
+
+
+def format_price(pence: int, currency: str) -> str:
+    """
+    Format an amount in pence as a price string, e.g. 5177, "GBP" -> "£51.77".
+    """
+    return f"{CURRENCY_SYMBOLS[currency]}{pence // 100}.{pence % 100:02d}"
+
+
+def parse_availability(availability: str) -> Tuple[Availability, Optional[int]]:
+    """
+    Parse availability text such as "In stock (22 available)".
+
+    Args:
+        availability (str): Availability text.
+
+    Returns:
+        Tuple[Availability, Optional[int]]: Status and stock count (None if
+        the text gives no count).
+    """
+    text = availability.strip().lower()
+    if "out of stock" in text:
+        return Availability.OUT_OF_STOCK, 0
+    if text.startswith("in stock"):
+        match = _STOCK_RE.search(text)
+        return Availability.IN_STOCK, int(match.group(1)) if match else None
+    return Availability.UNKNOWN, None
+
+
+def format_availability(status: Availability, stock: Optional[int]) -> str:
+    """
+    Format a status and stock count the way books.toscrape.com shows them.
+    """
+    if status is Availability.IN_STOCK and stock is not None:
+        return f"In stock ({stock} available)"
+    return status.value
+
+
+def _text(value) -> str:
+    # Text to parse for a field that may hold None or a number.
+    return "" if value is None else str(value)
 
 
 class Book:
@@ -13,6 +100,8 @@ class Book:
     Class representing information about a book.
     """
 
+    __slots__ = ("title", "url", "category", "price_pence", "currency", "status", "stock", "_raw")
+
     def __init__(self, title: str, price: str, url: str, availability: str, category: str):
         """
         Initialize a Book object.
@@ -25,10 +114,58 @@ class Book:
             category (str): Category of the book.
         """
         self.title = title
-        self.price = price
         self.url = url
+        self.category = sys.intern(category) if isinstance(category, str) else category
+        # Original strings that do not round-trip through the parsed form
+        # (e.g. "Free!"); None for the usual case.
+        self._raw = None
+        self.price = price
         self.availability = availability
-        self.category = category
+
+    @property
+    def price(self) -> str:
+        """
+        str: Price string, e.g. "£51.77".
+        """
+        if self._raw and "price" in self._raw:
+            return self._raw["price"]
+        return format_price(self.price_pence, self.currency)
+
+    @price.setter
+    def price(self, value: str):
+        text = _text(value)
+        self.price_pence, self.currency = parse_price(text)
+        # Bare amounts and non-string values (None from a short CSV row, a
+        # number from JSON) are kept as given, so to_dict() returns them unchanged.
+        bare = text.strip().replace("Â", "")[:1] not in CURRENCY_CODES
+        self._keep_raw("price", value, self.price_pence is None or bare or not isinstance(value, str))
+
+    @property
+    def price_value(self) -> Optional[float]:
+        """
+        Optional[float]: Price in major units (pounds), or None if unparsable.
+        """
+        return None if self.price_pence is None else self.price_pence / 100
+
+    @property
+    def availability(self) -> str:
+        """
+        str: Availability text, e.g. "In stock (22 available)".
+        """
+        if self._raw and "availability" in self._raw:
+            return self._raw["availability"]
+        return format_availability(self.status, self.stock)
+
+    @availability.setter
+    def availability(self, value: str):
+        self.status, self.stock = parse_availability(_text(value))
+        self._keep_raw("availability", value, value != format_availability(self.status, self.stock))
+
+    def _keep_raw(self, field: str, value: str, keep: bool):
+        if keep:
+            self._raw = dict(self._raw or {}, **{field: value})
+        elif self._raw:
+            self._raw.pop(field, None)
 
     def to_dict(self) -> dict:
         """
@@ -45,6 +182,9 @@ class Book:
             "category": self.category
         }
 
+    def __repr__(self) -> str:
+        return f"Book(title={self.title!r}, price={self.price!r}, category={self.category!r})"
+
 
 class Category:
     """
@@ -2,44 +2,468 @@
 async_collector.py
 
 Asynchronous web page fetcher using aiohttp.
+
+Requests are scheduled through a bounded number of in-flight slots and a
+per-host token bucket, so callers can fire as many fetches as they like and
+the collector keeps the actual request rate within the configured budget.
+Transient failures are retried according to a RetryPolicy; the retry delay
+pauses the host's bucket, so retries queue behind the same rate limit.
+
+With ``adaptive=True`` each host also gets an AdaptiveLimiter that tunes
+its number of in-flight requests (AIMD) from observed latency and errors.
+
+The session runs on an explicitly configured TCPConnector (pool limits,
+TTL DNS cache, keep-alive) with connect/read/total timeouts, so warm
+connections are reused across requests and a hung socket fails with a
+timeout instead of stalling the crawl.
+
+Given a utils.metrics.Metrics, every request is timed per phase (DNS,
+connect, time to first byte, download) through an aiohttp TraceConfig, and
+status codes, response sizes, retries and cache hits are counted.
+
+Given a RobotsCache, every URL is checked against its site's robots.txt
+rules before it is scheduled, and a Crawl-delay slows that host's bucket.
 """
 
 import aiohttp
 import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
 from urllib.parse import urlparse
 
+from scraper.cache import ResponseCache
+from scraper.retry import RetryPolicy
+from scraper.robots import (
+    USER_AGENT, RobotsCache, RobotsDisallowed, RobotsRules, origin, parse_sitemap, robots_url
+)
+from utils.metrics import NO_METRICS, Metrics
+
+logger = logging.getLogger(__name__)
+
+# Timeouts suited to crawling: fail fast on connect, allow slow pages to
+# trickle in, but never let one request hang for more than a minute.
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=60, connect=10, sock_connect=10, sock_read=30)
+
+
+def request_trace_config(metrics: Metrics) -> aiohttp.TraceConfig:
+    """
+    Build a TraceConfig that records request phases into ``metrics``.
+
+    Records the histograms ``http_request_seconds`` (phase "dns", "connect"
+    and "ttfb", up to the response headers) and ``http_response_bytes``, and
+    counts reused connections in ``http_connections_reused_total``.
+
+    Args:
+        metrics (Metrics): Destination for the timings.
+
+    Returns:
+        aiohttp.TraceConfig: Config to pass to the ClientSession.
+    """
+    trace = aiohttp.TraceConfig()
+
+    async def on_request_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def on_dns_start(session, ctx, params):
+        ctx.dns_start = time.perf_counter()
+
+    async def on_dns_end(session, ctx, params):
+        metrics.observe("http_request_seconds", time.perf_counter() - ctx.dns_start, phase="dns")
+
+    async def on_connect_start(session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+
+    async def on_connect_end(session, ctx, params):
+        metrics.observe("http_request_seconds", time.perf_counter() - ctx.connect_start, phase="connect")
+
+    async def on_connection_reused(session, ctx, params):
+        metrics.inc("http_connections_reused_total")
+
+    async def on_request_end(session, ctx, params):
+        metrics.observe("http_request_seconds", time.perf_counter() - ctx.start, phase="ttfb")
+
+    async def on_chunk(session, ctx, params):
+        # ClientResponse.read() reports the whole body as one chunk.
+        metrics.observe("http_response_bytes", len(params.chunk))
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_dns_resolvehost_start.append(on_dns_start)
+    trace.on_dns_resolvehost_end.append(on_dns_end)
+    trace.on_connection_create_start.append(on_connect_start)
+    trace.on_connection_create_end.append(on_connect_end)
+    trace.on_connection_reuseconn.append(on_connection_reused)
+    trace.on_request_end.append(on_request_end)
+    trace.on_response_chunk_received.append(on_chunk)
+    return trace
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket limiting the request rate to a single host.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``.
+    Callers reserve a token immediately (the balance may go negative) and
+    then sleep until their reservation becomes due, so waiting callers are
+    released one interval apart instead of all at once.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """
+        Initialize a TokenBucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum number of tokens (burst size).
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """
+        Take one token and return how long the caller must wait for it.
+
+        Returns:
+            float: Seconds to wait before the request may be sent.
+        """
+        self._refill(time.monotonic())
+        self.tokens -= 1.0
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def pause(self, seconds: float):
+        """
+        Hold back the next reservation by at least ``seconds``, e.g. after
+        the host answered 429 with a Retry-After header.
+
+        Args:
+            seconds (float): Pause length.
+        """
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, 1.0 - seconds * self.rate)
+
+    async def acquire(self):
+        """
+        Wait until a token is available.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for one host.
+
+    While the window's p95 latency and overload rate stay under their
+    targets and the limit is actually in use, the limit grows by
+    ``increase`` per limit's worth of completed requests (additive
+    increase). A 429/5xx/timeout, or p95 latency above target, multiplies it
+    by ``decrease`` (multiplicative decrease) - at most once per round trip,
+    since only requests started after the previous decrease can trigger the
+    next one.
+    """
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 64,
+                 target_latency: float = 1.0, max_error_rate: float = 0.05,
+                 increase: float = 1.0, decrease: float = 0.5, window: int = 50):
+        """
+        Initialize an AdaptiveLimiter.
+
+        Args:
+            initial (int): Starting limit.
+            min_limit (int): Lowest limit.
+            max_limit (int): Highest limit.
+            target_latency (float): p95 latency (seconds) above which the
+                host is considered congested.
+            max_error_rate (float): Overload share of the window above which
+                the limit stops growing.
+            increase (float): Additive step per limit's worth of successes.
+            decrease (float): Multiplicative factor applied on overload.
+            window (int): Number of recent requests kept for p95 and error rate.
+        """
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._overloads: Deque[bool] = deque(maxlen=window)
+        self._epoch = 0
+        # Set when the limit is reached; cleared when the host goes idle, so
+        # the limit only grows while it is actually the bottleneck.
+        self._saturated = False
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def current_limit(self) -> int:
+        """
+        int: Number of requests currently allowed in flight.
+        """
+        return max(self.min_limit, int(self.limit))
+
+    def p95(self) -> Optional[float]:
+        """
+        Returns:
+            Optional[float]: p95 latency of the window, or None without samples.
+        """
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def error_rate(self) -> float:
+        """
+        Returns:
+            float: Share of overload responses in the window.
+        """
+        return sum(self._overloads) / len(self._overloads) if self._overloads else 0.0
+
+    async def acquire(self) -> int:
+        """
+        Wait until the host is below its limit and take a slot.
+
+        Returns:
+            int: Token to hand back to release().
+        """
+        while self.in_flight >= self.current_limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done():
+                    self._wake()
+                else:
+                    self._waiters.remove(waiter)
+                raise
+        self.in_flight += 1
+        if self.in_flight >= self.current_limit:
+            self._saturated = True
+        return self._epoch
+
+    def release(self, token: int, latency: float, overloaded: bool = False):
+        """
+        Return a slot and adjust the limit from the request's outcome.
+
+        Args:
+            token (int): Value returned by acquire().
+            latency (float): Request latency in seconds.
+            overloaded (bool): The host answered 429/5xx or the request
+                timed out / lost its connection.
+        """
+        self.in_flight -= 1
+        self._overloads.append(overloaded)
+        if not overloaded:
+            self._latencies.append(latency)
+        p95 = self.p95()
+        congested = overloaded or (len(self._latencies) >= 10 and p95 > self.target_latency)
+        if congested:
+            if token == self._epoch:
+                self.limit = max(float(self.min_limit), self.limit * self.decrease)
+                self._epoch += 1
+                self._latencies.clear()
+                self._saturated = False
+                logger.debug("Concurrency limit lowered to %d", self.current_limit)
+        elif self._saturated and self.error_rate() <= self.max_error_rate:
+            self.limit = min(float(self.max_limit), self.limit + self.increase / self.limit)
+        if self.in_flight == 0:
+            self._saturated = False
+        self._wake()
+
+    def _wake(self):
+        free = self.current_limit - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
 
 class AsyncCollector:
     """
     AsyncCollector is designed to fetch multiple pages concurrently with respect for robots.txt.
     """
 
-    def __init__(self, base_url: str, delay: float = 1.0):
+    def __init__(self, base_url: str, delay: float = 1.0, max_in_flight: int = 10,
+                 rate: Optional[float] = None, burst: int = 1,
+                 cache: Optional[ResponseCache] = None, retry: Optional[RetryPolicy] = None,
+                 adaptive: bool = False, target_latency: float = 1.0,
+                 connection_limit: int = 100, limit_per_host: Optional[int] = None,
+                 dns_ttl: Optional[int] = 300, keepalive_timeout: float = 30.0,
+                 timeout: Optional[aiohttp.ClientTimeout] = None, limiter=None,
+                 metrics: Optional[Metrics] = None, robots: Optional[RobotsCache] = None):
         """
         Initialize AsyncCollector.
 
         Args:
             base_url (str): Base website URL.
-            delay (float): Delay between requests (seconds).
+            delay (float): Minimum interval between requests to one host (seconds).
+                Used to derive ``rate`` when it is not given; 0 disables rate limiting.
+            max_in_flight (int): Maximum number of requests running at once.
+            rate (Optional[float]): Requests per second allowed per host.
+            burst (int): Number of requests a host may receive back to back.
+            cache (Optional[ResponseCache]): Response cache used to skip or
+                revalidate repeat downloads.
+            retry (Optional[RetryPolicy]): Retry policy for transient
+                failures (defaults to RetryPolicy()).
+            adaptive (bool): Tune per-host concurrency with an
+                AdaptiveLimiter, between 1 and max_in_flight.
+            target_latency (float): p95 latency target for the adaptive limiter.
+            connection_limit (int): Maximum open connections in total.
+            limit_per_host (Optional[int]): Maximum open connections per host
+                (defaults to max_in_flight, so every in-flight request can
+                keep its own warm connection).
+            dns_ttl (Optional[int]): Seconds resolved addresses are cached;
+                None caches them forever.
+            keepalive_timeout (float): Seconds an idle connection is kept
+                open for reuse.
+            timeout (Optional[aiohttp.ClientTimeout]): Request timeouts
+                (defaults to DEFAULT_TIMEOUT).
+            limiter: Rate limiter used for every host instead of per-host
+                buckets, e.g. one shared between processes. Must provide
+                TokenBucket's acquire() and pause().
+            metrics (Optional[Metrics]): Records per-request timings,
+                statuses and sizes.
+            robots (Optional[RobotsCache]): robots.txt rules; fetch() refuses
+                URLs they disallow. None skips the per-URL check.
         """
         self.base_url = base_url
         self.delay = delay
+        self.max_in_flight = max_in_flight
+        if rate is None and delay > 0:
+            rate = 1.0 / delay
+        self.rate = rate
+        self.burst = burst
+        self.cache = cache
+        self.retry = retry or RetryPolicy()
+        self.adaptive = adaptive
+        self.target_latency = target_latency
+        self.connection_limit = connection_limit
+        self.limit_per_host = limit_per_host or max_in_flight
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout or DEFAULT_TIMEOUT
+        self.limiter = limiter
+        self.metrics = metrics or NO_METRICS
+        self.robots = robots
         self.session = None
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._crawl_delays: Dict[str, float] = {}
+        self._robots_loads: Dict[str, asyncio.Future] = {}
+
+    def make_connector(self) -> aiohttp.TCPConnector:
+        """
+        Build the connection pool used by the session.
+
+        Returns:
+            aiohttp.TCPConnector: Connector with the configured limits, DNS
+            cache and keep-alive.
+        """
+        return aiohttp.TCPConnector(
+            limit=self.connection_limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
 
     async def __aenter__(self):
         headers = {
-            "User-Agent": "MidtermScraperBot/1.0 (+https://example.com/bot)"
+            "User-Agent": USER_AGENT
         }
-        self.session = aiohttp.ClientSession(headers=headers)
+        trace_configs = [request_trace_config(self.metrics)] if self.metrics is not NO_METRICS else []
+        self.session = aiohttp.ClientSession(headers=headers, connector=self.make_connector(),
+                                             timeout=self.timeout, trace_configs=trace_configs)
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.session.close()
 
+    def get_bucket(self, host: str) -> Optional[TokenBucket]:
+        """
+        Return the shared token bucket for a host, creating it on first use.
+
+        The bucket's rate is ``rate`` or the host's robots.txt Crawl-delay,
+        whichever is slower. A shared ``limiter`` is returned as is; its
+        owner is expected to have applied the Crawl-delay.
+
+        Args:
+            host (str): Network location, e.g. "books.toscrape.com".
+
+        Returns:
+            Optional[TokenBucket]: The bucket (or the shared limiter), or None
+            when rate limiting is off.
+        """
+        if self.limiter is not None:
+            return self.limiter
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, burst = self.rate, self.burst
+            crawl_delay = self._crawl_delays.get(host)
+            if crawl_delay:
+                rate, burst = min(rate or float("inf"), 1.0 / crawl_delay), 1
+            if not rate:
+                return None
+            bucket = TokenBucket(rate, burst)
+            self._buckets[host] = bucket
+        return bucket
+
+    def get_limiter(self, host: str) -> Optional[AdaptiveLimiter]:
+        """
+        Return the adaptive concurrency limiter for a host, creating it on first use.
+
+        Args:
+            host (str): Network location.
+
+        Returns:
+            Optional[AdaptiveLimiter]: The limiter, or None when adaptive
+            concurrency is off.
+        """
+        if not self.adaptive:
+            return None
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            limiter = AdaptiveLimiter(initial=min(4, self.max_in_flight), max_limit=self.max_in_flight,
+                                      target_latency=self.target_latency)
+            self._limiters[host] = limiter
+        return limiter
+
+    def current_limits(self) -> Dict[str, int]:
+        """
+        Report the adaptive concurrency limit of every host seen so far.
+
+        Returns:
+            Dict[str, int]: Host -> requests allowed in flight.
+        """
+        return {host: limiter.current_limit for host, limiter in self._limiters.items()}
+
     async def fetch(self, url_suffix: str = "") -> str:
         """
         Fetch a single page asynchronously.
 
+        The request waits for a free in-flight slot and a token from its
+        host's bucket before it is sent; no sleep happens while a response
+        is open. Fresh cache entries skip the scheduler entirely; stale ones
+        are revalidated and a 304 serves the cached body. Transient failures
+        release the slot, pause the host's bucket for the retry delay and go
+        through the scheduler again.
+
         Args:
             url_suffix (str): URL path or slug.
 
@@ -49,16 +473,74 @@ class AsyncCollector:
         Raises:
             aiohttp.ClientError: If a network-related error occurs.
             asyncio.TimeoutError: If the request times out.
+            RobotsDisallowed: If robots.txt disallows the URL.
         """
         url = self.base_url + url_suffix
-        try:
-            async with self.session.get(url) as resp:
-                resp.raise_for_status()
-                await asyncio.sleep(self.delay)
-                return await resp.text()
-        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            print(f"Request failed: {e}")
-            raise
+        cached = self.cache.get(url) if self.cache else None
+        if cached is not None and self.cache.is_fresh(cached):
+            self.metrics.inc("cache_hits_total", result="fresh")
+            return cached.body
+        if self.robots is not None and not (await self.robots_rules(url)).allowed(url):
+            self.metrics.inc("robots_disallowed_total")
+            raise RobotsDisallowed(url)
+        host = urlparse(url).netloc
+        bucket = self.get_bucket(host)
+        limiter = self.get_limiter(host)
+        attempt = 0
+        while True:
+            attempt += 1
+            token = await limiter.acquire() if limiter is not None else None
+            overloaded = False
+            start = time.monotonic()
+            try:
+                async with self._slots:
+                    if bucket is not None:
+                        await bucket.acquire()
+                    self.retry.record_request(host)
+                    start = time.monotonic()
+                    try:
+                        async with self.session.get(url, headers=ResponseCache.conditional_headers(cached)) as resp:
+                            self.metrics.inc("http_requests_total", status=resp.status)
+                            if resp.status == 304 and cached is not None:
+                                self.cache.mark_revalidated(url)
+                                self.metrics.inc("cache_hits_total", result="revalidated")
+                                return cached.body
+                            if resp.status < 400:
+                                with self.metrics.timer("http_request_seconds", phase="download"):
+                                    body = await resp.text()
+                                self.metrics.observe("http_request_seconds", time.monotonic() - start,
+                                                     phase="total")
+                                if self.cache:
+                                    self.cache.store(url, body, resp.headers.get("ETag"),
+                                                     resp.headers.get("Last-Modified"))
+                                return body
+                            overloaded = resp.status == 429 or resp.status >= 500
+                            delay = self.retry.next_delay(host, attempt, status=resp.status,
+                                                          retry_after=resp.headers.get("Retry-After"))
+                            if delay is None:
+                                resp.raise_for_status()
+                            reason = f"HTTP {resp.status}"
+                    except aiohttp.ClientResponseError as e:
+                        logger.warning("Request failed: %s", e, extra={"url": url, "attempt": attempt})
+                        raise
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        self.metrics.inc("http_requests_total", status="error")
+                        overloaded = True
+                        delay = self.retry.next_delay(host, attempt, error=e)
+                        if delay is None:
+                            logger.warning("Request failed: %s", e, extra={"url": url, "attempt": attempt})
+                            raise
+                        reason = repr(e)
+            finally:
+                if limiter is not None:
+                    limiter.release(token, time.monotonic() - start, overloaded)
+            logger.info("Retrying %s in %.2fs after %s (attempt %d)", url, delay, reason, attempt,
+                        extra={"url": url, "attempt": attempt, "delay": round(delay, 3)})
+            self.metrics.inc("http_retries_total")
+            if bucket is not None:
+                bucket.pause(delay)
+            else:
+                await asyncio.sleep(delay)
 
     async def fetch_multi(self, paths: list) -> dict:
         """
@@ -74,22 +556,84 @@ class AsyncCollector:
         results = await asyncio.gather(*tasks, return_exceptions=True)
         return {p: r for p, r in zip(paths, results)}
 
+    async def robots_rules(self, url: Optional[str] = None) -> RobotsRules:
+        """
+        Return the robots.txt rules for a URL's site, fetching them when they
+        are not cached. Concurrent callers share one fetch per site.
+
+        Args:
+            url (Optional[str]): Absolute URL (defaults to base_url).
+
+        Returns:
+            RobotsRules: The rules.
+        """
+        url = url or self.base_url
+        rules = self.robots.get(url) if self.robots else None
+        if rules is not None:
+            return rules
+        key = origin(url)
+        load = self._robots_loads.get(key)
+        if load is None:
+            load = self._robots_loads[key] = asyncio.ensure_future(self._fetch_robots(url))
+            load.add_done_callback(lambda _: self._robots_loads.pop(key, None))
+        return await asyncio.shield(load)
+
+    async def _fetch_robots(self, url: str) -> RobotsRules:
+        try:
+            async with self.session.get(robots_url(url)) as resp:
+                status, text = resp.status, await resp.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("Could not fetch robots.txt, assuming allowed: %s", e, extra={"url": robots_url(url)})
+            status, text = None, ""
+        if self.robots is not None:
+            rules = self.robots.store(url, status, text)
+        else:
+            rules = RobotsRules.from_response(status, text)
+        host = urlparse(url).netloc
+        if rules.crawl_delay:
+            logger.info("Using the Crawl-delay of %s: %.2fs between requests", origin(url), rules.crawl_delay)
+            self._crawl_delays[host] = rules.crawl_delay
+            bucket = self._buckets.get(host)
+            if bucket is not None and bucket.rate > 1.0 / rules.crawl_delay:
+                bucket.rate, bucket.capacity = 1.0 / rules.crawl_delay, 1.0
+        return rules
+
+    async def sitemap_urls(self, max_sitemaps: int = 50) -> List[str]:
+        """
+        Collect the page URLs of the sitemaps named in robots.txt, following
+        sitemap indexes. Sitemaps outside base_url are skipped.
+
+        Args:
+            max_sitemaps (int): Most sitemap files fetched.
+
+        Returns:
+            List[str]: Page URLs, in sitemap order.
+        """
+        pending = list((await self.robots_rules()).sitemaps)
+        seen = set()
+        pages = []
+        while pending and len(seen) < max_sitemaps:
+            url = pending.pop(0)
+            if url in seen:
+                continue
+            seen.add(url)
+            if not url.startswith(self.base_url):
+                logger.warning("Skipping sitemap outside %s: %s", self.base_url, url)
+                continue
+            try:
+                found, nested = parse_sitemap(await self.fetch(url[len(self.base_url):]))
+            except Exception as e:
+                logger.warning("Failed to read sitemap %s: %s", url, e)
+                continue
+            pages.extend(found)
+            pending.extend(nested)
+        return pages
+
     async def check_robots_txt(self) -> bool:
         """
         Checks robots.txt compliance async.
 
         Returns:
-            bool: Allowed or not.
+            bool: True if base_url may be fetched.
         """
-        parsed = urlparse(self.base_url)
-        robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
-        try:
-            async with self.session.get(robots_url) as resp:
-                if resp.status != 200:
-                    return True
-                text = await resp.text()
-                if "Disallow: /" in text:
-                    return False
-                return True
-        except:
-            return True
\ No newline at end of file
+        return (await self.robots_rules()).allowed(self.base_url)
@@ -0,0 +1,241 @@
+"""
+async_crawler.py
+
+Pipelined catalogue crawler built on AsyncCollector.
+
+Listing pages and detail pages are fetched by separate worker pools joined
+by a bounded queue: product URLs found on a listing page are handed to the
+detail workers straight away, while later listing pages are still being
+downloaded. The collector's scheduler decides how fast requests go out.
+
+HTML parsing can be handed to an executor (normally a ProcessPoolExecutor)
+so BeautifulSoup never blocks the event loop. Fetched detail pages then pass
+through a second bounded queue to a pool of parse workers, which keeps
+fetching from running arbitrarily far ahead of parsing.
+
+With a CrawlJournal, listing pages and books finished by an interrupted run
+are taken from the journal instead of being fetched again.
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor
+from typing import AsyncIterator, Iterable, Optional
+from urllib.parse import urljoin
+
+from models.data_models import Book
+from scraper.async_collector import AsyncCollector
+from scraper.checkpoint import CrawlJournal
+from scraper.crawler import RecrawlIndex, build_book, parse_category, parse_listing_page, url_to_path
+from scraper.parser import DEFAULT_BACKEND
+from utils.metrics import NO_METRICS, Metrics
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class AsyncCrawler:
+    """
+    Concurrent catalogue crawler that overlaps listing and detail fetches.
+    """
+
+    def __init__(self, collector: AsyncCollector, follow_pagination: bool = True,
+                 follow_categories: bool = False, max_pages: Optional[int] = None,
+                 listing_workers: int = 2, detail_workers: Optional[int] = None,
+                 queue_size: int = 100, parser_backend: str = DEFAULT_BACKEND,
+                 parse_executor: Optional[Executor] = None, parse_workers: Optional[int] = None,
+                 index: Optional[RecrawlIndex] = None, journal: Optional[CrawlJournal] = None,
+                 metrics: Optional[Metrics] = None):
+        """
+        Initialize an AsyncCrawler.
+
+        Args:
+            collector (AsyncCollector): Open collector used for all requests.
+            follow_pagination (bool): Follow "next" links on listing pages.
+            follow_categories (bool): Also crawl category index pages.
+            max_pages (Optional[int]): Stop after this many listing pages.
+            listing_workers (int): Number of concurrent listing fetchers.
+            detail_workers (Optional[int]): Number of concurrent detail fetchers
+                (defaults to the collector's max_in_flight).
+            queue_size (int): Capacity of the listing -> detail queue and
+                of the queue of finished books awaiting the consumer.
+            parser_backend (str): Parser backend used for every page.
+            parse_executor (Optional[Executor]): Executor that runs HTML
+                parsing off the event loop; None parses inline.
+            parse_workers (Optional[int]): Number of parse jobs kept in flight
+                on the executor (defaults to the number of CPUs). The
+                fetch -> parse queue holds twice as many pages.
+            index (Optional[RecrawlIndex]): Results of a previous crawl;
+                unchanged products keep their category without a detail fetch.
+            journal (Optional[CrawlJournal]): Records finished listing pages
+                and books, and answers the ones finished by an earlier,
+                interrupted run.
+            metrics (Optional[Metrics]): Records parse time per page
+                (``parse_seconds``, including the executor round trip) and
+                the depth of the detail and parse queues (``queue_depth``).
+        """
+        self.collector = collector
+        self.follow_pagination = follow_pagination
+        self.follow_categories = follow_categories
+        self.max_pages = max_pages
+        self.listing_workers = listing_workers
+        self.detail_workers = detail_workers or collector.max_in_flight
+        self.queue_size = queue_size
+        self.parser_backend = parser_backend
+        self.parse_executor = parse_executor
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.index = index
+        self.journal = journal
+        self.metrics = metrics or NO_METRICS
+
+    async def crawl(self, start_path: str = "", seeds: Iterable[str] = ()) -> AsyncIterator[Book]:
+        """
+        Crawl the catalogue and yield books as soon as they are complete.
+
+        Args:
+            start_path (str): Listing path to start from.
+            seeds (Iterable[str]): More listing page URLs to queue up front,
+                e.g. from scraper.crawler.listing_seeds(); the listing
+                workers fetch them concurrently.
+
+        Yields:
+            Book: One book per unique product URL, in completion order.
+        """
+        base_url = self.collector.base_url
+        start_url = urljoin(base_url, start_path)
+        loop = asyncio.get_running_loop()
+        listing_queue: asyncio.Queue = asyncio.Queue()
+        detail_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        parse_queue: asyncio.Queue = asyncio.Queue(maxsize=2 * self.parse_workers)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        start_pages = list(dict.fromkeys([start_url, *seeds]))
+        seen_pages = set(start_pages)
+        seen_products = set()
+        pages_started = 0
+
+        async def parse(page, func, *args):
+            with self.metrics.timer("parse_seconds", page=page):
+                if self.parse_executor is None:
+                    return func(*args)
+                return await loop.run_in_executor(self.parse_executor, func, *args)
+
+        async def listing_worker():
+            nonlocal pages_started
+            while True:
+                page_url = await listing_queue.get()
+                try:
+                    if self.max_pages is not None and pages_started >= self.max_pages:
+                        continue
+                    pages_started += 1
+                    listing = self.journal.listing(page_url) if self.journal is not None else None
+                    if listing is None:
+                        try:
+                            html = await self.collector.fetch(url_to_path(base_url, page_url))
+                            listing = await parse("listing", parse_listing_page, html, page_url,
+                                                  self.parser_backend)
+                        except Exception as e:
+                            logger.warning("Failed to process listing page %s: %s", page_url, e)
+                            continue
+                        if self.journal is not None:
+                            self.journal.record_listing(page_url, *listing)
+                    entries, next_url, category_urls = listing
+
+                    links = []
+                    if self.follow_pagination and next_url:
+                        links.append(next_url)
+                    if self.follow_categories:
+                        links.extend(category_urls)
+                    for link in links:
+                        if link not in seen_pages:
+                            seen_pages.add(link)
+                            listing_queue.put_nowait(link)
+
+                    for entry in entries:
+                        if entry["url"] in seen_products:
+                            continue
+                        seen_products.add(entry["url"])
+                        book = self.journal.book(entry["url"]) if self.journal is not None else None
+                        if book is not None:
+                            await results.put(book)
+                            continue
+                        category = self.index.lookup(entry) if self.index is not None else None
+                        if category is not None:
+                            await results.put(build_book(entry, category))
+                        else:
+                            await detail_queue.put(entry)
+                finally:
+                    listing_queue.task_done()
+
+        async def detail_worker():
+            while True:
+                entry = await detail_queue.get()
+                if entry is None:
+                    return
+                self.metrics.observe("queue_depth", detail_queue.qsize(), queue="detail")
+                try:
+                    detail_html = await self.collector.fetch(url_to_path(base_url, entry["url"]))
+                except Exception as e:
+                    logger.warning("Failed to fetch detail page for %s at %s: %s",
+                                   entry["title"], entry["url"], e)
+                    detail_html = None
+                await parse_queue.put((entry, detail_html))
+
+        async def parse_worker():
+            while True:
+                item = await parse_queue.get()
+                if item is None:
+                    return
+                self.metrics.observe("queue_depth", parse_queue.qsize(), queue="parse")
+                entry, detail_html = item
+                category = "Unknown"
+                if detail_html is not None:
+                    try:
+                        category = await parse("detail", parse_category, detail_html, self.parser_backend)
+                    except Exception as e:
+                        logger.warning("Error parsing category for %s at %s: %s",
+                                       entry["title"], entry["url"], e)
+                logger.debug("Category for %s: %s", entry["title"], category,
+                             extra={"url": entry["url"], "category": category})
+                book = build_book(entry, category)
+                if self.journal is not None and detail_html is not None:
+                    self.journal.record_book(book)
+                await results.put(book)
+
+        listers = [asyncio.create_task(listing_worker()) for _ in range(self.listing_workers)]
+        fetchers = [asyncio.create_task(detail_worker()) for _ in range(self.detail_workers)]
+        parsers = [asyncio.create_task(parse_worker()) for _ in range(self.parse_workers)]
+
+        async def supervise():
+            try:
+                await listing_queue.join()
+                for _ in fetchers:
+                    await detail_queue.put(None)
+                await asyncio.gather(*fetchers)
+                for _ in parsers:
+                    await parse_queue.put(None)
+                await asyncio.gather(*parsers)
+            finally:
+                for task in listers + fetchers + parsers:
+                    task.cancel()
+                await results.put(_DONE)
+
+        for page_url in start_pages:
+            listing_queue.put_nowait(page_url)
+        supervisor = asyncio.create_task(supervise())
+        tasks = [supervisor, *listers, *fetchers, *parsers]
+        try:
+            while True:
+                item = await results.get()
+                if item is _DONE:
+                    break
+                yield item
+            await supervisor
+        finally:
+            # Also reached when the consumer stops early or raises and closes
+            # us: no worker may outlive the crawl and touch the session or
+            # journal after they are closed.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,225 @@
+"""
+cache.py
+
+Persistent HTTP response cache backed by SQLite.
+
+Bodies are stored zlib-compressed together with their ETag and
+Last-Modified validators. Entries younger than the TTL are served without
+a request; older ones are revalidated with If-None-Match /
+If-Modified-Since so an unchanged page costs a 304 instead of a full
+download. The store is kept under a size budget by evicting the least
+recently used entries.
+
+Lookups only note their access time in memory; the notes are written with
+the next store (or revalidation, or close), so a cache hit costs a SELECT
+and no commit. The total body size is kept in memory as well, so eviction
+scans the table only once the budget is exceeded.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, NamedTuple, Optional
+
+# Pending access times are written once this many have piled up, even
+# without a store.
+_TOUCH_BATCH = 512
+
+
+class CachedResponse(NamedTuple):
+    """
+    A cached page and its validators.
+    """
+    url: str
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+
+class ResponseCache:
+    """
+    On-disk response cache keyed by URL.
+    """
+
+    def __init__(self, path: str = "data/http_cache.sqlite", ttl: float = 0.0,
+                 max_bytes: int = 256 * 1024 * 1024, max_age: Optional[float] = None):
+        """
+        Initialize a ResponseCache.
+
+        Args:
+            path (str): SQLite database file (":memory:" for a throwaway cache).
+            ttl (float): Seconds an entry is served without revalidation.
+            max_bytes (int): Size budget for stored bodies (compressed).
+            max_age (Optional[float]): Drop entries not revalidated for this
+                many seconds, regardless of size.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY,"
+            " body BLOB NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " stored_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " size INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_stored ON responses (stored_at)")
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self._touched: Dict[str, float] = {}
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """
+        Look up a cached response and mark it as recently used.
+
+        Args:
+            url (str): Absolute URL.
+
+        Returns:
+            Optional[CachedResponse]: The entry, or None on a miss.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[url] = time.time()
+            if len(self._touched) >= _TOUCH_BATCH:
+                self._flush_touched()
+                self._conn.commit()
+        body, etag, last_modified, stored_at = row
+        return CachedResponse(url, zlib.decompress(body).decode("utf-8"), etag, last_modified, stored_at)
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        """
+        Check whether an entry can be served without revalidation.
+
+        Args:
+            entry (CachedResponse): Cached entry.
+
+        Returns:
+            bool: True if the entry is younger than the TTL.
+        """
+        return time.time() - entry.stored_at < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CachedResponse]) -> dict:
+        """
+        Build revalidation headers for a cached entry.
+
+        Args:
+            entry (Optional[CachedResponse]): Cached entry, if any.
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since headers (may be empty).
+        """
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(self, url: str, body: str, etag: Optional[str] = None,
+              last_modified: Optional[str] = None):
+        """
+        Store or replace a response, then enforce the size budget.
+
+        Args:
+            url (str): Absolute URL.
+            body (str): Decoded response body.
+            etag (Optional[str]): ETag response header.
+            last_modified (Optional[str]): Last-Modified response header.
+        """
+        blob = zlib.compress(body.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._flush_touched()
+            self._touched.pop(url, None)
+            old = self._conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (url, body, etag, last_modified, stored_at, accessed_at, size)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, blob, etag, last_modified, now, now, len(blob))
+            )
+            self._total += len(blob) - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def mark_revalidated(self, url: str):
+        """
+        Restart the TTL of an entry after the server answered 304.
+
+        Args:
+            url (str): Absolute URL.
+        """
+        now = time.time()
+        with self._lock:
+            self._flush_touched()
+            self._touched.pop(url, None)
+            self._conn.execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?", (now, now, url)
+            )
+            self._conn.commit()
+
+    def size(self) -> int:
+        """
+        Returns:
+            int: Total size of stored (compressed) bodies in bytes.
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _flush_touched(self):
+        # Write the access times noted by get(); committed by the caller.
+        if self._touched:
+            self._conn.executemany("UPDATE responses SET accessed_at = ? WHERE url = ?",
+                                   [(at, url) for url, at in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self):
+        if self.max_age is not None:
+            cutoff = time.time() - self.max_age
+            expired = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses WHERE stored_at < ?", (cutoff,)
+            ).fetchone()[0]
+            if expired:
+                self._conn.execute("DELETE FROM responses WHERE stored_at < ?", (cutoff,))
+                self._total -= expired
+        if self._total <= self.max_bytes:
+            return
+        excess = self._total - self.max_bytes
+        victims = []
+        for url, size in self._conn.execute("SELECT url, size FROM responses ORDER BY accessed_at"):
+            victims.append((url,))
+            self._total -= size
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE url = ?", victims)
+
+    def close(self):
+        """
+        Write pending access times and close the database connection.
+        """
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,204 @@
+"""
+checkpoint.py
+
+Crawl journal for resuming an interrupted crawl.
+
+The crawlers append one compact JSON line per finished unit of work: a
+listing page together with what was parsed from it (its product entries and
+the listing pages it links to), or a book whose detail page was fetched.
+Lines are buffered and forced to disk at periodic checkpoints. A resumed
+crawl walks the catalogue again from the start, but answers every journaled
+listing page and book from the journal, so only unfinished pages are
+fetched. Failed fetches are not journaled and are retried on resume.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from models.data_models import Book
+
+logger = logging.getLogger(__name__)
+
+ListingResult = Tuple[List[dict], Optional[str], List[str]]
+
+
+class CrawlJournal:
+    """
+    Append-only JSON Lines journal of completed listing pages and books.
+
+    Used as a context manager, the journal is deleted when the block
+    completes (the crawl finished, nothing to resume) and flushed and kept
+    when it raises, including on KeyboardInterrupt or cancellation.
+
+    Attributes:
+        replayed_pages (int): Listing pages answered from the journal.
+        replayed_books (int): Books answered from the journal.
+    """
+
+    def __init__(self, path: str, resume: bool = False, flush_every: int = 100,
+                 flush_interval: float = 5.0):
+        """
+        Open a journal.
+
+        Args:
+            path (str): Journal file.
+            resume (bool): Load an existing journal and append to it; False
+                starts an empty one.
+            flush_every (int): Checkpoint after this many new records.
+            flush_interval (float): Checkpoint when this many seconds have
+                passed since the last one (checked on each new record).
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._listings: Dict[str, ListingResult] = {}
+        self._books: Dict[str, Book] = {}
+        self.replayed_pages = 0
+        self.replayed_books = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if resume and os.path.exists(path):
+            self._load()
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def _load(self):
+        end = 0
+        missing_newline = False
+        with open(self.path, "rb") as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    # Normally a line torn by the crash; anything after it is
+                    # still usable.
+                    logger.warning("Skipping unreadable line %d of %s", number, self.path)
+                    if line.endswith(b"\n"):
+                        end += len(line)
+                    continue
+                end += len(line)
+                # A complete last record whose newline was lost.
+                missing_newline = not line.endswith(b"\n")
+                if "l" in record:
+                    self._listings[record["l"]] = (record["e"], record["n"], record["c"])
+                elif "b" in record:
+                    book = Book(**record["b"])
+                    self._books[book.url] = book
+        # Cut off a torn last line (or end a complete one), so new records
+        # start on a line of their own.
+        if end < os.path.getsize(self.path):
+            os.truncate(self.path, end)
+        elif missing_newline:
+            with open(self.path, "ab") as f:
+                f.write(b"\n")
+        logger.info("Resuming from %s: %d listing pages and %d books already done",
+                    self.path, len(self._listings), len(self._books))
+
+    @property
+    def pages(self) -> int:
+        """
+        int: Listing pages in the journal.
+        """
+        return len(self._listings)
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    def listing(self, url: str) -> Optional[ListingResult]:
+        """
+        Look up a journaled listing page.
+
+        Args:
+            url (str): Absolute URL of the listing page.
+
+        Returns:
+            Optional[ListingResult]: (entries, next_url, category_urls) as
+            returned by parse_listing_page, or None if the page is not done.
+        """
+        result = self._listings.get(url)
+        if result is not None:
+            self.replayed_pages += 1
+        return result
+
+    def book(self, url: str) -> Optional[Book]:
+        """
+        Look up a journaled book.
+
+        Args:
+            url (str): Absolute URL of the product's detail page.
+
+        Returns:
+            Optional[Book]: The book, or None if its detail page is not done.
+        """
+        book = self._books.get(url)
+        if book is not None:
+            self.replayed_books += 1
+        return book
+
+    def record_listing(self, url: str, entries: List[dict], next_url: Optional[str],
+                       category_urls: List[str]):
+        """
+        Journal a processed listing page.
+
+        Args:
+            url (str): Absolute URL of the listing page.
+            entries (List[dict]): Product entries found on it.
+            next_url (Optional[str]): Next page link.
+            category_urls (List[str]): Category index links.
+        """
+        self._listings[url] = (entries, next_url, category_urls)
+        self._append({"l": url, "e": entries, "n": next_url, "c": category_urls})
+
+    def record_book(self, book: Book):
+        """
+        Journal a book whose detail page was fetched.
+
+        Args:
+            book (Book): The book.
+        """
+        self._books[book.url] = book
+        self._append({"b": book.to_dict()})
+
+    def _append(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._pending += 1
+        if self._pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """
+        Force every record written so far to disk.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """
+        Checkpoint and close the journal, keeping it for a later resume.
+        """
+        if not self._file.closed:
+            self.checkpoint()
+            self._file.close()
+
+    def finish(self):
+        """
+        Close and delete the journal once the crawl has completed.
+        """
+        self._file.close()
+        os.remove(self.path)
+
+    def __enter__(self) -> "CrawlJournal":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        else:
+            self.close()
@@ -3,47 +3,169 @@ collector.py
 
 Handles HTTP requests with headers, respects robots.txt, 
 and implements basic rate limiting and error handling.
+Given a RobotsCache, every URL is checked against the site's robots.txt
+rules before it is requested, and its Crawl-delay raises the request
+interval.
+Transient failures are retried according to a RetryPolicy.
+
+fetch_many() runs fetches on a thread pool. The threads share one
+requests.Session whose HTTPAdapter pool holds a connection per worker, and
+one RateLimiter that hands out request slots under a lock, so the request
+rate stays within ``delay`` however many threads are running.
+
+Given a utils.metrics.Metrics, each request's time to first byte, download
+time, size and status are recorded (requests exposes no DNS/connect hooks).
 """
 
+import logging
 import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 
+from requests.adapters import HTTPAdapter
+
+from scraper.cache import ResponseCache
+from scraper.retry import RetryPolicy
+from scraper.robots import (
+    USER_AGENT, RobotsCache, RobotsDisallowed, RobotsRules, origin, parse_sitemap, robots_url
+)
+from utils.metrics import NO_METRICS, Metrics
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds, matching the async collector's
+# DEFAULT_TIMEOUT: fail fast on connect, give slow pages time to arrive.
+DEFAULT_TIMEOUT = (10.0, 30.0)
+
+
+class RateLimiter:
+    """
+    Thread-safe request spacing.
+
+    Each caller reserves the next free slot (at least ``delay`` after the
+    previous one) while holding a lock, then sleeps outside the lock until
+    its slot, so concurrent threads are released one interval apart.
+    """
+
+    def __init__(self, delay: float):
+        """
+        Initialize a RateLimiter.
+
+        Args:
+            delay (float): Minimum interval between requests in seconds.
+        """
+        self.delay = delay
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take the next request slot.
+
+        Returns:
+            float: Seconds to wait before sending the request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.delay
+            return slot - now
+
+    def wait(self):
+        """
+        Block until the caller may send its request.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """
+        Hold back every later request by at least ``seconds``.
+
+        Args:
+            seconds (float): Pause length.
+        """
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
 
 class Collector:
     """
     Collector class to fetch web pages with respect to request policies.
     """
 
-    def __init__(self, base_url: str, delay: float = 1.0):
+    def __init__(self, base_url: str, delay: float = 1.0, cache: Optional[ResponseCache] = None,
+                 retry: Optional[RetryPolicy] = None, pool_size: int = 10,
+                 metrics: Optional[Metrics] = None, robots: Optional[RobotsCache] = None,
+                 timeout: Optional[Tuple[float, float]] = None):
         """
         Initialize a collector.
 
         Args:
             base_url (str): The base URL of the website.
             delay (float): Delay between requests in seconds.
+            cache (Optional[ResponseCache]): Response cache used to skip or
+                revalidate repeat downloads.
+            retry (Optional[RetryPolicy]): Retry policy for transient
+                failures (defaults to RetryPolicy()).
+            pool_size (int): Connections kept per host; also the default
+                number of fetch_many workers.
+            metrics (Optional[Metrics]): Records per-request timings,
+                statuses and sizes.
+            robots (Optional[RobotsCache]): robots.txt rules; fetch() refuses
+                URLs they disallow. None skips the per-URL check.
+            timeout (Optional[Tuple[float, float]]): (connect, read)
+                timeouts in seconds for every request (defaults to
+                DEFAULT_TIMEOUT); a timeout is retried like other transient
+                failures.
         """
         self.base_url = base_url
         self.delay = delay
-        self.last_request_time = None
+        self.cache = cache
+        self.retry = retry or RetryPolicy()
+        self.pool_size = pool_size
+        self.metrics = metrics or NO_METRICS
+        self.robots = robots
+        self.timeout = timeout or DEFAULT_TIMEOUT
+        self.limiter = RateLimiter(delay)
         self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         self.session.headers.update({
-            "User-Agent": "MidtermScraperBot/1.0 (+https://example.com/bot)"
+            "User-Agent": USER_AGENT
         })
+        self._robots_lock = threading.Lock()
 
     def respect_rate_limit(self):
         """
-        Enforces delay between requests to avoid overwhelming the server.
+        Enforces delay between requests to avoid overwhelming the server,
+        and any pause requested with pause(). Safe to call from several threads.
+        """
+        self.limiter.wait()
+
+    def pause(self, seconds: float):
+        """
+        Hold back the next request by at least ``seconds``.
+
+        Args:
+            seconds (float): Pause length.
         """
-        if self.last_request_time is not None:
-            elapsed = time.time() - self.last_request_time
-            if elapsed < self.delay:
-                time.sleep(self.delay - elapsed)
+        self.limiter.pause(seconds)
 
     def fetch(self, path: str = '') -> str:
         """
         Fetch a page from the website.
 
+        With a cache configured, fresh entries are returned without a
+        request and stale ones are revalidated; a 304 serves the cached body.
+        Transient failures are retried after pausing the rate limiter for
+        the policy's delay.
+
         Args:
             path (str): URL path to fetch (optional).
 
@@ -52,37 +174,176 @@ class Collector:
 
         Raises:
             requests.RequestException: If a network error occurs.
+            RobotsDisallowed: If robots.txt disallows the URL.
         """
-        self.respect_rate_limit()
         url = self.base_url + path
+        cached = self.cache.get(url) if self.cache else None
+        if cached is not None and self.cache.is_fresh(cached):
+            self.metrics.inc("cache_hits_total", result="fresh")
+            return cached.body
+        if self.robots is not None and not self.robots_rules(url).allowed(url):
+            self.metrics.inc("robots_disallowed_total")
+            raise RobotsDisallowed(url)
+        host = urlparse(url).netloc
+        attempt = 0
+        while True:
+            attempt += 1
+            self.respect_rate_limit()
+            self.retry.record_request(host)
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=ResponseCache.conditional_headers(cached),
+                                            timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.metrics.inc("http_requests_total", status="error")
+                delay = self.retry.next_delay(host, attempt, error=e)
+                if delay is None:
+                    logger.warning("Request failed: %s", e, extra={"url": url, "attempt": attempt})
+                    raise
+                reason = repr(e)
+            else:
+                if self.metrics is not NO_METRICS:
+                    self.record_response(response, time.perf_counter() - start)
+                if response.status_code == 304 and cached is not None:
+                    self.cache.mark_revalidated(url)
+                    self.metrics.inc("cache_hits_total", result="revalidated")
+                    return cached.body
+                if response.status_code < 400:
+                    if self.cache:
+                        self.cache.store(url, response.text, response.headers.get("ETag"),
+                                         response.headers.get("Last-Modified"))
+                    return response.text
+                delay = self.retry.next_delay(host, attempt, status=response.status_code,
+                                              retry_after=response.headers.get("Retry-After"))
+                if delay is None:
+                    try:
+                        response.raise_for_status()
+                    except requests.RequestException as e:
+                        logger.warning("Request failed: %s", e, extra={"url": url, "attempt": attempt})
+                        raise
+                reason = f"HTTP {response.status_code}"
+            logger.info("Retrying %s in %.2fs after %s (attempt %d)", url, delay, reason, attempt,
+                        extra={"url": url, "attempt": attempt, "delay": round(delay, 3)})
+            self.metrics.inc("http_retries_total")
+            self.pause(delay)
+
+    def record_response(self, response: requests.Response, elapsed: float):
+        """
+        Record the status, size and timings of a response.
+
+        Args:
+            response (requests.Response): Response with its body read.
+            elapsed (float): Seconds from sending the request to having the body.
+        """
+        ttfb = response.elapsed.total_seconds()
+        self.metrics.inc("http_requests_total", status=response.status_code)
+        self.metrics.observe("http_request_seconds", ttfb, phase="ttfb")
+        self.metrics.observe("http_request_seconds", max(0.0, elapsed - ttfb), phase="download")
+        self.metrics.observe("http_request_seconds", elapsed, phase="total")
+        self.metrics.observe("http_response_bytes", len(response.content))
+
+    def fetch_many(self, paths: Iterable[str], workers: Optional[int] = None,
+                   ordered: bool = True) -> Iterator[Tuple[str, Union[str, Exception]]]:
+        """
+        Fetch several pages on a thread pool.
+
+        Args:
+            paths (Iterable[str]): URL paths to fetch.
+            workers (Optional[int]): Number of threads (defaults to pool_size).
+            ordered (bool): Yield results in the order of ``paths``; False
+                yields each result as soon as it completes.
+
+        Yields:
+            Tuple[str, Union[str, Exception]]: The path and its HTML, or the
+            exception that made the fetch fail.
+        """
+        executor = ThreadPoolExecutor(max_workers=workers or self.pool_size)
+        try:
+            futures = {executor.submit(self.fetch, path): path for path in paths}
+            pending = futures if ordered else as_completed(futures)
+            for future in pending:
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    yield futures[future], e
+        finally:
+            # Drop queued fetches if the caller stops iterating early.
+            executor.shutdown(cancel_futures=True)
+
+    def robots_rules(self, url: Optional[str] = None) -> RobotsRules:
+        """
+        Return the robots.txt rules for a URL's site, fetching them when they
+        are not cached. A Crawl-delay longer than the current request
+        interval becomes the new interval.
+
+        Args:
+            url (Optional[str]): Absolute URL (defaults to base_url).
+
+        Returns:
+            RobotsRules: The rules.
+        """
+        url = url or self.base_url
+        rules = self.robots.get(url) if self.robots else None
+        if rules is not None:
+            return rules
+        with self._robots_lock:
+            rules = self.robots.get(url) if self.robots else None
+            if rules is None:
+                rules = self._fetch_robots(url)
+        return rules
+
+    def _fetch_robots(self, url: str) -> RobotsRules:
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            self.last_request_time = time.time()
-            return response.text
+            response = self.session.get(robots_url(url), timeout=self.timeout)
+            status, text = response.status_code, response.text
         except requests.RequestException as e:
-            print(f"Request failed: {e}")
-            raise
+            logger.warning("Could not fetch robots.txt, assuming allowed: %s", e, extra={"url": robots_url(url)})
+            status, text = None, ""
+        if self.robots is not None:
+            rules = self.robots.store(url, status, text)
+        else:
+            rules = RobotsRules.from_response(status, text)
+        if rules.crawl_delay and rules.crawl_delay > self.limiter.delay:
+            logger.info("Using the Crawl-delay of %s: %.2fs between requests", origin(url), rules.crawl_delay)
+            self.limiter.delay = rules.crawl_delay
+        return rules
+
+    def sitemap_urls(self, max_sitemaps: int = 50) -> List[str]:
+        """
+        Collect the page URLs of the sitemaps named in robots.txt, following
+        sitemap indexes. Sitemaps outside base_url are skipped.
+
+        Args:
+            max_sitemaps (int): Most sitemap files fetched.
+
+        Returns:
+            List[str]: Page URLs, in sitemap order.
+        """
+        pending = list(self.robots_rules().sitemaps)
+        seen = set()
+        pages = []
+        while pending and len(seen) < max_sitemaps:
+            url = pending.pop(0)
+            if url in seen:
+                continue
+            seen.add(url)
+            if not url.startswith(self.base_url):
+                logger.warning("Skipping sitemap outside %s: %s", self.base_url, url)
+                continue
+            try:
+                found, nested = parse_sitemap(self.fetch(url[len(self.base_url):]))
+            except Exception as e:
+                logger.warning("Failed to read sitemap %s: %s", url, e)
+                continue
+            pages.extend(found)
+            pending.extend(nested)
+        return pages
 
     def check_robots_txt(self) -> bool:
         """
         Checks robots.txt for scraping permission.
 
         Returns:
-            bool: True if scraping is allowed, False otherwise.
+            bool: True if base_url may be fetched, False otherwise.
         """
-        parsed = urlparse(self.base_url)
-        robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
-        try:
-            response = self.session.get(robots_url)
-            if response.status_code != 200:
-                # If no robots.txt, assume allowed
-                return True
-            content = response.text.lower()
-            # Simplisitc check for Disallow
-            if "disallow: /" in content:
-                return False
-            return True
-        except requests.RequestException:
-            # Assume allowed if can't fetch robots.txt
-            return True
\ No newline at end of file
+        return self.robots_rules().allowed(self.base_url)
@@ -0,0 +1,353 @@
+"""
+crawler.py
+
+Walks the book catalogue with the synchronous Collector: follows listing
+pagination (and optionally category index pages) and fetches each
+product's detail page as soon as it is discovered. Given a RecrawlIndex from
+a previous run, detail pages of unchanged products are skipped; given a
+CrawlJournal, pages finished before an interruption are not fetched again.
+Listing pages found in a sitemap can be passed as seeds, so they are queued
+up front rather than discovered one "next" link at a time.
+"""
+
+import logging
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+from models.data_models import Book, parse_availability, parse_price
+from scraper.checkpoint import CrawlJournal
+from scraper.collector import Collector
+from scraper.parser import DEFAULT_BACKEND, Parser
+from utils.metrics import NO_METRICS, Metrics
+
+logger = logging.getLogger(__name__)
+
+
+def url_to_path(base_url: str, url: str) -> str:
+    """
+    Convert an absolute URL into the suffix expected by the collectors.
+
+    Args:
+        base_url (str): Collector base URL.
+        url (str): Absolute URL on the same site.
+
+    Returns:
+        str: Path relative to base_url, without a leading slash.
+    """
+    if url.startswith(base_url):
+        return url[len(base_url):]
+    return urlparse(url).path.lstrip('/')
+
+
+# Catalogue and category listing pages, relative to the site root.
+LISTING_PATH = re.compile(r"(?:index\.html)?|catalogue/page-\d+\.html")
+CATEGORY_PATH = re.compile(r"catalogue/category/books(?:_\d+|/[^/]+)/(?:index|page-\d+)\.html")
+
+
+def listing_seeds(base_url: str, urls: Iterable[str], follow_categories: bool = False) -> List[str]:
+    """
+    Pick the listing pages out of a list of site URLs, e.g. from a sitemap.
+
+    Detail pages are left out: books are built from the listing entries, so
+    products are still reached through the listing pages.
+
+    Args:
+        base_url (str): Collector base URL.
+        urls (Iterable[str]): Absolute URLs.
+        follow_categories (bool): Also keep category listing pages.
+
+    Returns:
+        List[str]: Listing page URLs under base_url, without duplicates.
+    """
+    seeds = []
+    for url in dict.fromkeys(urls):
+        if not url.startswith(base_url):
+            continue
+        path = url_to_path(base_url, url)
+        if LISTING_PATH.fullmatch(path) or (follow_categories and CATEGORY_PATH.fullmatch(path)):
+            seeds.append(url)
+    return seeds
+
+
+def parse_listing_page(html: str, page_url: str,
+                       backend: str = DEFAULT_BACKEND) -> Tuple[List[dict], Optional[str], List[str]]:
+    """
+    Extract product entries and outgoing listing links from a listing page.
+
+    Args:
+        html (str): Listing page HTML.
+        page_url (str): Absolute URL the page was fetched from.
+        backend (str): Parser backend.
+
+    Returns:
+        Tuple[List[dict], Optional[str], List[str]]: Product entries
+        (title, price, url, availability), absolute URL of the next page
+        (or None), and absolute URLs of category index pages.
+    """
+    parser = Parser(html, backend=backend)
+    entries = []
+    for record in parser.iter_products():
+        if not record["url"]:
+            continue
+        record["url"] = urljoin(page_url, record["url"])
+        entries.append(record)
+    next_link = parser.get_next_page_link()
+    next_url = urljoin(page_url, next_link) if next_link else None
+    category_urls = [urljoin(page_url, href) for href in parser.get_category_links()]
+    return entries, next_url, category_urls
+
+
+def parse_category(html: str, backend: str = DEFAULT_BACKEND) -> str:
+    """
+    Extract the category name from a detail page.
+
+    Args:
+        html (str): Detail page HTML.
+        backend (str): Parser backend.
+
+    Returns:
+        str: Category name, or "Unknown" when it cannot be found.
+    """
+    return Parser(html, backend=backend, detail_only=True).get_category_name() or "Unknown"
+
+
+def build_book(entry: dict, category: str) -> Book:
+    """
+    Create a Book from a listing entry and its detail-page category.
+
+    Args:
+        entry (dict): Listing entry produced by parse_listing_page.
+        category (str): Category name.
+
+    Returns:
+        Book: The assembled book.
+    """
+    return Book(
+        title=entry["title"],
+        price=entry["price"],
+        url=entry["url"],
+        availability=entry["availability"],
+        category=category
+    )
+
+
+def fingerprint(title: str, price: str, availability: str) -> tuple:
+    """
+    Summarize the listing-page data of a product.
+
+    Prices and availability are compared in their parsed form, so cosmetic
+    differences such as a mis-decoded currency sign do not count as changes.
+
+    Args:
+        title (str): Product title.
+        price (str): Price text.
+        availability (str): Availability text.
+
+    Returns:
+        tuple: Hashable fingerprint.
+    """
+    return (title, parse_price(price), parse_availability(availability))
+
+
+class RecrawlIndex:
+    """
+    Categories from a previous crawl, keyed by product URL.
+
+    A crawler given an index skips the detail page of every product whose
+    listing fingerprint is unchanged and reuses the stored category instead.
+
+    Attributes:
+        reused (int): Lookups answered from the index.
+        missed (int): Lookups for new or changed products.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[tuple, str]] = {}
+        self.reused = 0
+        self.missed = 0
+
+    @classmethod
+    def from_books(cls, books: Iterable[Book]) -> "RecrawlIndex":
+        """
+        Build an index from previously scraped books.
+
+        Args:
+            books (Iterable[Book]): Books from the last run, e.g. from
+                utils.file_handler.iter_books_from_file.
+
+        Returns:
+            RecrawlIndex: The index.
+        """
+        index = cls()
+        for book in books:
+            index.add(book)
+        return index
+
+    def add(self, book: Book):
+        """
+        Remember a book. Books without a known category are not indexed,
+        so their detail page is fetched again.
+
+        Args:
+            book (Book): Book to remember.
+        """
+        if book.category and book.category != "Unknown":
+            self._entries[book.url] = (fingerprint(book.title, book.price, book.availability), book.category)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, entry: dict) -> Optional[str]:
+        """
+        Find the stored category of an unchanged product.
+
+        Args:
+            entry (dict): Listing entry produced by parse_listing_page.
+
+        Returns:
+            Optional[str]: The stored category, or None when the product is
+            new or its title, price or availability changed.
+        """
+        stored = self._entries.get(entry["url"])
+        if stored is not None and stored[0] == fingerprint(entry["title"], entry["price"], entry["availability"]):
+            self.reused += 1
+            return stored[1]
+        self.missed += 1
+        return None
+
+
+class Crawler:
+    """
+    Sequential catalogue crawler built on Collector.
+    """
+
+    def __init__(self, collector: Collector, follow_pagination: bool = True,
+                 follow_categories: bool = False, max_pages: Optional[int] = None,
+                 parser_backend: str = DEFAULT_BACKEND, index: Optional[RecrawlIndex] = None,
+                 detail_workers: int = 1, journal: Optional[CrawlJournal] = None,
+                 metrics: Optional[Metrics] = None):
+        """
+        Initialize a Crawler.
+
+        Args:
+            collector (Collector): Collector used for all requests.
+            follow_pagination (bool): Follow "next" links on listing pages.
+            follow_categories (bool): Also crawl category index pages.
+            max_pages (Optional[int]): Stop after this many listing pages.
+            parser_backend (str): Parser backend used for every page.
+            index (Optional[RecrawlIndex]): Results of a previous crawl;
+                unchanged products keep their category without a detail fetch.
+            detail_workers (int): Threads fetching the detail pages of each
+                listing page through Collector.fetch_many; 1 fetches them
+                one after another.
+            journal (Optional[CrawlJournal]): Records finished listing pages
+                and books, and answers the ones finished by an earlier,
+                interrupted run.
+            metrics (Optional[Metrics]): Records parse time per page
+                (``parse_seconds``).
+        """
+        self.collector = collector
+        self.follow_pagination = follow_pagination
+        self.follow_categories = follow_categories
+        self.max_pages = max_pages
+        self.parser_backend = parser_backend
+        self.index = index
+        self.detail_workers = detail_workers
+        self.journal = journal
+        self.metrics = metrics or NO_METRICS
+
+    def crawl(self, start_path: str = "", seeds: Iterable[str] = ()) -> Iterator[Book]:
+        """
+        Crawl listing pages and yield books as their detail pages are fetched.
+
+        Args:
+            start_path (str): Listing path to start from.
+            seeds (Iterable[str]): More listing page URLs to queue up front,
+                e.g. from listing_seeds().
+
+        Yields:
+            Book: One book per unique product URL.
+        """
+        base_url = self.collector.base_url
+        start_url = urljoin(base_url, start_path)
+        pending = deque(dict.fromkeys([start_url, *seeds]))
+        seen_pages = set(pending)
+        seen_products = set()
+        pages_fetched = 0
+
+        while pending:
+            if self.max_pages is not None and pages_fetched >= self.max_pages:
+                break
+            page_url = pending.popleft()
+            pages_fetched += 1
+            listing = self.journal.listing(page_url) if self.journal is not None else None
+            if listing is None:
+                try:
+                    html = self.collector.fetch(url_to_path(base_url, page_url))
+                    with self.metrics.timer("parse_seconds", page="listing"):
+                        listing = parse_listing_page(html, page_url, self.parser_backend)
+                except Exception as e:
+                    logger.warning("Failed to process listing page %s: %s", page_url, e)
+                    continue
+                if self.journal is not None:
+                    self.journal.record_listing(page_url, *listing)
+            entries, next_url, category_urls = listing
+
+            links = []
+            if self.follow_pagination and next_url:
+                links.append(next_url)
+            if self.follow_categories:
+                links.extend(category_urls)
+            for link in links:
+                if link not in seen_pages:
+                    seen_pages.add(link)
+                    pending.append(link)
+
+            to_fetch = []
+            for entry in entries:
+                if entry["url"] in seen_products:
+                    continue
+                seen_products.add(entry["url"])
+                book = self.journal.book(entry["url"]) if self.journal is not None else None
+                if book is not None:
+                    yield book
+                    continue
+                category = self.index.lookup(entry) if self.index is not None else None
+                if category is not None:
+                    yield build_book(entry, category)
+                else:
+                    to_fetch.append(entry)
+
+            for entry, detail_html in zip(to_fetch, self._fetch_details(to_fetch)):
+                category = "Unknown"
+                if isinstance(detail_html, Exception):
+                    logger.warning("Failed to fetch detail page for %s at %s: %s",
+                                   entry["title"], entry["url"], detail_html)
+                else:
+                    try:
+                        with self.metrics.timer("parse_seconds", page="detail"):
+                            category = parse_category(detail_html, self.parser_backend)
+                    except Exception as e:
+                        logger.warning("Error parsing category for %s at %s: %s",
+                                       entry["title"], entry["url"], e)
+                logger.debug("Category for %s: %s", entry["title"], category,
+                             extra={"url": entry["url"], "category": category})
+                book = build_book(entry, category)
+                if self.journal is not None and not isinstance(detail_html, Exception):
+                    self.journal.record_book(book)
+                yield book
+
+    def _fetch_details(self, entries: List[dict]) -> Iterator[object]:
+        # Detail page HTML (or the exception raised) for each entry, in order.
+        paths = [url_to_path(self.collector.base_url, entry["url"]) for entry in entries]
+        if self.detail_workers > 1 and len(paths) > 1:
+            for _, result in self.collector.fetch_many(paths, workers=self.detail_workers):
+                yield result
+            return
+        for path in paths:
+            try:
+                yield self.collector.fetch(path)
+            except Exception as e:
+                yield e
@@ -0,0 +1,216 @@
+"""
+frontier.py
+
+Crawl frontier shared between processes, backed by SQLite.
+
+Every URL is stored once (the URL is the primary key, so discovering a page
+twice is a no-op) together with its kind and an optional JSON payload.
+Workers atomically claim batches of pending URLs, then mark them done or
+failed. Live workers refresh their claims with heartbeat(); claims of a
+worker that died stop being refreshed and are handed out again once they
+are older than a timeout, so a crash never leaves the crawl waiting
+forever. Only the current owner of a claim can complete it, so a URL that
+was handed out again is never finished twice.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+PENDING, CLAIMED, DONE, FAILED = range(4)
+
+# Claim order: listing pages first, so new work is discovered early.
+KIND_PRIORITY = {"listing": 0, "detail": 1}
+
+
+class FrontierItem(NamedTuple):
+    """
+    A claimed URL.
+    """
+    url: str
+    kind: str
+    payload: Optional[dict]
+
+
+class Frontier:
+    """
+    SQLite-backed work queue; every process opens its own Frontier on the same file.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        """
+        Open (or create) a frontier.
+
+        Args:
+            path (str): SQLite database file shared by all workers.
+            timeout (float): Seconds to wait for another process's lock.
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly where needed.
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            " url TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " priority INTEGER NOT NULL,"
+            " payload TEXT,"
+            " state INTEGER NOT NULL DEFAULT 0,"
+            " owner INTEGER,"
+            " claimed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS frontier_state ON frontier (state, priority)")
+
+    def add(self, url: str, kind: str, payload: Optional[dict] = None) -> bool:
+        """
+        Queue a URL unless it has been seen before.
+
+        Args:
+            url (str): Absolute URL.
+            kind (str): "listing" or "detail".
+            payload (Optional[dict]): JSON-serializable data for the worker.
+
+        Returns:
+            bool: True if the URL was new.
+        """
+        return self.add_many([(url, kind, payload)]) == 1
+
+    def add_many(self, items: Iterable[Tuple[str, str, Optional[dict]]]) -> int:
+        """
+        Queue several URLs in one transaction, skipping known ones.
+
+        Args:
+            items (Iterable[Tuple[str, str, Optional[dict]]]): (url, kind, payload) triples.
+
+        Returns:
+            int: Number of new URLs.
+        """
+        rows = [(url, kind, KIND_PRIORITY.get(kind, 0), None if payload is None else json.dumps(payload))
+                for url, kind, payload in items]
+        if not rows:
+            return 0
+        before = self._conn.total_changes
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO frontier (url, kind, priority, payload) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return self._conn.total_changes - before
+
+    def claim(self, owner: int, limit: int) -> List[FrontierItem]:
+        """
+        Atomically take up to ``limit`` pending URLs.
+
+        Args:
+            owner (int): Worker id recorded with the claim.
+            limit (int): Maximum number of URLs.
+
+        Returns:
+            List[FrontierItem]: Claimed URLs (empty if nothing is pending).
+        """
+        if limit <= 0:
+            return []
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._conn.execute(
+                "SELECT url, kind, payload FROM frontier WHERE state = ? ORDER BY priority, rowid LIMIT ?",
+                (PENDING, limit)
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE frontier SET state = ?, owner = ?, claimed_at = ? WHERE url = ?",
+                [(CLAIMED, owner, time.time(), url) for url, _, _ in rows]
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return [FrontierItem(url, kind, None if payload is None else json.loads(payload))
+                for url, kind, payload in rows]
+
+    def complete(self, url: str, owner: int, failed: bool = False) -> bool:
+        """
+        Mark a claimed URL as finished.
+
+        Args:
+            url (str): The URL.
+            owner (int): Worker id the URL was claimed by.
+            failed (bool): Record it as failed instead of done.
+
+        Returns:
+            bool: False if the worker no longer owns the claim (it was
+            requeued as stale), in which case nothing is changed and the
+            result should be discarded.
+        """
+        cursor = self._conn.execute(
+            "UPDATE frontier SET state = ? WHERE url = ? AND state = ? AND owner = ?",
+            (FAILED if failed else DONE, url, CLAIMED, owner)
+        )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, owner: int) -> int:
+        """
+        Refresh the claim time of every URL a live worker holds, so claims
+        waiting behind the rate limit are not mistaken for a dead worker's.
+
+        Args:
+            owner (int): Worker id.
+
+        Returns:
+            int: Number of claims refreshed.
+        """
+        cursor = self._conn.execute(
+            "UPDATE frontier SET claimed_at = ? WHERE state = ? AND owner = ?", (time.time(), CLAIMED, owner)
+        )
+        return cursor.rowcount
+
+    def requeue_stale(self, older_than: float) -> int:
+        """
+        Return claims older than ``older_than`` seconds to the queue.
+
+        Args:
+            older_than (float): Claim age after which the owner is presumed dead.
+
+        Returns:
+            int: Number of URLs requeued.
+        """
+        cursor = self._conn.execute(
+            "UPDATE frontier SET state = ?, owner = NULL, claimed_at = NULL WHERE state = ? AND claimed_at < ?",
+            (PENDING, CLAIMED, time.time() - older_than)
+        )
+        return cursor.rowcount
+
+    def counts(self) -> dict:
+        """
+        Returns:
+            dict: Number of URLs per state ("pending", "claimed", "done", "failed").
+        """
+        names = ("pending", "claimed", "done", "failed")
+        counts = dict.fromkeys(names, 0)
+        for state, count in self._conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state"):
+            counts[names[state]] = count
+        return counts
+
+    def is_finished(self) -> bool:
+        """
+        Returns:
+            bool: True when no URL is pending or claimed.
+        """
+        return self._conn.execute(
+            "SELECT 1 FROM frontier WHERE state IN (?, ?) LIMIT 1", (PENDING, CLAIMED)
+        ).fetchone() is None
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self._conn.close()
@@ -4,10 +4,90 @@ parser.py
 Parses HTML content using BeautifulSoup4.
 Implements multiple extraction methods, nested navigation,
 and error handling for missing elements.
+
+Three backends are supported: BeautifulSoup with the pure-Python
+"html.parser" (always available), BeautifulSoup with "lxml", and the
+lexbor engine from selectolax. All of them return identical results.
 """
 
-from bs4 import BeautifulSoup
-from typing import List, Optional
+import importlib.util
+import re
+from functools import lru_cache
+from bs4 import BeautifulSoup, SoupStrainer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_BACKEND = "html.parser"
+
+# Fastest first; "auto" picks the first one that is installed.
+BACKENDS = ("selectolax", "lxml", "html.parser")
+
+_BACKEND_MODULES = {"selectolax": "selectolax", "lxml": "lxml", "html.parser": None}
+
+# Subtrees of a detail page that detail_only parsing keeps: the breadcrumb
+# (category), product_main (title, price, availability) and the product
+# information table.
+DETAIL_STRAINER = SoupStrainer(class_=re.compile(r"(^|\s)(breadcrumb|product_main|table-striped)(\s|$)"))
+
+
+@lru_cache(maxsize=None)
+def _installed_backends() -> Tuple[str, ...]:
+    return tuple(name for name in BACKENDS
+                 if _BACKEND_MODULES[name] is None or importlib.util.find_spec(_BACKEND_MODULES[name]))
+
+
+def available_backends() -> List[str]:
+    """
+    List the parser backends that can be used in this environment.
+
+    Returns:
+        List[str]: Backend names, fastest first.
+    """
+    return list(_installed_backends())
+
+
+def resolve_backend(backend: str) -> str:
+    """
+    Resolve "auto" to the fastest installed backend and validate the name.
+
+    Args:
+        backend (str): Backend name or "auto".
+
+    Returns:
+        str: A concrete backend name.
+
+    Raises:
+        ValueError: If the backend is unknown or not installed.
+    """
+    if backend == "auto":
+        return _installed_backends()[0]
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown parser backend: {backend!r}")
+    if backend not in _installed_backends():
+        raise ValueError(f"Parser backend {backend!r} is not installed")
+    return backend
+
+
+def trim_detail_page(html: str) -> str:
+    """
+    Cut a detail page off after its product information table.
+
+    Everything we extract sits above the end of that table; the reviews,
+    footer and scripts after it are never tokenized. Pages without the
+    table are returned unchanged.
+
+    Args:
+        html (str): Detail page HTML.
+
+    Returns:
+        str: The HTML up to and including the closing table tag.
+    """
+    start = html.find("table-striped")
+    if start == -1:
+        return html
+    end = html.find("</table>", start)
+    if end == -1:
+        return html
+    return html[:end + len("</table>")]
 
 
 class Parser:
@@ -15,28 +95,57 @@ class Parser:
     Parser class to extract data from HTML content.
     """
 
-    def __init__(self, html: str):
+    def __new__(cls, html: str = "", backend: str = DEFAULT_BACKEND, detail_only: bool = False):
+        # Parser(html, backend="selectolax") hands out a SelectolaxParser,
+        # which implements the same methods on top of lexbor.
+        if cls is Parser and resolve_backend(backend) == "selectolax":
+            return super().__new__(SelectolaxParser)
+        return super().__new__(cls)
+
+    def __init__(self, html: str, backend: str = DEFAULT_BACKEND, detail_only: bool = False):
         """
         Initialize the parser with raw HTML.
 
         Args:
             html (str): Raw HTML content.
+            backend (str): "html.parser", "lxml", "selectolax" or "auto".
+            detail_only (bool): Treat html as a book detail page and build
+                only the breadcrumb, product_main and product information
+                subtrees. Detail-page methods give the same results; listing
+                methods will find nothing.
         """
-        self.soup = BeautifulSoup(html, "html.parser")
+        self.backend = resolve_backend(backend)
+        if detail_only:
+            self.soup = BeautifulSoup(trim_detail_page(html), self.backend, parse_only=DETAIL_STRAINER)
+        else:
+            self.soup = BeautifulSoup(html, self.backend)
 
-    def get_all_titles(self) -> List[str]:
+    def iter_products(self) -> Iterator[dict]:
         """
-        Example of extracting all book titles using CSS selectors.
+        Walk the product cards of a listing page once, yielding one record each.
 
-        Returns:
-            List[str]: List of titles.
+        Every field is looked up inside its own ``article.product_pod``, so a
+        card with a missing field yields an empty value instead of shifting
+        the fields of the cards after it.
+
+        Yields:
+            dict: Record with "title", "price", "url" and "availability" keys.
         """
-        titles = []
-        elements = self.soup.select("h3 a")
-        for element in elements:
-            title = element.get("title", "").strip()
-            titles.append(title)
-        return titles
+        for article in self.soup.find_all("article", class_="product_pod"):
+            link = article.select_one("h3 a")
+            if link is not None:
+                title = link.get("title", "").strip() or ' '.join(link.text.split())
+                url = link.get("href") or ""
+            else:
+                title, url = "", ""
+            price = article.find(class_="price_color")
+            availability = article.find("p", class_="availability")
+            yield {
+                "title": title,
+                "price": price.text.strip() if price else "",
+                "url": url,
+                "availability": availability.text.strip() if availability else "",
+            }
 
     def get_all_prices(self) -> List[str]:
         """
@@ -75,6 +184,30 @@ class Parser:
             availabilities.append(element.text.strip())
         return availabilities
 
+    def get_next_page_link(self) -> Optional[str]:
+        """
+        Extract the href of the "next" pagination link on a listing page.
+
+        Returns:
+            Optional[str]: Relative URL of the next page, or None on the last page.
+        """
+        link = self.soup.select_one("li.next a")
+        return link.get("href") if link else None
+
+    def get_category_links(self) -> List[str]:
+        """
+        Extract category index links from the sidebar navigation.
+
+        Returns:
+            List[str]: Relative URLs of category listing pages.
+        """
+        links = []
+        for element in self.soup.select(".side_categories ul li ul li a"):
+            href = element.get("href")
+            if href:
+                links.append(href)
+        return links
+
     def get_category_name(self) -> Optional[str]:
         """
         Extracts book category from breadcrumb navigation.
@@ -90,6 +223,20 @@ class Parser:
             return category_item.text.strip()
         return "All products"  # Fallback for malformed breadcrumbs
 
+    def get_product_info(self) -> Dict[str, str]:
+        """
+        Extract the product information table of a detail page.
+
+        Returns:
+            Dict[str, str]: Row header to value, e.g. {"UPC": "...", "Availability": "In stock (22 available)"}.
+        """
+        info = {}
+        for row in self.soup.select("table.table-striped tr"):
+            header, value = row.find("th"), row.find("td")
+            if header and value:
+                info[header.text.strip()] = value.text.strip()
+        return info
+
     def get_title(self) -> str:
         """
         Extract the title of a single book.
@@ -145,3 +292,113 @@ class Parser:
             if title:
                 titles.append(title)
         return titles
+
+
+class SelectolaxParser(Parser):
+    """
+    Parser implementation backed by selectolax's lexbor engine.
+
+    Produced by ``Parser(html, backend="selectolax")``; it has no ``soup``
+    and exposes the parsed document as ``tree`` instead.
+    """
+
+    def __init__(self, html: str, backend: str = "selectolax", detail_only: bool = False):
+        """
+        Initialize the parser with raw HTML.
+
+        Args:
+            html (str): Raw HTML content.
+            backend (str): Always "selectolax"; accepted for signature parity.
+            detail_only (bool): Stop tokenizing after the product
+                information table of a detail page.
+        """
+        from selectolax.lexbor import LexborHTMLParser
+
+        self.backend = "selectolax"
+        self.soup = None
+        self.tree = LexborHTMLParser(trim_detail_page(html) if detail_only else html)
+
+    def iter_products(self) -> Iterator[dict]:
+        for article in self.tree.css("article.product_pod"):
+            link = article.css_first("h3 a")
+            if link is not None:
+                title = (link.attributes.get("title") or "").strip() or ' '.join(link.text().split())
+                url = link.attributes.get("href") or ""
+            else:
+                title, url = "", ""
+            price = article.css_first(".price_color")
+            availability = article.css_first("p.availability")
+            yield {
+                "title": title,
+                "price": price.text().strip() if price else "",
+                "url": url,
+                "availability": availability.text().strip() if availability else "",
+            }
+
+    def get_all_prices(self) -> List[str]:
+        return [price.text().strip() for price in self.tree.css(".price_color")]
+
+    def get_product_links(self) -> List[str]:
+        links = []
+        for element in self.tree.css("h3 a"):
+            href = element.attributes.get("href")
+            if href:
+                links.append(href)
+        return links
+
+    def get_availability_list(self) -> List[str]:
+        return [element.text().strip() for element in self.tree.css("p.instock.availability")]
+
+    def get_next_page_link(self) -> Optional[str]:
+        link = self.tree.css_first("li.next a")
+        return link.attributes.get("href") if link else None
+
+    def get_category_links(self) -> List[str]:
+        links = []
+        for element in self.tree.css(".side_categories ul li ul li a"):
+            href = element.attributes.get("href")
+            if href:
+                links.append(href)
+        return links
+
+    def get_category_name(self) -> Optional[str]:
+        breadcrumb_items = self.tree.css(".breadcrumb li")
+        if len(breadcrumb_items) >= 3:
+            return breadcrumb_items[-2].text().strip()
+        return "All products"
+
+    def get_product_info(self) -> Dict[str, str]:
+        info = {}
+        for row in self.tree.css("table.table-striped tr"):
+            header, value = row.css_first("th"), row.css_first("td")
+            if header and value:
+                info[header.text().strip()] = value.text().strip()
+        return info
+
+    def get_title(self) -> str:
+        title_element = self.tree.css_first("h1") or self.tree.css_first("h3")
+        return ' '.join(title_element.text().strip().split()) if title_element else ""
+
+    def get_price(self) -> str:
+        price_element = self.tree.css_first(".price_color")
+        return price_element.text().strip() if price_element else ""
+
+    def get_availability(self) -> str:
+        availability_element = self.tree.css_first(".availability")
+        return availability_element.text().strip() if availability_element else ""
+
+    def get_all_titles(self) -> List[str]:
+        titles = []
+        elements = self.tree.css("article.product_pod h3 a")
+        if not elements:
+            elements = self.tree.css("h3")
+
+        for element in elements:
+            if element.tag == 'a' and element.attributes.get("title"):
+                title = element.attributes.get("title", "").strip()
+            else:
+                title = ' '.join(element.text().strip().split())
+
+            if title:
+                titles.append(title)
+        return titles
@@ -0,0 +1,200 @@
+"""
+retry.py
+
+Retry policy shared by Collector and AsyncCollector.
+
+Transient failures (connection errors, timeouts, 408/425/429/5xx answers)
+are retried with capped exponential backoff and full jitter, honouring the
+server's Retry-After header. Only idempotent methods are retried, and a
+per-host retry budget caps retries at a fraction of the requests actually
+made, so a failing host cannot multiply our traffic.
+
+The policy only decides *whether* and *how long*; the collectors apply the
+delay by pausing the host in their rate limiter, so a retry goes through the
+same scheduler as every other request.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, FrozenSet, Optional
+
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Parse a Retry-After header.
+
+    Args:
+        value (Optional[str]): Header value: delay in seconds or an HTTP date.
+        now (Optional[float]): Current Unix time (defaults to time.time()).
+
+    Returns:
+        Optional[float]: Seconds to wait (never negative), or None if the
+        header is missing or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+class RetryBudget:
+    """
+    Limits retries to ``min_retries`` plus ``ratio`` times the number of
+    requests made, so retries add at most that fraction of extra traffic.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10):
+        """
+        Initialize a RetryBudget.
+
+        Args:
+            ratio (float): Retries allowed per request made.
+            min_retries (int): Retries allowed regardless of traffic, so
+                hosts that see few requests can still retry.
+        """
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        """
+        Count one request sent to the host (first attempts and retries alike).
+        """
+        with self._lock:
+            self.requests += 1
+
+    def try_spend(self) -> bool:
+        """
+        Take one retry out of the budget.
+
+        Returns:
+            bool: False when the budget is exhausted.
+        """
+        with self._lock:
+            if self.retries >= self.min_retries + self.ratio * (self.requests - self.retries):
+                return False
+            self.retries += 1
+            return True
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed request is retried and how long to wait first.
+    """
+
+    def __init__(self, attempts: int = 3, backoff: float = 0.5, max_backoff: float = 30.0,
+                 jitter: bool = True, statuses: FrozenSet[int] = RETRYABLE_STATUSES,
+                 methods: FrozenSet[str] = IDEMPOTENT_METHODS, budget_ratio: float = 0.2,
+                 min_retries: int = 10, max_retry_after: float = 120.0):
+        """
+        Initialize a RetryPolicy.
+
+        Args:
+            attempts (int): Total attempts per request, including the first;
+                1 disables retries.
+            backoff (float): Base delay in seconds; attempt n waits up to
+                ``backoff * 2 ** (n - 1)``.
+            max_backoff (float): Upper bound for the exponential delay.
+            jitter (bool): Draw the delay uniformly from [0, delay] ("full
+                jitter") so retrying clients do not synchronize.
+            statuses (FrozenSet[int]): HTTP statuses worth retrying.
+            methods (FrozenSet[str]): Methods that may be retried.
+            budget_ratio (float): Retries allowed per request, per host.
+            min_retries (int): Retries always allowed per host.
+            max_retry_after (float): Give up instead of honouring a longer
+                Retry-After.
+        """
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = statuses
+        self.methods = methods
+        self.budget_ratio = budget_ratio
+        self.min_retries = min_retries
+        self.max_retry_after = max_retry_after
+        self._budgets: Dict[str, RetryBudget] = {}
+        self._lock = threading.Lock()
+
+    def budget(self, host: str) -> RetryBudget:
+        """
+        Return the retry budget of a host, creating it on first use.
+
+        Args:
+            host (str): Network location.
+
+        Returns:
+            RetryBudget: The host's budget.
+        """
+        with self._lock:
+            budget = self._budgets.get(host)
+            if budget is None:
+                budget = self._budgets[host] = RetryBudget(self.budget_ratio, self.min_retries)
+            return budget
+
+    def record_request(self, host: str):
+        """
+        Count a request sent to a host; this is what refills its budget.
+
+        Args:
+            host (str): Network location.
+        """
+        self.budget(host).record_request()
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        Args:
+            attempt (int): Number of attempts made so far (1 after the first).
+
+        Returns:
+            float: Backoff before the next attempt, in seconds.
+        """
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def next_delay(self, host: str, attempt: int, method: str = "GET", status: Optional[int] = None,
+                   retry_after: Optional[str] = None, error: Optional[BaseException] = None) -> Optional[float]:
+        """
+        Decide whether to retry a failed attempt.
+
+        Args:
+            host (str): Network location of the request.
+            attempt (int): Number of attempts made so far.
+            method (str): HTTP method.
+            status (Optional[int]): Response status, if a response arrived.
+            retry_after (Optional[str]): Retry-After header of the response.
+            error (Optional[BaseException]): Transient transport error
+                (connection failure, timeout), if no response arrived.
+
+        Returns:
+            Optional[float]: Seconds to wait before retrying, or None if the
+            request must not be retried.
+        """
+        if method.upper() not in self.methods or attempt >= self.attempts:
+            return None
+        if error is None and status not in self.statuses:
+            return None
+        delay = self.backoff_delay(attempt)
+        server_delay = parse_retry_after(retry_after)
+        if server_delay is not None:
+            if server_delay > self.max_retry_after:
+                return None
+            delay = max(delay, server_delay)
+        if not self.budget(host).try_spend():
+            return None
+        return delay
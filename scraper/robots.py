@@ -0,0 +1,278 @@
+"""
+robots.py
+
+robots.txt support shared by both collectors.
+
+RobotsRules parses a robots.txt file the way urllib.robotparser and RFC 9309
+do: the groups naming our user agent apply (or the ``*`` groups when none
+does), the longest matching Allow/Disallow pattern decides, with ``*`` and
+``$`` wildcards, and Allow wins a tie. The rules are compiled once, so a
+per-URL check is a few prefix comparisons. Crawl-delay and Request-rate
+give the minimum interval between requests, and Sitemap lines name the
+sitemaps used to seed a crawl.
+
+RobotsCache keeps the rules per origin for a TTL; the collectors fetch and
+store them, and check every URL against them before requesting it.
+"""
+
+import re
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote, urlparse
+
+USER_AGENT = "MidtermScraperBot/1.0 (+https://example.com/bot)"
+
+
+class RobotsDisallowed(Exception):
+    """
+    Raised by the collectors instead of requesting a URL robots.txt disallows.
+    """
+
+
+class RobotsRules:
+    """
+    The robots.txt rules that apply to one user agent on one site.
+
+    Attributes:
+        crawl_delay (Optional[float]): Minimum seconds between requests.
+        sitemaps (List[str]): Sitemap URLs listed in the file.
+    """
+
+    def __init__(self, rules: Iterable[Tuple[str, bool]] = (), crawl_delay: Optional[float] = None,
+                 sitemaps: Iterable[str] = ()):
+        """
+        Initialize RobotsRules.
+
+        Args:
+            rules (Iterable[Tuple[str, bool]]): (path pattern, allowed) pairs.
+            crawl_delay (Optional[float]): Minimum seconds between requests.
+            sitemaps (Iterable[str]): Sitemap URLs.
+        """
+        self.crawl_delay = crawl_delay
+        self.sitemaps = list(sitemaps)
+        # Longest pattern first, Allow before Disallow on equal length: the
+        # first match is the decision.
+        ordered = sorted(((_normalize(pattern), allow) for pattern, allow in rules if pattern),
+                         key=lambda rule: (-len(rule[0]), not rule[1]))
+        self._rules = [(_compile(pattern), allow) for pattern, allow in ordered]
+
+    @classmethod
+    def parse(cls, text: str, user_agent: str = USER_AGENT) -> "RobotsRules":
+        """
+        Parse a robots.txt file.
+
+        Args:
+            text (str): File contents.
+            user_agent (str): Our User-Agent; groups match its product
+                token (the part before "/"), case-insensitively.
+
+        Returns:
+            RobotsRules: Rules of the groups naming the agent, else of the
+            ``*`` groups.
+        """
+        token = user_agent.split("/")[0].strip().lower()
+        groups = []
+        sitemaps = []
+        agents, rules, delays = None, None, None
+        for line in text.splitlines():
+            key, _, value = line.split("#", 1)[0].partition(":")
+            key, value = key.strip().lower(), value.strip()
+            if key == "user-agent":
+                if rules is None or rules or delays:
+                    # A user-agent line after rules starts a new group.
+                    agents, rules, delays = [], [], []
+                    groups.append((agents, rules, delays))
+                agents.append(value.lower())
+            elif key == "sitemap":
+                if value:
+                    sitemaps.append(value)
+            elif agents is None:
+                continue
+            elif key in ("allow", "disallow"):
+                rules.append((value, key == "allow"))
+            elif key == "crawl-delay":
+                delays.append(_parse_number(value))
+            elif key == "request-rate":
+                requests, _, seconds = value.partition("/")
+                requests, seconds = _parse_number(requests), _parse_number(seconds)
+                delays.append(seconds / requests if requests and seconds is not None else None)
+
+        matching = [group for group in groups
+                    if any(agent not in ("", "*") and agent in token for agent in group[0])]
+        if not matching:
+            matching = [group for group in groups if "*" in group[0]]
+        delays = [delay for _, _, group_delays in matching for delay in group_delays if delay is not None]
+        return cls([rule for _, group_rules, _ in matching for rule in group_rules],
+                   max(delays) if delays else None, sitemaps)
+
+    @classmethod
+    def from_response(cls, status: Optional[int], text: str = "", user_agent: str = USER_AGENT) -> "RobotsRules":
+        """
+        Rules for a robots.txt response, following urllib.robotparser.
+
+        Args:
+            status (Optional[int]): HTTP status, or None if the request failed.
+            text (str): Response body.
+            user_agent (str): Our User-Agent.
+
+        Returns:
+            RobotsRules: Parsed rules for a 2xx; disallow everything for 401
+            and 403; allow everything otherwise (other 4xx, 5xx and network
+            errors).
+        """
+        if status is not None and 200 <= status < 300:
+            return cls.parse(text, user_agent)
+        if status in (401, 403):
+            return cls([("/", False)])
+        return cls()
+
+    def allowed(self, url: str) -> bool:
+        """
+        Check a URL against the rules.
+
+        Args:
+            url (str): Absolute URL or path.
+
+        Returns:
+            bool: True if the URL may be fetched.
+        """
+        parsed = urlparse(url)
+        path = _normalize(parsed.path or "/") + ("?" + parsed.query if parsed.query else "")
+        if path == "/robots.txt":
+            return True
+        for matches, allow in self._rules:
+            if matches(path):
+                return allow
+        return True
+
+
+class RobotsCache:
+    """
+    Thread-safe per-origin cache of RobotsRules with a TTL.
+    """
+
+    def __init__(self, user_agent: str = USER_AGENT, ttl: float = 86400.0, error_ttl: float = 600.0):
+        """
+        Initialize a RobotsCache.
+
+        Args:
+            user_agent (str): User-Agent the rules are selected for.
+            ttl (float): Seconds rules from a successful fetch are kept.
+            error_ttl (float): Seconds the allow-all stand-in for a failed
+                fetch (network error or 5xx) is kept before retrying.
+        """
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self._entries: Dict[str, Tuple[RobotsRules, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[RobotsRules]:
+        """
+        Args:
+            url (str): Any URL on the site.
+
+        Returns:
+            Optional[RobotsRules]: Unexpired rules of the URL's origin, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(origin(url))
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    def store(self, url: str, status: Optional[int], text: str = "") -> RobotsRules:
+        """
+        Parse and remember the robots.txt response of an origin.
+
+        Args:
+            url (str): Any URL on the site.
+            status (Optional[int]): HTTP status, or None if the request failed.
+            text (str): Response body.
+
+        Returns:
+            RobotsRules: The stored rules.
+        """
+        rules = RobotsRules.from_response(status, text, self.user_agent)
+        failed = status is None or status >= 500
+        with self._lock:
+            self._entries[origin(url)] = (rules, time.monotonic() + (self.error_ttl if failed else self.ttl))
+        return rules
+
+
+def origin(url: str) -> str:
+    """
+    Args:
+        url (str): Absolute URL.
+
+    Returns:
+        str: "scheme://host[:port]", the scope of a robots.txt file.
+    """
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def robots_url(url: str) -> str:
+    """
+    Args:
+        url (str): Absolute URL.
+
+    Returns:
+        str: URL of the robots.txt file that governs it.
+    """
+    return origin(url) + "/robots.txt"
+
+
+def parse_sitemap(text: str) -> Tuple[List[str], List[str]]:
+    """
+    Read a sitemap: an XML urlset, an XML sitemap index, or a plain list of
+    URLs, one per line.
+
+    Args:
+        text (str): Sitemap contents.
+
+    Returns:
+        Tuple[List[str], List[str]]: Page URLs, and URLs of nested sitemaps
+        (from a sitemap index).
+    """
+    if not text.lstrip().startswith("<"):
+        return [line.strip() for line in text.splitlines() if line.strip().startswith("http")], []
+    pages, sitemaps = [], []
+    for element in ElementTree.fromstring(text.strip()):
+        kind = element.tag.rsplit("}", 1)[-1]
+        loc = next((child.text.strip() for child in element
+                    if child.tag.rsplit("}", 1)[-1] == "loc" and child.text), None)
+        if loc is None:
+            continue
+        if kind == "sitemap":
+            sitemaps.append(loc)
+        elif kind == "url":
+            pages.append(loc)
+    return pages, sitemaps
+
+
+def _parse_number(value: str) -> Optional[float]:
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if number >= 0 else None
+
+
+def _normalize(path: str) -> str:
+    # Compare paths in one percent-encoding: decode, then re-encode
+    # everything but the URL and wildcard syntax.
+    return quote(unquote(path), safe="/?=&;:@+$,*!~'()-._")
+
+
+def _compile(pattern: str):
+    # Plain patterns are prefix tests; ones with "*" or a final "$" become
+    # an anchored regex.
+    if "*" not in pattern and not pattern.endswith("$"):
+        return lambda path: path.startswith(pattern)
+    anchored = pattern.endswith("$")
+    body = pattern[:-1] if anchored else pattern
+    regex = ".*".join(re.escape(part) for part in body.split("*")) + ("$" if anchored else "")
+    return re.compile(regex).match
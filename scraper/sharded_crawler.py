@@ -0,0 +1,310 @@
+"""
+sharded_crawler.py
+
+Multi-process catalogue crawl for jobs where one process is CPU-bound on
+parsing.
+
+N worker processes each run an AsyncCollector and parse pages in-process.
+They pull URLs from a shared SQLite Frontier (which also deduplicates
+discovered pages across processes) and take every request slot from one
+SharedRateLimiter, so the politeness budget holds for the job as a whole;
+each worker also checks every URL against robots.txt.
+Each shard streams its books to its own JSON Lines file and returns a
+CategoryAggregator and its request/parse Metrics; the caller merges them
+into the final outputs.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin
+
+from models.data_models import Book
+from scraper.async_collector import AsyncCollector
+from scraper.crawler import build_book, parse_category, parse_listing_page, url_to_path
+from scraper.frontier import Frontier, FrontierItem
+from scraper.parser import DEFAULT_BACKEND
+from scraper.retry import RetryPolicy
+from scraper.robots import RobotsCache
+from utils.analyzer import CategoryAggregator
+from utils.file_handler import JsonLinesBookWriter, iter_books_from_jsonl
+from utils.metrics import NO_METRICS, Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SharedRateLimiter:
+    """
+    Request spacing shared by several processes.
+
+    The next free slot lives in shared memory and is reserved under a
+    process-shared lock; callers then sleep until their slot without holding
+    the lock. Provides the acquire()/pause() interface of TokenBucket, so
+    AsyncCollector can use it in place of its per-host buckets.
+    """
+
+    def __init__(self, rate: float, context=None):
+        """
+        Initialize a SharedRateLimiter.
+
+        Args:
+            rate (float): Requests per second allowed across all processes.
+            context: multiprocessing context the worker processes are
+                started from (defaults to the current default context).
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        context = context or multiprocessing.get_context()
+        self.interval = 1.0 / rate
+        self._next_slot = context.Value("d", 0.0, lock=False)
+        self._lock = context.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take the next request slot.
+
+        Returns:
+            float: Seconds to wait before sending the request.
+        """
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next_slot.value)
+            self._next_slot.value = slot + self.interval
+            return slot - now
+
+    def pause(self, seconds: float):
+        """
+        Hold back every later request, in every process, by at least ``seconds``.
+
+        Args:
+            seconds (float): Pause length.
+        """
+        with self._lock:
+            self._next_slot.value = max(self._next_slot.value, time.time() + seconds)
+
+    async def acquire(self):
+        """
+        Wait until a request slot is available.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class ShardOptions(NamedTuple):
+    """
+    Settings shared by every shard of a crawl. Plain values only, since
+    they are pickled into every worker process.
+    """
+    base_url: str
+    frontier_path: str
+    output_dir: str
+    follow_pagination: bool = True
+    follow_categories: bool = False
+    concurrency: int = 10
+    parser_backend: str = DEFAULT_BACKEND
+    retries: int = 3
+    poll_interval: float = 0.05
+    stale_after: float = 120.0
+
+
+# Set in each worker process by _init_worker.
+_limiter: Optional[SharedRateLimiter] = None
+
+
+def _init_worker(limiter: Optional[SharedRateLimiter]):
+    global _limiter
+    _limiter = limiter
+
+
+def shard_path(output_dir: str, shard_id: int) -> str:
+    """
+    Args:
+        output_dir (str): Output directory.
+        shard_id (int): Shard number.
+
+    Returns:
+        str: The shard's JSON Lines output file.
+    """
+    return os.path.join(output_dir, f"books.shard-{shard_id}.jsonl")
+
+
+async def crawl_shard(shard_id: int, options: ShardOptions, limiter: Optional[SharedRateLimiter] = None,
+                      metrics: Optional[Metrics] = None) -> CategoryAggregator:
+    """
+    Work through the frontier until it is exhausted.
+
+    Up to ``options.concurrency`` URLs are processed at once; more are
+    claimed as tasks finish. When nothing is pending but other shards still
+    hold claims, the shard waits for them to discover more work. The
+    shard's claims are refreshed every ``stale_after / 4`` seconds, so ones
+    waiting behind the shared rate limit are not requeued as stale.
+
+    Args:
+        shard_id (int): Shard number.
+        options (ShardOptions): Crawl settings.
+        limiter (Optional[SharedRateLimiter]): Rate limiter shared by all shards.
+        metrics (Optional[Metrics]): Records the shard's request timings
+            and parse times.
+
+    Returns:
+        CategoryAggregator: Statistics of the books this shard wrote.
+    """
+    metrics = metrics or NO_METRICS
+    frontier = Frontier(options.frontier_path)
+    stats = CategoryAggregator()
+    base_url = options.base_url
+
+    async def process(collector: AsyncCollector, writer: JsonLinesBookWriter, item: FrontierItem):
+        path = url_to_path(base_url, item.url)
+        if item.kind == "listing":
+            try:
+                html = await collector.fetch(path)
+                with metrics.timer("parse_seconds", page="listing"):
+                    entries, next_url, category_urls = parse_listing_page(html, item.url, options.parser_backend)
+            except Exception as e:
+                logger.warning("Failed to process listing page %s: %s", item.url, e)
+                frontier.complete(item.url, shard_id, failed=True)
+                return
+            links = []
+            if options.follow_pagination and next_url:
+                links.append(next_url)
+            if options.follow_categories:
+                links.extend(category_urls)
+            frontier.add_many([(link, "listing", None) for link in links]
+                              + [(entry["url"], "detail", entry) for entry in entries])
+        else:
+            entry = item.payload
+            try:
+                html = await collector.fetch(path)
+                with metrics.timer("parse_seconds", page="detail"):
+                    category = parse_category(html, options.parser_backend)
+            except Exception as e:
+                logger.warning("Failed to fetch detail page for %s at %s: %s", entry["title"], item.url, e)
+                category = "Unknown"
+            book = build_book(entry, category)
+            # A claim that was requeued meanwhile belongs to another shard now.
+            if frontier.complete(item.url, shard_id):
+                writer.write(book)
+                stats.add(book)
+            return
+        frontier.complete(item.url, shard_id)
+
+    try:
+        with JsonLinesBookWriter(shard_path(options.output_dir, shard_id)) as writer:
+            async with AsyncCollector(base_url, delay=0, max_in_flight=options.concurrency,
+                                      retry=RetryPolicy(attempts=options.retries),
+                                      limiter=limiter, robots=RobotsCache(), metrics=metrics) as collector:
+                tasks = set()
+                last_heartbeat = time.monotonic()
+                while True:
+                    if time.monotonic() - last_heartbeat >= options.stale_after / 4:
+                        frontier.heartbeat(shard_id)
+                        last_heartbeat = time.monotonic()
+                    if len(tasks) < options.concurrency:
+                        for item in frontier.claim(shard_id, options.concurrency - len(tasks)):
+                            tasks.add(asyncio.create_task(process(collector, writer, item)))
+                    if not tasks:
+                        if frontier.is_finished():
+                            break
+                        frontier.requeue_stale(options.stale_after)
+                        await asyncio.sleep(options.poll_interval)
+                        continue
+                    done, tasks = await asyncio.wait(tasks, timeout=options.poll_interval,
+                                                     return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+    finally:
+        frontier.close()
+    logger.info("Shard %d wrote %d books", shard_id, stats.total)
+    return stats
+
+
+def run_shard(shard_id: int, options: ShardOptions) -> Tuple[str, CategoryAggregator, Metrics]:
+    """
+    Process-pool entry point: crawl one shard with the process's shared limiter.
+
+    Args:
+        shard_id (int): Shard number.
+        options (ShardOptions): Crawl settings.
+
+    Returns:
+        Tuple[str, CategoryAggregator, Metrics]: The shard's output file,
+        statistics and metrics.
+    """
+    metrics = Metrics()
+    stats = asyncio.run(crawl_shard(shard_id, options, _limiter, metrics))
+    return shard_path(options.output_dir, shard_id), stats, metrics
+
+
+def sharded_crawl(base_url: str, output_dir: str, processes: int, follow_pagination: bool = True,
+                  follow_categories: bool = False, rate: Optional[float] = 1.0, concurrency: int = 10,
+                  parser_backend: str = DEFAULT_BACKEND, retries: int = 3,
+                  start_path: str = "", seeds: Iterable[str] = (),
+                  metrics: Optional[Metrics] = None) -> Tuple[List[str], CategoryAggregator]:
+    """
+    Crawl the catalogue with ``processes`` worker processes.
+
+    Args:
+        base_url (str): Site base URL.
+        output_dir (str): Directory for the frontier and shard files.
+        processes (int): Number of worker processes.
+        follow_pagination (bool): Follow "next" links on listing pages.
+        follow_categories (bool): Also crawl category index pages.
+        rate (Optional[float]): Requests per second for the whole job; None
+            disables rate limiting.
+        concurrency (int): Requests in flight per process.
+        parser_backend (str): Parser backend.
+        retries (int): Attempts per request for transient failures.
+        start_path (str): Listing path to start from.
+        seeds (Iterable[str]): More listing page URLs to put in the
+            frontier up front, e.g. from scraper.crawler.listing_seeds().
+        metrics (Optional[Metrics]): Receives the merged metrics of all shards.
+
+    Returns:
+        Tuple[List[str], CategoryAggregator]: Shard files, in shard order,
+        and the merged statistics of every book written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    frontier_path = os.path.join(output_dir, "frontier.sqlite")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(frontier_path + suffix):
+            os.remove(frontier_path + suffix)
+    frontier = Frontier(frontier_path)
+    frontier.add_many([(url, "listing", None) for url in [urljoin(base_url, start_path), *seeds]])
+    frontier.close()
+
+    options = ShardOptions(base_url, frontier_path, output_dir, follow_pagination, follow_categories,
+                           concurrency, parser_backend, retries)
+    limiter = SharedRateLimiter(rate) if rate else None
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(limiter,)) as pool:
+        results = list(pool.map(run_shard, range(processes), [options] * processes))
+
+    stats = CategoryAggregator()
+    for _, shard_stats, shard_metrics in results:
+        stats.merge(shard_stats)
+        if metrics is not None:
+            metrics.merge(shard_metrics)
+    return [path for path, _, _ in results], stats
+
+
+def iter_shard_books(paths: Iterable[str]) -> Iterator[Book]:
+    """
+    Stream the books of several shard files, one file after another.
+
+    Args:
+        paths (Iterable[str]): Shard files from sharded_crawl.
+
+    Yields:
+        Book: Every book of every shard, once per URL.
+    """
+    seen = set()
+    for path in paths:
+        for book in iter_books_from_jsonl(path):
+            if book.url not in seen:
+                seen.add(book.url)
+                yield book
@@ -0,0 +1,100 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from models.data_models import Availability, Book, parse_availability, parse_price
+from utils.analyzer import average_price_per_category, get_unavailable_books
+from utils.file_handler import iter_books_from_csv
+
+
+class TestBook(unittest.TestCase):
+    """Tests for the slotted Book model."""
+
+    def make(self, price="£51.77", availability="In stock", category="Poetry"):
+        return Book(title="A Light in the Attic", price=price, url="http://example.com/a",
+                    availability=availability, category=category)
+
+    def test_price_is_parsed_once(self):
+        """Prices become integer pence plus a currency code"""
+        book = self.make("£51.77")
+        self.assertEqual((book.price_pence, book.currency), (5177, "GBP"))
+        self.assertEqual(book.price_value, 51.77)
+        self.assertEqual(parse_price("$20.5"), (2050, "USD"))
+        self.assertEqual(parse_price("Free!"), (None, None))
+
+    def test_bare_price_uses_default_currency(self):
+        """A price without a currency symbol is parsed and averaged, and keeps its text"""
+        book = self.make("51.77")
+        self.assertEqual((book.price_pence, book.currency), (5177, "GBP"))
+        self.assertEqual(book.to_dict()["price"], "51.77")
+        self.assertEqual(average_price_per_category([book, self.make("£48.23")]), {"Poetry": 50.0})
+
+    def test_mojibake_price_is_normalized(self):
+        """The mis-decoded "Â£" prefix is understood and cleaned up"""
+        book = self.make("Â£13.99")
+        self.assertEqual(book.price_pence, 1399)
+        self.assertEqual(book.price, "£13.99")
+
+    def test_availability_is_normalized(self):
+        """Availability becomes a status plus an optional stock count"""
+        self.assertEqual(parse_availability("In stock (22 available)"), (Availability.IN_STOCK, 22))
+        self.assertEqual(parse_availability("In stock"), (Availability.IN_STOCK, None))
+        self.assertEqual(parse_availability("Out of stock"), (Availability.OUT_OF_STOCK, 0))
+        self.assertEqual(self.make(availability="Last copy!").status, Availability.UNKNOWN)
+
+    def test_to_dict_round_trips(self):
+        """to_dict returns the original strings, including unparsable ones"""
+        for price, availability in [("£51.77", "In stock"), ("£0.00", "In stock (3 available)"),
+                                    ("Free!", "Out of stock"), ("", "Last copy!")]:
+            book = self.make(price, availability)
+            self.assertEqual(Book(**book.to_dict()).to_dict(), book.to_dict())
+            self.assertEqual((book.price, book.availability), (price, availability))
+
+    def test_setters_reparse(self):
+        """Assigning price or availability updates the parsed fields"""
+        book = self.make("Free!")
+        book.price = "£2.00"
+        book.availability = "Out of stock"
+        self.assertEqual((book.price_pence, book.price), (200, "£2.00"))
+        self.assertEqual(book.status, Availability.OUT_OF_STOCK)
+
+    def test_missing_category_is_kept(self):
+        """A missing or non-string category is stored as given instead of raising"""
+        self.assertIsNone(self.make(category=None).category)
+        self.assertEqual(self.make(category=3).category, 3)
+
+    def test_non_string_values_are_kept(self):
+        """None and numeric prices or availability are stored as given instead of raising"""
+        book = self.make(None, None)
+        self.assertEqual((book.price_pence, book.status), (None, Availability.UNKNOWN))
+        self.assertEqual((book.price, book.availability), (None, None))
+        book = self.make(51.77)
+        self.assertEqual((book.price_pence, book.currency), (5177, "GBP"))
+        self.assertEqual(book.to_dict()["price"], 51.77)
+
+    def test_short_csv_row(self):
+        """A CSV row missing its trailing columns loads with None values"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "books.csv")
+            with open(path, "w", newline="", encoding="utf-8") as handle:
+                writer = csv.writer(handle)
+                writer.writerow(["title", "price", "url", "availability", "category"])
+                writer.writerow(["A Light in the Attic", "£51.77", "http://example.com/a"])
+            [book] = list(iter_books_from_csv(path))
+        self.assertEqual(book.price_pence, 5177)
+        self.assertEqual((book.availability, book.category), (None, None))
+
+    def test_slots(self):
+        """Books carry no per-instance __dict__"""
+        self.assertFalse(hasattr(self.make(), "__dict__"))
+
+    def test_analyzer_uses_parsed_fields(self):
+        """Averages skip unparsable prices; out-of-stock books are listed"""
+        books = [self.make("£10.00"), self.make("Â£20.00"), self.make("Free!", "Out of stock")]
+        self.assertEqual(average_price_per_category(books), {"Poetry": 15.0})
+        self.assertEqual(len(get_unavailable_books(books)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
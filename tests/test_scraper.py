@@ -1,8 +1,24 @@
 import unittest
 import time  # Keep time import if needed by any retained async tests (though likely removed)
-from scraper.parser import Parser
-from scraper.async_collector import AsyncCollector  # Keep for potential future tests
+from scraper.parser import Parser, SelectolaxParser, available_backends
+from scraper.async_collector import AdaptiveLimiter, AsyncCollector, TokenBucket
+from scraper.crawler import Crawler, RecrawlIndex, listing_seeds
+from scraper.collector import Collector, RateLimiter
+from scraper.cache import ResponseCache
+from scraper.checkpoint import CrawlJournal
+from utils.metrics import Metrics
+from scraper.retry import RetryBudget, RetryPolicy, parse_retry_after
+from scraper.robots import RobotsCache, RobotsDisallowed, RobotsRules, parse_sitemap
+from scraper.async_crawler import AsyncCrawler
+from scraper.frontier import Frontier
+from scraper.sharded_crawler import SharedRateLimiter, iter_shard_books, sharded_crawl
+import aiohttp
 import asyncio
+import contextlib
+import os
+import requests
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from unittest.mock import patch, MagicMock  # Keep for potential future tests
 
 class TestParser(unittest.TestCase):
@@ -119,6 +135,32 @@ class TestParser(unittest.TestCase):
         self.assertEqual(len(titles_simple_h3), 2)
 
 
+    def test_iter_products_yields_complete_records(self):
+        """iter_products keeps fields aligned when a card is missing one"""
+        html = """
+        <article class="product_pod">
+            <h3><a href="a_1/index.html" title="Book A">Book A</a></h3>
+            <p class="price_color">£1.00</p>
+            <p class="instock availability">In stock</p>
+        </article>
+        <article class="product_pod">
+            <h3><a href="b_2/index.html" title="Book B">Book B</a></h3>
+            <p class="instock availability">In stock</p>
+        </article>
+        <article class="product_pod">
+            <h3><a href="c_3/index.html" title="Book C">Book C</a></h3>
+            <p class="price_color">£3.00</p>
+            <p class="availability">Out of stock</p>
+        </article>
+        """
+        records = list(Parser(html).iter_products())
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0], {"title": "Book A", "price": "£1.00",
+                                      "url": "a_1/index.html", "availability": "In stock"})
+        self.assertEqual(records[1]["price"], "")
+        self.assertEqual(records[2]["price"], "£3.00")
+        self.assertEqual(records[2]["availability"], "Out of stock")
+
     def test_price_parsing_edge_cases(self):
         """Test price parsing with edge cases (zero, non-numeric)"""
         html_zero = "<p class=\"price_color\">£0.00</p>"
@@ -149,5 +191,995 @@ class TestParser(unittest.TestCase):
         self.assertEqual(parser.get_category_name(), "All products") # Should fallback
         self.assertEqual(parser.get_all_titles(), [])
 
+class TestParserBackends(unittest.TestCase):
+    """Every installed backend must give the same answers as html.parser."""
+
+    def test_backends_agree(self):
+        """All extraction methods agree across installed backends"""
+        pages = [
+            listing_html([("a_1/index.html", "A &amp; B", "1.00"), ("c_3/index.html", "C", "3.00")],
+                         next_href="page-2.html", categories=["poetry_1/index.html"]),
+            detail_html("Poetry") + "<h1>\n  Spaced   Title </h1><p class=\"availability\">In stock (3 available)</p>",
+            "<h3>Book1</h3><p class=\"price_color\">£10.00</p>",
+            "",
+        ]
+        methods = ["get_all_titles", "get_all_prices", "get_product_links", "get_availability_list",
+                   "get_next_page_link", "get_category_links", "get_category_name", "get_title",
+                   "get_price", "get_availability"]
+        for html in pages:
+            expected = Parser(html)
+            for backend in available_backends():
+                parser = Parser(html, backend=backend)
+                with self.subTest(backend=backend, html=html[:40]):
+                    self.assertEqual(list(parser.iter_products()), list(expected.iter_products()))
+                    for method in methods:
+                        self.assertEqual(getattr(parser, method)(), getattr(expected, method)(), method)
+
+    def test_detail_only_matches_full_parse(self):
+        """detail_only builds a smaller tree with the same detail-page answers"""
+        html = (detail_html("Poetry")
+                + '<div id="product_description"><p>A long description</p></div>'
+                + '<div class="col-sm-6 product_main"><h1>Real Title</h1><p class="price_color">£5.00</p>'
+                + '<p class="instock availability">In stock (3 available)</p></div>'
+                + '<table class="table table-striped"><tr><th>UPC</th><td>abc</td></tr>'
+                + '<tr><th>Availability</th><td>In stock (3 available)</td></tr></table>'
+                + '<footer><p class="price_color">£99.00</p></footer>')
+        for backend in available_backends():
+            with self.subTest(backend=backend):
+                partial = Parser(html, backend=backend, detail_only=True)
+                self.assertEqual(partial.get_category_name(), "Poetry")
+                self.assertEqual(partial.get_title(), "Real Title")
+                self.assertEqual(partial.get_price(), "£5.00")
+                self.assertEqual(partial.get_availability(), "In stock (3 available)")
+                self.assertEqual(partial.get_product_info(),
+                                 {"UPC": "abc", "Availability": "In stock (3 available)"})
+                self.assertEqual(partial.get_all_prices(), ["£5.00"])
+        self.assertNotIn("A long description", Parser(html, detail_only=True).soup.text)
+
+    def test_backend_selection(self):
+        """auto picks an installed backend; unknown names are rejected"""
+        self.assertIn(Parser("", backend="auto").backend, available_backends())
+        with self.assertRaises(ValueError):
+            Parser("", backend="html5lib-ng")
+        if "selectolax" in available_backends():
+            self.assertIsInstance(Parser("", backend="selectolax"), SelectolaxParser)
+
+
+class FakeResponse:
+    """Minimal stand-in for an aiohttp response context manager."""
+
+    def __init__(self, session, body, status=200, headers=None):
+        self.session = session
+        self.body = body
+        self.status = status
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        self.session.in_flight += 1
+        self.session.peak = max(self.session.peak, self.session.in_flight)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.session.in_flight -= 1
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(MagicMock(), (), status=self.status)
+
+    async def text(self):
+        await asyncio.sleep(self.session.latency)
+        return self.body
+
+
+class FakeSession:
+    """Records peak concurrency of requests made through it."""
+
+    def __init__(self, latency=0.0, statuses=()):
+        self.latency = latency
+        self.in_flight = 0
+        self.peak = 0
+        self.urls = []
+        self.statuses = list(statuses)
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        status, headers = self.statuses.pop(0) if self.statuses else (200, None)
+        return FakeResponse(self, f"<html>{url}</html>", status, headers)
+
+
+class TestAsyncScheduler(unittest.TestCase):
+    """Tests for the AsyncCollector request scheduler."""
+
+    def test_token_bucket_spaces_requests(self):
+        """Reservations beyond the burst are released one interval apart"""
+        bucket = TokenBucket(rate=10, capacity=2)
+        waits = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(waits[2], 0.1, delta=0.01)
+        self.assertAlmostEqual(waits[3], 0.2, delta=0.01)
+
+    def test_max_in_flight_is_respected(self):
+        """fetch_multi never runs more than max_in_flight requests at once"""
+        async def run():
+            ac = AsyncCollector("http://example.com/", delay=0, max_in_flight=3)
+            ac.session = FakeSession(latency=0.01)
+            results = await ac.fetch_multi([f"page-{i}.html" for i in range(12)])
+            return ac.session, results
+
+        session, results = asyncio.run(run())
+        self.assertEqual(len(results), 12)
+        self.assertEqual(session.peak, 3)
+
+    def test_rate_limit_is_shared_per_host(self):
+        """Concurrent callers share one bucket per host"""
+        async def run():
+            ac = AsyncCollector("http://example.com/", rate=50, burst=1, max_in_flight=10)
+            ac.session = FakeSession()
+            start = time.monotonic()
+            await ac.fetch_multi([f"page-{i}.html" for i in range(5)])
+            return time.monotonic() - start, ac
+
+        elapsed, ac = asyncio.run(run())
+        self.assertGreaterEqual(elapsed, 0.075)
+        self.assertIs(ac.get_bucket("example.com"), ac.get_bucket("example.com"))
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    """Tests for AIMD concurrency control."""
+
+    def run_round(self, limiter, latency=0.01, overloaded=False):
+        """Fill the limiter, then complete every request."""
+        async def run():
+            tokens = [await limiter.acquire() for _ in range(limiter.current_limit)]
+            for token in tokens:
+                limiter.release(token, latency, overloaded)
+        asyncio.run(run())
+
+    def test_additive_increase_when_fast_and_saturated(self):
+        """Each fully used round of fast successes raises the limit by about one"""
+        limiter = AdaptiveLimiter(initial=2, max_limit=5)
+        for _ in range(3):
+            self.run_round(limiter)
+        self.assertEqual(limiter.current_limit, 4)
+        for _ in range(10):
+            self.run_round(limiter)
+        self.assertEqual(limiter.current_limit, 5)
+
+    def test_multiplicative_decrease_once_per_round(self):
+        """A burst of concurrent overloads halves the limit only once"""
+        limiter = AdaptiveLimiter(initial=8)
+        self.run_round(limiter, overloaded=True)
+        self.assertEqual(limiter.current_limit, 4)
+        self.run_round(limiter, overloaded=True)
+        self.assertEqual(limiter.current_limit, 2)
+
+    def test_slow_responses_lower_the_limit(self):
+        """p95 latency above target counts as congestion"""
+        limiter = AdaptiveLimiter(initial=16, target_latency=0.5)
+        self.run_round(limiter, latency=2.0)
+        self.assertEqual(limiter.current_limit, 8)
+
+    def test_collector_finds_its_ceiling(self):
+        """The adaptive collector grows past its start on a healthy host and shrinks on 503s"""
+        async def run(statuses):
+            ac = AsyncCollector("http://example.com/", delay=0, max_in_flight=16, adaptive=True,
+                                retry=RetryPolicy(attempts=1))
+            ac.session = FakeSession(latency=0.002, statuses=statuses)
+            await ac.fetch_multi([f"page-{i}.html" for i in range(200)])
+            return ac.current_limits()["example.com"], ac.session.peak
+
+        limit, peak = asyncio.run(run([]))
+        self.assertGreater(limit, 4)
+        self.assertGreater(peak, 4)
+        limit, _ = asyncio.run(run([(503, None)] * 200))
+        self.assertEqual(limit, 1)
+
+
+class TestConnectionSettings(unittest.TestCase):
+    """The collector's connector and timeouts, checked against a local server."""
+
+    async def serve(self):
+        from aiohttp import web
+        peers = []
+
+        async def page(request):
+            peers.append(request.transport.get_extra_info("peername")[1])
+            return web.Response(text="ok")
+
+        async def hang(request):
+            await asyncio.sleep(1)
+            return web.Response(text="late")
+
+        app = web.Application()
+        app.router.add_get("/page.html", page)
+        app.router.add_get("/hang.html", hang)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        return runner, f"http://127.0.0.1:{port}/", peers
+
+    def test_connector_is_configured(self):
+        """Pool limits and timeouts reach the aiohttp session"""
+        async def run():
+            async with AsyncCollector("http://example.com/", max_in_flight=7, dns_ttl=60) as ac:
+                return ac.session.connector, ac.session.timeout
+
+        connector, timeout = asyncio.run(run())
+        self.assertEqual((connector.limit, connector.limit_per_host), (100, 7))
+        self.assertEqual(timeout.sock_read, 30)
+
+    def test_keepalive_reuse_and_read_timeout(self):
+        """Sequential requests share one connection; a hung response times out"""
+        async def run():
+            runner, base_url, peers = await self.serve()
+            try:
+                timeout = aiohttp.ClientTimeout(total=5, sock_read=0.2)
+                async with AsyncCollector(base_url, delay=0, timeout=timeout,
+                                          retry=RetryPolicy(attempts=1)) as ac:
+                    for _ in range(5):
+                        await ac.fetch("page.html")
+                    start = time.monotonic()
+                    with self.assertRaises(asyncio.TimeoutError):
+                        await ac.fetch("hang.html")
+                    return peers, time.monotonic() - start
+            finally:
+                await runner.cleanup()
+
+        peers, elapsed = asyncio.run(run())
+        self.assertEqual(len(peers), 5)
+        self.assertEqual(len(set(peers)), 1)
+        self.assertLess(elapsed, 0.9)
+
+
+    def test_request_phases_are_traced(self):
+        """Metrics record connect/TTFB/download timings, sizes and statuses"""
+        metrics = Metrics()
+
+        async def run():
+            runner, base_url, _ = await self.serve()
+            try:
+                async with AsyncCollector(base_url, delay=0, metrics=metrics) as ac:
+                    for _ in range(3):
+                        await ac.fetch("page.html")
+            finally:
+                await runner.cleanup()
+
+        asyncio.run(run())
+        self.assertEqual(metrics.counter("http_requests_total", status=200), 3)
+        self.assertEqual(metrics.histogram("http_request_seconds", phase="connect").count, 1)
+        self.assertEqual(metrics.counter("http_connections_reused_total"), 2)
+        for phase in ("ttfb", "download", "total"):
+            self.assertEqual(metrics.histogram("http_request_seconds", phase=phase).count, 3)
+        self.assertEqual(metrics.histogram("http_response_bytes").max, len("ok"))
+
+
+class TestThreadedCollector(unittest.TestCase):
+    """Tests for Collector.fetch_many and the shared RateLimiter."""
+
+    def make_collector(self, delay=0):
+        collector = Collector("http://example.com/", delay=delay, pool_size=4)
+
+        def get(url, **kwargs):
+            if "missing" in url:
+                return sync_response(404)
+            time.sleep(0.1 if "slow" in url else 0.01)
+            return sync_response(200, f"<html>{url}</html>")
+
+        collector.session.get = MagicMock(side_effect=get)
+        return collector
+
+    def test_rate_limiter_spaces_threads(self):
+        """Concurrent reservations are released one delay apart"""
+        limiter = RateLimiter(0.05)
+        waits = []
+        threads = [threading.Thread(target=lambda: waits.append(limiter.reserve())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for expected, wait in zip([0, 0.05, 0.1, 0.15], sorted(waits)):
+            self.assertAlmostEqual(wait, expected, delta=0.01)
+
+    def test_ordered_and_completion_order(self):
+        """Results come back in input order or as they complete"""
+        collector = self.make_collector()
+        paths = ["slow.html", "fast.html", "missing.html"]
+        ordered = list(collector.fetch_many(paths))
+        self.assertEqual([path for path, _ in ordered], paths)
+        self.assertEqual(ordered[1][1], "<html>http://example.com/fast.html</html>")
+        self.assertIsInstance(ordered[2][1], requests.HTTPError)
+        completed = [path for path, _ in collector.fetch_many(paths, ordered=False)]
+        self.assertEqual(completed[-1], "slow.html")
+
+    def test_threads_overlap_but_respect_delay(self):
+        """Workers overlap request latency while the limiter keeps the spacing"""
+        collector = self.make_collector(delay=0.02)
+        start = time.monotonic()
+        results = list(collector.fetch_many([f"slow-{i}.html" for i in range(8)], workers=8))
+        elapsed = time.monotonic() - start
+        self.assertEqual(len(results), 8)
+        self.assertGreaterEqual(elapsed, 7 * 0.02)
+        self.assertLess(elapsed, 8 * 0.1)
+
+
+def sync_response(status, text="", headers=None):
+    """Build a requests-like response mock."""
+    response = MagicMock(status_code=status, text=text, headers=headers or {})
+    if status >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(f"{status} error")
+    return response
+
+
+class TestRetry(unittest.TestCase):
+    """Tests for the shared retry policy and its use by both collectors."""
+
+    def test_retry_after_parsing(self):
+        """Retry-After accepts seconds and HTTP dates"""
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertAlmostEqual(parse_retry_after("Thu, 01 Jan 1970 00:01:40 GMT", now=90), 10.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_policy_decisions(self):
+        """Only transient failures of idempotent requests are retried, within limits"""
+        policy = RetryPolicy(attempts=3, backoff=1, jitter=False)
+        self.assertEqual(policy.next_delay("h", 1, status=503), 1)
+        self.assertEqual(policy.next_delay("h", 2, error=TimeoutError()), 2)
+        self.assertEqual(policy.next_delay("h", 1, status=429, retry_after="7"), 7)
+        self.assertIsNone(policy.next_delay("h", 3, status=503))
+        self.assertIsNone(policy.next_delay("h", 1, status=404))
+        self.assertIsNone(policy.next_delay("h", 1, method="POST", status=503))
+        self.assertIsNone(policy.next_delay("h", 1, status=429, retry_after="3600"))
+
+    def test_budget_caps_retry_traffic(self):
+        """Retries stop once they exceed the budget for the traffic sent"""
+        budget = RetryBudget(ratio=0.5, min_retries=1)
+        for _ in range(4):
+            budget.record_request()
+        self.assertEqual([budget.try_spend() for _ in range(4)], [True, True, False, False])
+
+    def test_sync_collector_honours_retry_after(self):
+        """A 503 with Retry-After pauses the rate limiter, then the retry succeeds"""
+        collector = Collector("http://example.com/", delay=0, retry=RetryPolicy(backoff=0.01, jitter=False))
+        collector.session.get = MagicMock(side_effect=[
+            sync_response(503, headers={"Retry-After": "2"}),
+            requests.ConnectionError("reset"),
+            sync_response(200, "ok"),
+        ])
+        with patch("scraper.collector.time.sleep") as sleep:
+            self.assertEqual(collector.fetch("page.html"), "ok")
+        self.assertEqual(collector.session.get.call_count, 3)
+        self.assertGreaterEqual(sleep.call_args_list[0][0][0], 1.9)
+
+    def test_sync_collector_does_not_retry_client_errors(self):
+        """A 404 raises immediately"""
+        collector = Collector("http://example.com/", delay=0)
+        collector.session.get = MagicMock(return_value=sync_response(404))
+        with self.assertRaises(requests.HTTPError):
+            collector.fetch("missing.html")
+        self.assertEqual(collector.session.get.call_count, 1)
+
+    def test_sync_collector_times_out_hung_reads(self):
+        """A server that never answers fails with a retried read timeout instead of hanging"""
+        import socket
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen(4)
+        try:
+            collector = Collector(f"http://127.0.0.1:{server.getsockname()[1]}/", delay=0, timeout=(1, 0.1),
+                                  retry=RetryPolicy(attempts=2, backoff=0.01, jitter=False))
+            start = time.monotonic()
+            with self.assertRaises(requests.Timeout):
+                collector.fetch("page.html")
+            self.assertLess(time.monotonic() - start, 2)
+        finally:
+            server.close()
+
+    def test_async_retry_waits_in_bucket(self):
+        """The async retry delay is applied by the host's token bucket"""
+        async def run():
+            ac = AsyncCollector("http://example.com/", rate=1000, retry=RetryPolicy(backoff=0.05, jitter=False))
+            ac.session = FakeSession(statuses=[(503, None), (429, None)])
+            start = time.monotonic()
+            body = await ac.fetch("page.html")
+            return time.monotonic() - start, body, ac.session
+
+        elapsed, body, session = asyncio.run(run())
+        self.assertEqual(body, "<html>http://example.com/page.html</html>")
+        self.assertEqual(len(session.urls), 3)
+        self.assertGreaterEqual(elapsed, 0.14)
+
+    def test_async_gives_up_after_attempts(self):
+        """Exhausted attempts surface the last HTTP error"""
+        async def run():
+            ac = AsyncCollector("http://example.com/", delay=0, retry=RetryPolicy(attempts=2, backoff=0))
+            ac.session = FakeSession(statuses=[(503, None)] * 3)
+            try:
+                await ac.fetch("page.html")
+            finally:
+                self.assertEqual(len(ac.session.urls), 2)
+
+        with self.assertRaises(aiohttp.ClientResponseError):
+            asyncio.run(run())
+
+
+def listing_html(books, next_href=None, categories=()):
+    """Build a books.toscrape.com style listing page."""
+    items = "".join(
+        f'''<li><article class="product_pod">
+            <h3><a href="{href}" title="{title}">{title}</a></h3>
+            <div class="product_price"><p class="price_color">£{price}</p>
+            <p class="instock availability">In stock</p></div>
+        </article></li>'''
+        for href, title, price in books
+    )
+    nav = "".join(f'<li><a href="{href}">{href}</a></li>' for href in categories)
+    pager = f'<ul class="pager"><li class="next"><a href="{next_href}">next</a></li></ul>' if next_href else ""
+    return (f'<div class="side_categories"><ul><li><a href="index.html">Books</a><ul>{nav}</ul></li></ul></div>'
+            f'<ol class="row">{items}</ol>{pager}')
+
+
+def detail_html(category):
+    """Build a books.toscrape.com style detail page."""
+    return (f'<ul class="breadcrumb"><li><a href="/">Home</a></li><li><a href="/books">Books</a></li>'
+            f'<li><a href="/c">{category}</a></li><li class="active">Title</li></ul>')
+
+
+SITE = {
+    "": listing_html([("catalogue/a_1/index.html", "A", "1.00"), ("catalogue/b_2/index.html", "B", "2.00")],
+                     next_href="catalogue/page-2.html",
+                     categories=["catalogue/category/books/poetry_1/index.html"]),
+    "catalogue/page-2.html": listing_html([("c_3/index.html", "C", "3.00")]),
+    "catalogue/category/books/poetry_1/index.html": listing_html([("../../../a_1/index.html", "A", "1.00")]),
+    "catalogue/a_1/index.html": detail_html("Poetry"),
+    "catalogue/b_2/index.html": detail_html("Travel"),
+    "catalogue/c_3/index.html": detail_html("Mystery"),
+}
+
+
+class FakeCollector:
+    """Serves pages from SITE and records requested paths."""
+
+    base_url = "http://example.com/"
+    max_in_flight = 4
+
+    def __init__(self):
+        self.requested = []
+
+    def fetch(self, path=""):
+        self.requested.append(path)
+        if path not in SITE:
+            raise IOError(f"404 {path}")
+        return SITE[path]
+
+    def fetch_many(self, paths, workers=None, ordered=True):
+        return Collector.fetch_many(self, paths, workers or 2, ordered)
+
+
+class FakeAsyncCollector(FakeCollector):
+    """Async flavour of FakeCollector."""
+
+    async def fetch(self, path=""):
+        await asyncio.sleep(0)
+        return FakeCollector.fetch(self, path)
+
+
+class TestCrawlers(unittest.TestCase):
+    """Tests for the pagination crawlers."""
+
+    def test_first_page_only_without_pagination(self):
+        """follow_pagination=False keeps the old single listing page behaviour"""
+        books = list(Crawler(FakeCollector(), follow_pagination=False).crawl())
+        self.assertEqual([b.title for b in books], ["A", "B"])
+        self.assertEqual([b.category for b in books], ["Poetry", "Travel"])
+
+    def test_sync_crawl_follows_next_links(self):
+        """The sync crawler walks every listing page"""
+        collector = FakeCollector()
+        books = list(Crawler(collector).crawl())
+        self.assertEqual([b.title for b in books], ["A", "B", "C"])
+        self.assertEqual(books[2].url, "http://example.com/catalogue/c_3/index.html")
+        self.assertEqual(books[2].category, "Mystery")
+
+    def test_threaded_detail_fetches_keep_order(self):
+        """detail_workers fetches through fetch_many without changing the output"""
+        collector = FakeCollector()
+        books = list(Crawler(collector, detail_workers=4).crawl())
+        self.assertEqual([(b.title, b.category) for b in books],
+                         [("A", "Poetry"), ("B", "Travel"), ("C", "Mystery")])
+
+    def test_parse_times_and_queue_depths_are_recorded(self):
+        """Crawlers time each parse and sample their queue depths"""
+        metrics = Metrics()
+        list(Crawler(FakeCollector(), metrics=metrics).crawl())
+        self.assertEqual(metrics.histogram("parse_seconds", page="listing").count, 2)
+        self.assertEqual(metrics.histogram("parse_seconds", page="detail").count, 3)
+
+        async def run():
+            crawler = AsyncCrawler(FakeAsyncCollector(), metrics=metrics)
+            return [book async for book in crawler.crawl()]
+
+        asyncio.run(run())
+        self.assertEqual(metrics.histogram("parse_seconds", page="detail").count, 6)
+        self.assertEqual(metrics.histogram("queue_depth", queue="detail").count, 3)
+
+    def test_async_crawl_with_categories_dedupes_products(self):
+        """Category pages are crawled but products are fetched once"""
+        async def run():
+            collector = FakeAsyncCollector()
+            crawler = AsyncCrawler(collector, follow_categories=True, queue_size=1)
+            return collector, [book async for book in crawler.crawl()]
+
+        collector, books = asyncio.run(run())
+        self.assertEqual(sorted(b.title for b in books), ["A", "B", "C"])
+        self.assertEqual(collector.requested.count("catalogue/a_1/index.html"), 1)
+        self.assertIn("catalogue/category/books/poetry_1/index.html", collector.requested)
+
+    def test_async_crawl_parses_in_process_pool(self):
+        """Offloading parsing to a process pool gives the same books"""
+        async def run():
+            crawler = AsyncCrawler(FakeAsyncCollector(), parse_executor=executor, parse_workers=2)
+            return [book async for book in crawler.crawl()]
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            books = asyncio.run(run())
+        self.assertEqual(sorted((b.title, b.category) for b in books),
+                         [("A", "Poetry"), ("B", "Travel"), ("C", "Mystery")])
+
+    def test_async_crawl_records_failed_detail_as_unknown(self):
+        """A failing detail fetch still yields the book with category Unknown"""
+        site_pages = dict(SITE)
+        del SITE["catalogue/c_3/index.html"]
+        try:
+            async def run():
+                crawler = AsyncCrawler(FakeAsyncCollector())
+                return [book async for book in crawler.crawl()]
+            books = {b.title: b for b in asyncio.run(run())}
+        finally:
+            SITE.update(site_pages)
+        self.assertEqual(books["C"].category, "Unknown")
+
+    def test_async_crawl_stops_workers_when_consumer_raises(self):
+        """Closing the crawl early cancels every task it started"""
+        async def run():
+            before = asyncio.all_tasks()
+            with self.assertRaises(RuntimeError):
+                async with contextlib.aclosing(AsyncCrawler(FakeAsyncCollector()).crawl()) as books:
+                    async for _ in books:
+                        raise RuntimeError("consumer failed")
+            return asyncio.all_tasks() - before
+
+        self.assertEqual(asyncio.run(run()), set())
+
+
+class TestRecrawl(unittest.TestCase):
+    """Tests for recrawling with a RecrawlIndex."""
+
+    DETAIL_PAGES = {"catalogue/a_1/index.html", "catalogue/b_2/index.html", "catalogue/c_3/index.html"}
+
+    def setUp(self):
+        self.previous = list(Crawler(FakeCollector()).crawl())
+
+    def test_unchanged_catalogue_skips_detail_pages(self):
+        """Only listing pages are fetched when nothing changed"""
+        collector = FakeCollector()
+        index = RecrawlIndex.from_books(self.previous)
+        books = list(Crawler(collector, index=index).crawl())
+        self.assertEqual([(b.title, b.category) for b in books],
+                         [(b.title, b.category) for b in self.previous])
+        self.assertFalse(self.DETAIL_PAGES & set(collector.requested))
+        self.assertEqual((index.reused, index.missed), (3, 0))
+
+    def test_changed_and_unknown_products_are_refetched(self):
+        """A price change or a stored Unknown category triggers a detail fetch"""
+        self.previous[0].price = "£9.99"
+        self.previous[2].category = "Unknown"
+
+        async def run():
+            collector = FakeAsyncCollector()
+            crawler = AsyncCrawler(collector, index=RecrawlIndex.from_books(self.previous))
+            return collector, [book async for book in crawler.crawl()]
+
+        collector, books = asyncio.run(run())
+        self.assertEqual(sorted(self.DETAIL_PAGES & set(collector.requested)),
+                         ["catalogue/a_1/index.html", "catalogue/c_3/index.html"])
+        self.assertEqual(sorted((b.title, b.category) for b in books),
+                         [("A", "Poetry"), ("B", "Travel"), ("C", "Mystery")])
+
+
+class TestCheckpoint(unittest.TestCase):
+    """Tests for resuming crawls from a CrawlJournal."""
+
+    def setUp(self):
+        import tempfile
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = f"{self.tmp.name}/crawl.journal"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sync_resume_skips_finished_pages(self):
+        """An interrupted crawl resumes without refetching journaled pages"""
+        with self.assertRaises(KeyboardInterrupt):
+            with CrawlJournal(self.path) as journal:
+                for book in Crawler(FakeCollector(), journal=journal).crawl():
+                    raise KeyboardInterrupt
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"b": {"title": "torn')
+
+        collector = FakeCollector()
+        with CrawlJournal(self.path, resume=True) as journal:
+            books = list(Crawler(collector, journal=journal).crawl())
+            self.assertEqual((journal.replayed_pages, journal.replayed_books), (1, 1))
+        self.assertEqual([(b.title, b.category) for b in books],
+                         [("A", "Poetry"), ("B", "Travel"), ("C", "Mystery")])
+        self.assertNotIn("", collector.requested)
+        self.assertNotIn("catalogue/a_1/index.html", collector.requested)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_records_appended_after_torn_line_survive(self):
+        """Resuming cuts off a torn last line, so the next record is readable on the next resume"""
+        from models.data_models import Book
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('{"b": {"title": "torn')
+        journal = CrawlJournal(self.path, resume=True)
+        journal.record_book(Book("A", "£1.00", "http://example.com/a", "In stock", "Poetry"))
+        journal.close()
+
+        with self.assertNoLogs("scraper.checkpoint", level="WARNING"):
+            journal = CrawlJournal(self.path, resume=True)
+        journal.record_book(Book("B", "£2.00", "http://example.com/b", "In stock", "Travel"))
+        journal.close()
+        journal = CrawlJournal(self.path, resume=True)
+        journal.close()
+        self.assertEqual(journal.book("http://example.com/a").category, "Poetry")
+        self.assertEqual(journal.book("http://example.com/b").category, "Travel")
+
+    def test_async_resume_refetches_failed_details(self):
+        """Books whose detail fetch failed are not journaled"""
+        site_pages = dict(SITE)
+        del SITE["catalogue/c_3/index.html"]
+        try:
+            journal = CrawlJournal(self.path)
+            crawler = AsyncCrawler(FakeAsyncCollector(), journal=journal)
+            asyncio.run(self.collect(crawler))
+            journal.close()
+        finally:
+            SITE.update(site_pages)
+
+        collector = FakeAsyncCollector()
+        with CrawlJournal(self.path, resume=True) as journal:
+            self.assertEqual((journal.pages, len(journal)), (2, 2))
+            books = asyncio.run(self.collect(AsyncCrawler(collector, journal=journal)))
+        self.assertEqual(collector.requested, ["catalogue/c_3/index.html"])
+        self.assertEqual(sorted((b.title, b.category) for b in books),
+                         [("A", "Poetry"), ("B", "Travel"), ("C", "Mystery")])
+
+    @staticmethod
+    async def collect(crawler):
+        return [book async for book in crawler.crawl()]
+
+
+class TestShardedCrawl(unittest.TestCase):
+    """Tests for the shared Frontier and the multi-process crawl."""
+
+    def setUp(self):
+        import tempfile
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = f"{self.tmp.name}/frontier.sqlite"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_frontier_dedupes_and_claims_exclusively(self):
+        """Known URLs are ignored and a pending URL is claimed by one worker only"""
+        first, second = Frontier(self.path), Frontier(self.path)
+        try:
+            self.assertTrue(first.add("http://x/d", "detail", {"title": "D"}))
+            self.assertEqual(first.add_many([("http://x/", "listing", None), ("http://x/d", "detail", None)]), 1)
+            claimed = first.claim(1, 1)
+            self.assertEqual([(item.url, item.kind) for item in claimed], [("http://x/", "listing")])
+            self.assertEqual([item.payload for item in second.claim(2, 5)], [{"title": "D"}])
+            self.assertEqual(first.claim(1, 5), [])
+            self.assertFalse(second.is_finished())
+            first.complete("http://x/", 1)
+            second.complete("http://x/d", 2, failed=True)
+            self.assertTrue(first.is_finished())
+            self.assertEqual(first.counts(), {"pending": 0, "claimed": 0, "done": 1, "failed": 1})
+        finally:
+            first.close()
+            second.close()
+
+    def test_frontier_requeues_stale_claims(self):
+        """Claims of a dead worker become pending again after the timeout"""
+        frontier = Frontier(self.path)
+        try:
+            frontier.add("http://x/", "listing")
+            frontier.claim(1, 1)
+            self.assertEqual(frontier.requeue_stale(60), 0)
+            self.assertEqual(frontier.requeue_stale(-1), 1)
+            self.assertEqual([item.url for item in frontier.claim(2, 1)], ["http://x/"])
+        finally:
+            frontier.close()
+
+    def test_frontier_heartbeat_and_owner_checked_completion(self):
+        """Heartbeats keep live claims; a requeued claim can only be completed by its new owner"""
+        frontier = Frontier(self.path)
+        try:
+            frontier.add("http://x/", "listing")
+            frontier.claim(1, 1)
+            time.sleep(0.2)
+            self.assertEqual(frontier.heartbeat(1), 1)
+            self.assertEqual(frontier.requeue_stale(0.1), 0)
+            self.assertEqual(frontier.requeue_stale(-1), 1)
+            frontier.claim(2, 1)
+            self.assertFalse(frontier.complete("http://x/", 1))
+            self.assertTrue(frontier.complete("http://x/", 2))
+            self.assertEqual(frontier.counts()["done"], 1)
+        finally:
+            frontier.close()
+
+    def test_shard_merge_dedupes_books(self):
+        """A book written by two shards is merged once"""
+        from models.data_models import Book
+        from utils.file_handler import JsonLinesBookWriter
+        paths = [f"{self.tmp.name}/a.jsonl", f"{self.tmp.name}/b.jsonl"]
+        for path, titles in zip(paths, (["A", "B"], ["B", "C"])):
+            with JsonLinesBookWriter(path) as writer:
+                for title in titles:
+                    writer.write(Book(title, "£1.00", f"http://x/{title}", "In stock", "Poetry"))
+        self.assertEqual([book.title for book in iter_shard_books(paths)], ["A", "B", "C"])
+
+    def test_shared_rate_limiter_spaces_reservations(self):
+        """Consecutive reservations are one interval apart; pause pushes them back"""
+        limiter = SharedRateLimiter(rate=10)
+        waits = [limiter.reserve() for _ in range(3)]
+        self.assertAlmostEqual(waits[2] - waits[0], 0.2, delta=0.02)
+        limiter.pause(1.0)
+        self.assertGreater(limiter.reserve(), 0.9)
+
+    def test_processes_share_frontier_and_merge(self):
+        """Two processes crawl the site once between them and their results merge"""
+        from aiohttp import web
+        requested = []
+
+        async def page(request):
+            path = request.path.lstrip("/")
+            requested.append(path)
+            if path not in SITE:
+                raise web.HTTPNotFound()
+            return web.Response(text=SITE[path], content_type="text/html")
+
+        loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.router.add_get("/{path:.*}", page)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", 0).start())
+        base_url = f"http://127.0.0.1:{runner.addresses[0][1]}/"
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        metrics = Metrics()
+        try:
+            shards, stats = sharded_crawl(base_url, self.tmp.name, processes=2, follow_categories=True,
+                                          rate=None, concurrency=2, metrics=metrics)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.run_until_complete(runner.cleanup())
+            loop.close()
+
+        books = sorted((b.title, b.category) for b in iter_shard_books(shards))
+        self.assertEqual(books, [("A", "Poetry"), ("B", "Travel"), ("C", "Mystery")])
+        self.assertEqual(len(shards), 2)
+        self.assertEqual(stats.count_per_category(), {"Poetry": 1, "Travel": 1, "Mystery": 1})
+        self.assertEqual(requested.count("catalogue/a_1/index.html"), 1)
+        self.assertIn("catalogue/category/books/poetry_1/index.html", requested)
+        self.assertEqual(metrics.counter("http_requests_total", status=200), 6)
+        self.assertEqual(metrics.histogram("parse_seconds", page="detail").count, 3)
+
+    def test_sharded_scrape_writes_merged_outputs(self):
+        """main.sharded_scrape crawls the benchmark site and merges the shards into the outputs"""
+        import json
+        import main
+        from benchmarks.server import ServerProcess, SiteOptions
+
+        with ServerProcess(SiteOptions(books=45)) as server, \
+                patch.object(main, "BASE_URL", server.base_url), patch.object(main, "OUTPUT_DIR", self.tmp.name):
+            main.sharded_scrape(2, crawl=True, delay=0, concurrency=4)
+
+        with open(os.path.join(self.tmp.name, "books.json"), encoding="utf-8") as f:
+            books = json.load(f)
+        self.assertEqual(len(books), 45)
+        self.assertEqual(len({book["url"] for book in books}), 45)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "books.csv")))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "books.json.part")))
+
+    def test_processes_rejects_recrawl_and_resume(self):
+        """--recrawl and --resume are refused with --processes instead of being ignored"""
+        import io
+        import main
+
+        self.assertEqual(main.parse_args(["--processes", "2"]).processes, 2)
+        for flag in ("--recrawl", "--resume"):
+            with self.subTest(flag=flag), self.assertRaises(SystemExit), \
+                    contextlib.redirect_stderr(io.StringIO()):
+                main.parse_args(["--processes", "2", flag])
+
+
+class TestResponseCache(unittest.TestCase):
+    """Tests for the persistent response cache."""
+
+    def test_store_and_conditional_headers(self):
+        """Stored entries round-trip with their validators"""
+        cache = ResponseCache(":memory:", ttl=60)
+        cache.store("http://example.com/a", "<html>a</html>", etag='"abc"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+        entry = cache.get("http://example.com/a")
+        self.assertEqual(entry.body, "<html>a</html>")
+        self.assertTrue(cache.is_fresh(entry))
+        self.assertEqual(ResponseCache.conditional_headers(entry), {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+        })
+        self.assertIsNone(cache.get("http://example.com/missing"))
+
+    def test_lru_eviction_keeps_size_budget(self):
+        """The least recently used entry is evicted first"""
+        body = "".join(chr(0x4e00 + (i * 7919) % 20000) for i in range(2000))
+        cache = ResponseCache(":memory:", max_bytes=10 ** 9)
+        cache.store("u1", body)
+        one_entry = cache.size()
+        cache.max_bytes = one_entry * 2 + 64
+        cache.store("u2", body + "x")
+        time.sleep(0.01)
+        cache.get("u1")
+        cache.store("u3", body + "y")
+        self.assertIsNotNone(cache.get("u1"))
+        self.assertIsNone(cache.get("u2"))
+        self.assertIsNotNone(cache.get("u3"))
+        self.assertLessEqual(cache.size(), cache.max_bytes)
+
+    def test_hits_are_written_with_next_store(self):
+        """Lookups write nothing until the next store; the byte total follows replacements"""
+        cache = ResponseCache(":memory:")
+        cache.store("u1", "first body")
+        changes = cache._conn.total_changes
+        for _ in range(10):
+            cache.get("u1")
+        self.assertEqual(cache._conn.total_changes, changes)
+        cache.store("u1", "a much longer replacement body")
+        cache.store("u2", "second body")
+        self.assertEqual(cache._total, cache.size())
+
+    def test_collector_serves_304_from_cache(self):
+        """A 304 answer returns the cached body and sends validators"""
+        cache = ResponseCache(":memory:", ttl=0)
+        cache.store("http://example.com/page.html", "cached body", etag='"v1"')
+        collector = Collector("http://example.com/", delay=0, cache=cache)
+        collector.session.get = MagicMock(return_value=MagicMock(status_code=304))
+        self.assertEqual(collector.fetch("page.html"), "cached body")
+        _, kwargs = collector.session.get.call_args
+        self.assertEqual(kwargs["headers"], {"If-None-Match": '"v1"'})
+
+    def test_fresh_entry_skips_request(self):
+        """Entries within the TTL are served without touching the network"""
+        cache = ResponseCache(":memory:", ttl=60)
+        cache.store("http://example.com/page.html", "cached body")
+        collector = Collector("http://example.com/", delay=0, cache=cache)
+        collector.session.get = MagicMock()
+        self.assertEqual(collector.fetch("page.html"), "cached body")
+        collector.session.get.assert_not_called()
+
+
+ROBOTS_TXT = """
+User-agent: *
+Disallow: /
+
+User-agent: OtherBot
+User-agent: MidtermScraperBot
+Disallow: /catalogue/private
+Allow: /catalogue/private/open
+Disallow: /*.pdf$
+Crawl-delay: 0.5
+
+Sitemap: http://example.com/sitemap_index.xml
+"""
+
+
+class TestRobots(unittest.TestCase):
+    """Tests for robots.txt rules, caching and sitemap seeding."""
+
+    def test_rules_pick_agent_group_and_longest_match(self):
+        """Our group applies instead of *, and the longest matching rule decides"""
+        rules = RobotsRules.parse(ROBOTS_TXT)
+        self.assertTrue(rules.allowed("http://example.com/"))
+        self.assertTrue(rules.allowed("http://example.com/catalogue/page-2.html"))
+        self.assertFalse(rules.allowed("http://example.com/catalogue/private/a.html"))
+        self.assertTrue(rules.allowed("http://example.com/catalogue/private/open/a.html"))
+        self.assertFalse(rules.allowed("/files/book.pdf"))
+        self.assertTrue(rules.allowed("/files/book.pdf?page=2"))
+        self.assertEqual(rules.crawl_delay, 0.5)
+        self.assertEqual(rules.sitemaps, ["http://example.com/sitemap_index.xml"])
+        other = RobotsRules.parse(ROBOTS_TXT, user_agent="SomeoneElse/2.0")
+        self.assertFalse(other.allowed("http://example.com/index.html"))
+        self.assertTrue(other.allowed("http://example.com/robots.txt"))
+        self.assertIsNone(other.crawl_delay)
+
+    def test_status_handling_and_ttl(self):
+        """4xx allows all, 401/403 disallow all, and entries expire"""
+        self.assertTrue(RobotsRules.from_response(404).allowed("/a"))
+        self.assertFalse(RobotsRules.from_response(403).allowed("/a"))
+        self.assertTrue(RobotsRules.from_response(None).allowed("/a"))
+        cache = RobotsCache(ttl=60, error_ttl=0)
+        cache.store("http://example.com/x", 200, ROBOTS_TXT)
+        self.assertIsNotNone(cache.get("http://example.com/other/page.html"))
+        self.assertIsNone(cache.get("https://example.com/"))
+        cache.store("http://down.example/", 503)
+        self.assertIsNone(cache.get("http://down.example/"))
+
+    def test_sync_collector_checks_urls_and_applies_crawl_delay(self):
+        """Disallowed URLs are never requested and Crawl-delay spaces requests"""
+        collector = Collector("http://example.com/", delay=0.1, robots=RobotsCache())
+        collector.session.get = MagicMock(side_effect=lambda url, **kwargs: sync_response(
+            200, ROBOTS_TXT if url.endswith("/robots.txt") else "<html></html>"))
+        self.assertTrue(collector.check_robots_txt())
+        self.assertEqual(collector.limiter.delay, 0.5)
+        collector.limiter.delay = 0
+        with self.assertRaises(RobotsDisallowed):
+            collector.fetch("catalogue/private/a.html")
+        self.assertEqual(collector.fetch("catalogue/page-2.html"), "<html></html>")
+        requested = [call.args[0] for call in collector.session.get.call_args_list]
+        self.assertEqual(requested, ["http://example.com/robots.txt", "http://example.com/catalogue/page-2.html"])
+
+    def test_async_collector_shares_one_robots_fetch(self):
+        """Concurrent fetches wait for a single robots.txt request and use its Crawl-delay"""
+        class RobotsSession(FakeSession):
+            def get(self, url, **kwargs):
+                if url.endswith("/robots.txt"):
+                    self.urls.append(url)
+                    return FakeResponse(self, ROBOTS_TXT)
+                return super().get(url, **kwargs)
+
+        async def run():
+            collector = AsyncCollector("http://example.com/", delay=0, robots=RobotsCache())
+            collector.session = RobotsSession()
+            paths = ["a.html", "b.html", "catalogue/private/c.html"]
+            return collector, await collector.fetch_multi(paths)
+
+        collector, results = asyncio.run(run())
+        self.assertEqual(collector.session.urls.count("http://example.com/robots.txt"), 1)
+        self.assertIsInstance(results["catalogue/private/c.html"], RobotsDisallowed)
+        self.assertEqual(results["a.html"], "<html>http://example.com/a.html</html>")
+        self.assertEqual(collector.get_bucket("example.com").rate, 2.0)
+
+    def test_sitemap_seeds_listing_pages(self):
+        """Sitemap indexes are followed and their listing pages seed the crawl"""
+        files = {
+            "http://example.com/robots.txt": ROBOTS_TXT,
+            "http://example.com/sitemap_index.xml": (
+                '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                "<sitemap><loc>http://example.com/sitemap.xml</loc></sitemap></sitemapindex>"),
+            "http://example.com/sitemap.xml": (
+                '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                "<url><loc>http://example.com/catalogue/page-2.html</loc></url>"
+                "<url><loc>http://example.com/catalogue/category/books/poetry_1/index.html</loc></url>"
+                "<url><loc>http://example.com/catalogue/a_1/index.html</loc></url></urlset>"),
+        }
+        collector = Collector("http://example.com/", delay=0, robots=RobotsCache())
+        collector.session.get = MagicMock(side_effect=lambda url, **kwargs: sync_response(200, files[url]))
+        urls = collector.sitemap_urls()
+        self.assertEqual(len(urls), 3)
+        self.assertEqual(parse_sitemap("http://example.com/a\nhttp://example.com/b\n")[0],
+                         ["http://example.com/a", "http://example.com/b"])
+        self.assertEqual(listing_seeds("http://example.com/", urls), ["http://example.com/catalogue/page-2.html"])
+        self.assertEqual(len(listing_seeds("http://example.com/", urls, follow_categories=True)), 2)
+
+        fake = FakeCollector()
+        books = list(Crawler(fake, follow_pagination=False).crawl(seeds=listing_seeds(fake.base_url, urls)))
+        self.assertEqual([b.title for b in books], ["A", "B", "C"])
+
+
 if __name__ == "__main__":
     unittest.main()
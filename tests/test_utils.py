@@ -0,0 +1,522 @@
+import csv
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from models.data_models import Book
+from utils.file_handler import (
+    ArrowBookWriter, CsvBookWriter, JsonArrayBookWriter, JsonLinesBookWriter, MultiBookWriter,
+    ParquetBookWriter,
+    iter_books_from_csv, iter_books_from_file, iter_books_from_json, iter_books_from_jsonl,
+    load_books_from_json, read_books_table, save_books_to_csv, save_books_to_json
+)
+from utils.analyzer import (
+    CategoryAggregator, average_price_per_category, count_books_per_category, get_unavailable_books
+)
+from utils.book_table import BookTable
+from utils.book_store import SqliteBookStore
+from utils.logging_setup import JsonFormatter, SamplingFilter, setup_logging
+from utils.metrics import NO_METRICS, Histogram, Metrics
+
+
+def make_books(count):
+    """Build simple Book objects for tests."""
+    return [
+        Book(title=f"Book {i}", price=f"£{i}.50", url=f"http://example.com/{i}",
+             availability="In stock" if i % 2 else "Out of stock", category=f"Cat {i % 3}")
+        for i in range(count)
+    ]
+
+
+class TestStreamingWriters(unittest.TestCase):
+    """Tests for the streaming book writers in utils.file_handler."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def test_json_array_matches_json_dump(self):
+        """The streamed array is byte-identical to json.dump(indent=4)"""
+        books = make_books(3)
+        save_books_to_json(books, self.path("books.json"))
+        with open(self.path("books.json"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), json.dumps([b.to_dict() for b in books], ensure_ascii=False, indent=4))
+        self.assertEqual([b.title for b in load_books_from_json(self.path("books.json"))],
+                         ["Book 0", "Book 1", "Book 2"])
+
+    def test_rename_happens_on_close(self):
+        """Output appears under the final name only after close"""
+        writer = CsvBookWriter(self.path("books.csv"), batch_size=2)
+        writer.write_many(make_books(3))
+        self.assertFalse(os.path.exists(self.path("books.csv")))
+        writer.close()
+        self.assertFalse(os.path.exists(self.path("books.csv.part")))
+        with open(self.path("books.csv"), encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([r["title"] for r in rows], ["Book 0", "Book 1", "Book 2"])
+
+    def test_crash_keeps_flushed_batches(self):
+        """An exception leaves every written book in the .part file"""
+        with self.assertRaises(RuntimeError):
+            with JsonLinesBookWriter(self.path("books.jsonl"), batch_size=2) as writer:
+                writer.write_many(make_books(5))
+                raise RuntimeError("crawl died")
+        self.assertFalse(os.path.exists(self.path("books.jsonl")))
+        with open(self.path("books.jsonl.part"), encoding="utf-8") as f:
+            titles = [json.loads(line)["title"] for line in f]
+        self.assertEqual(titles, [f"Book {i}" for i in range(5)])
+
+    def test_batches_are_flushed_while_writing(self):
+        """Full batches reach the disk before the writer is closed"""
+        writer = JsonArrayBookWriter(self.path("books.json"), batch_size=2)
+        writer.write_many(make_books(3))
+        with open(self.path("books.json.part"), encoding="utf-8") as f:
+            self.assertEqual(f.read().count('"title"'), 2)
+        writer.close()
+
+
+class TestStreamingLoaders(unittest.TestCase):
+    """Tests for the iter_books_from_* generators."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.books = make_books(25)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def test_json_array_streaming_across_chunk_boundaries(self):
+        """Tiny chunks still decode every element of the array"""
+        save_books_to_json(self.books, self.path("books.json"))
+        for chunk_size in (1, 7, 64, 1 << 16):
+            titles = [b.title for b in iter_books_from_json(self.path("books.json"), chunk_size=chunk_size)]
+            self.assertEqual(titles, [b.title for b in self.books])
+
+    def test_compact_and_empty_arrays(self):
+        """Arrays without whitespace and empty arrays are handled"""
+        with open(self.path("compact.json"), "w", encoding="utf-8") as f:
+            json.dump([b.to_dict() for b in self.books[:2]], f, separators=(",", ":"))
+        self.assertEqual(len(list(iter_books_from_json(self.path("compact.json"), chunk_size=5))), 2)
+        with open(self.path("empty.json"), "w", encoding="utf-8") as f:
+            f.write("[ ]")
+        self.assertEqual(list(iter_books_from_json(self.path("empty.json"))), [])
+
+    def test_truncated_json_raises(self):
+        """A truncated array is reported instead of silently cut short"""
+        save_books_to_json(self.books, self.path("books.json"))
+        with open(self.path("books.json"), encoding="utf-8") as f:
+            text = f.read()
+        with open(self.path("broken.json"), "w", encoding="utf-8") as f:
+            f.write(text[:len(text) // 2])
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_books_from_json(self.path("broken.json"), chunk_size=100))
+        self.assertEqual(load_books_from_json(self.path("broken.json")), [])
+
+    def test_jsonl_and_csv_by_extension(self):
+        """iter_books_from_file picks the reader from the extension"""
+        with JsonLinesBookWriter(self.path("books.jsonl")) as writer:
+            writer.write_many(self.books)
+        save_books_to_csv(self.books, self.path("books.csv"))
+        for name in ("books.jsonl", "books.csv"):
+            self.assertEqual(count_books_per_category(iter_books_from_file(self.path(name))),
+                             count_books_per_category(self.books))
+        self.assertEqual(next(iter_books_from_jsonl(self.path("books.jsonl"))).title, "Book 0")
+        self.assertEqual(next(iter_books_from_csv(self.path("books.csv"))).price, "£0.50")
+        with self.assertRaises(ValueError):
+            iter_books_from_file(self.path("books.xml"))
+
+
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow not installed")
+class TestColumnarFiles(unittest.TestCase):
+    """Tests for the Parquet and Arrow IPC writers and readers."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.books = make_books(500) + [
+            Book(title="Odd", price="Free!", url="http://example.com/odd",
+                 availability="Last copy!", category="New"),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def test_round_trip_across_batches(self):
+        """Every format reads back the same books, including unparsable values"""
+        for name, writer_class in (("books.parquet", ParquetBookWriter), ("books.arrow", ArrowBookWriter),
+                                   ("books.feather", ArrowBookWriter)):
+            with self.subTest(name=name):
+                with writer_class(self.path(name), batch_size=64) as writer:
+                    writer.write_many(self.books)
+                self.assertEqual([b.to_dict() for b in iter_books_from_file(self.path(name))],
+                                 [b.to_dict() for b in self.books])
+
+    def test_typed_column_selective_reads(self):
+        """Columns are typed, categories dictionary-encoded, one row group per batch"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        with ParquetBookWriter(self.path("books.parquet"), batch_size=100) as writer:
+            writer.write_many(self.books)
+        table = read_books_table(self.path("books.parquet"), columns=["category", "price"])
+        self.assertEqual(table.column_names, ["category", "price"])
+        self.assertEqual(table.schema.field("price").type, pa.float64())
+        self.assertTrue(pa.types.is_dictionary(table.schema.field("category").type))
+        self.assertEqual(table.column("price")[3].as_py(), 3.5)
+        self.assertEqual(pq.ParquetFile(self.path("books.parquet")).num_row_groups, 6)
+
+        save_books_to_csv(self.books, self.path("books.csv"))
+        self.assertLess(os.path.getsize(self.path("books.parquet")), os.path.getsize(self.path("books.csv")) / 2)
+
+
+class TestBookTable(unittest.TestCase):
+    """The columnar backend must agree with the per-object analyzer."""
+
+    def setUp(self):
+        self.books = make_books(30) + [
+            Book(title="Free", price="Free!", url="http://example.com/free",
+                 availability="In stock (4 available)", category="Cat 0"),
+            Book(title="Lonely", price="Free!", url="http://example.com/lonely",
+                 availability="Out of stock", category="Empty"),
+        ]
+        self.table = BookTable.from_books(iter(self.books))
+
+    def test_matches_object_analyzer(self):
+        """count/average/unavailable give the same answers on a BookTable"""
+        self.assertEqual(len(self.table), len(self.books))
+        self.assertEqual(count_books_per_category(self.table), count_books_per_category(self.books))
+        expected = average_price_per_category(self.books)
+        actual = average_price_per_category(self.table)
+        self.assertEqual(actual.keys(), expected.keys())
+        for category in expected:
+            self.assertAlmostEqual(actual[category], expected[category])
+        self.assertEqual([b.to_dict() for b in get_unavailable_books(self.table)
+                          if b.title != "Lonely"],
+                         [b.to_dict() for b in get_unavailable_books(self.books) if b.title != "Lonely"])
+
+    def test_category_stats(self):
+        """category_stats reports count, sum, mean, min, max and stock in one call"""
+        stats = self.table.category_stats()
+        cat0 = [b for b in self.books if b.category == "Cat 0" and b.price_pence is not None]
+        self.assertEqual(stats["Cat 0"].count, 11)
+        self.assertEqual(stats["Cat 0"].priced, 10)
+        self.assertAlmostEqual(stats["Cat 0"].total, sum(b.price_value for b in cat0))
+        self.assertEqual(stats["Cat 0"].min, min(b.price_value for b in cat0))
+        self.assertEqual(stats["Cat 0"].max, max(b.price_value for b in cat0))
+        self.assertEqual(stats["Cat 0"].stock, 4)
+        self.assertEqual(stats["Empty"].mean, None)
+        self.assertEqual(stats["Empty"].out_of_stock, 1)
+
+    def test_empty_table(self):
+        """An empty input gives empty results"""
+        table = BookTable.from_books([])
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.category_stats(), {})
+        self.assertEqual(get_unavailable_books(table), [])
+
+    def test_mixed_currencies_are_rejected(self):
+        """Prices in different currencies are not summed together"""
+        dollars = Book(title="Dollar", price="$5.00", url="http://example.com/usd",
+                       availability="In stock", category="Cat 0")
+        with self.assertRaises(ValueError):
+            BookTable.from_books(self.books + [dollars])
+        self.assertEqual(BookTable.from_books([dollars]).currency, "USD")
+
+
+class TestCategoryAggregator(unittest.TestCase):
+    """Tests for the incremental aggregator."""
+
+    def setUp(self):
+        self.books = make_books(40) + [
+            Book(title="Free", price="Free!", url="http://example.com/free",
+                 availability="In stock (7 available)", category="Cat 1")
+        ]
+
+    def test_matches_batch_analyzer_and_table(self):
+        """Incremental results equal the batch and columnar ones"""
+        stats = CategoryAggregator()
+        stats.update(self.books)
+        self.assertEqual(stats.total, len(self.books))
+        self.assertEqual(count_books_per_category(stats), count_books_per_category(self.books))
+        self.assertEqual(average_price_per_category(stats), average_price_per_category(self.books))
+        self.assertEqual({b.url for b in get_unavailable_books(stats)},
+                         {b.url for b in get_unavailable_books(self.books)})
+        expected = BookTable.from_books(self.books).category_stats()
+        for category, row in stats.snapshot().items():
+            self.assertEqual(row._replace(total=0, mean=0), expected[category]._replace(total=0, mean=0))
+            self.assertAlmostEqual(row.mean, expected[category].mean)
+
+    def test_merge_equals_single_aggregator(self):
+        """Merging per-worker aggregators gives the same snapshot"""
+        whole = CategoryAggregator()
+        whole.update(self.books)
+        left, right = CategoryAggregator(), CategoryAggregator()
+        left.update(self.books[::2])
+        right.update(self.books[1::2])
+        left.merge(right)
+        self.assertEqual(left.snapshot(), whole.snapshot())
+        self.assertEqual(left.total, whole.total)
+
+    def test_snapshot_mid_stream(self):
+        """Snapshots reflect exactly the books added so far"""
+        stats = CategoryAggregator()
+        stats.update(self.books[:3])
+        first = stats.snapshot()
+        stats.update(self.books[3:])
+        self.assertEqual(sum(row.count for row in first.values()), 3)
+        self.assertEqual(sum(row.count for row in stats.snapshot().values()), len(self.books))
+
+
+class TestSqliteBookStore(unittest.TestCase):
+    """Tests for the SQLite storage backend."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "books.db")
+        self.books = make_books(30)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_queries_match_object_analyzer(self):
+        """Aggregations pushed down into SQL agree with the Python ones"""
+        with SqliteBookStore(self.path, batch_size=7) as store:
+            store.write_many(self.books)
+        store = SqliteBookStore(self.path)
+        self.assertEqual(len(store), 30)
+        self.assertEqual(count_books_per_category(store), count_books_per_category(self.books))
+        expected = average_price_per_category(self.books)
+        for category, mean in average_price_per_category(store).items():
+            self.assertAlmostEqual(mean, expected[category])
+        self.assertEqual(store.category_stats(), BookTable.from_books(self.books).category_stats())
+        self.assertEqual(sorted(b.url for b in get_unavailable_books(store)),
+                         sorted(b.url for b in get_unavailable_books(self.books)))
+        self.assertEqual([b.title for b in store.books_in_price_range(2, 3)], ["Book 2"])
+        self.assertEqual(store._query("PRAGMA journal_mode")[0][0], "wal")
+        store.close()
+
+    def test_upserts_keep_history_per_run(self):
+        """A second run updates books in place and adds a history row"""
+        with SqliteBookStore(self.path) as store:
+            store.write_many(self.books[:2])
+        first_run = store.run_id
+        changed = Book(title="Book 1", price="£9.99", url="http://example.com/1",
+                       availability="Out of stock", category="Cat 1")
+        with SqliteBookStore(self.path) as store:
+            store.write(changed)
+        store = SqliteBookStore(self.path)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(next(store.iter_books(category="Cat 1")).to_dict(), changed.to_dict())
+        history = store.price_history("http://example.com/1")
+        self.assertEqual([(p.run_id, p.price) for p in history], [(first_run, 1.5), (first_run + 1, 9.99)])
+        self.assertEqual(history[-1].status.name, "OUT_OF_STOCK")
+        store.close()
+
+    def test_out_of_stock_since(self):
+        """status_since only moves when the availability status changes"""
+        with patch("utils.book_store.time.time", return_value=1000.0):
+            with SqliteBookStore(self.path) as store:
+                store.write_many(self.books[:4])
+        between_runs = 1500.0
+        with patch("utils.book_store.time.time", return_value=2000.0), SqliteBookStore(self.path) as store:
+            # Book 0 stays out of stock, Book 1 goes out of stock in this run
+            store.write_many([self.books[0], Book(title="Book 1", price="£1.50", url="http://example.com/1",
+                                                  availability="Out of stock", category="Cat 1")])
+        store = SqliteBookStore(self.path)
+        self.assertEqual([b.title for b in store.out_of_stock_since(between_runs)], ["Book 0", "Book 2"])
+        self.assertEqual([b.title for b in store.out_of_stock_since()], ["Book 0", "Book 1", "Book 2"])
+        store.close()
+
+    def test_missing_values_and_streaming(self):
+        """A book without a category is stored as Unknown; iter_books streams past one fetch chunk"""
+        books = make_books(1200)
+        with SqliteBookStore(self.path) as store:
+            store.write_many(books)
+            store.write(Book(title="Loose", price=None, url="http://example.com/loose",
+                             availability=None, category=None))
+        store = SqliteBookStore(self.path)
+        self.assertEqual(sum(1 for _ in store.iter_books()), 1201)
+        self.assertEqual(next(store.iter_books(category="Unknown")).title, "Loose")
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+class TestMetrics(unittest.TestCase):
+    """Tests for the run metrics in utils.metrics."""
+
+    def test_histogram_percentiles_within_precision(self):
+        """Percentiles of a wide value range stay within 1% of the exact value"""
+        histogram = Histogram()
+        values = [i / 1000 for i in range(1, 10001)]  # 1 ms .. 10 s
+        for value in values:
+            histogram.record(value)
+        for q, exact in ((0.5, 5.0), (0.99, 9.9), (0.999, 9.99)):
+            self.assertAlmostEqual(histogram.percentile(q), exact, delta=exact * 0.01)
+        self.assertEqual((histogram.count, histogram.min, histogram.max), (10000, 0.001, 10.0))
+        self.assertLess(len(histogram._buckets), 2000)
+
+    def test_histogram_merge(self):
+        """Merging equals recording everything into one histogram"""
+        first, second, both = Histogram(), Histogram(), Histogram()
+        for i in range(100):
+            (first if i % 2 else second).record(i / 10)
+            both.record(i / 10)
+        first.merge(second)
+        self.assertEqual(first.summary(), both.summary())
+
+    def test_registry_pickles_and_merges(self):
+        """A worker's registry survives pickling and merges into the parent's"""
+        import pickle
+        parent, worker = Metrics(), Metrics()
+        parent.inc("http_requests_total", status=200)
+        parent.observe("parse_seconds", 0.1, page="detail")
+        worker.inc("http_requests_total", 2, status=200)
+        worker.observe("parse_seconds", 0.3, page="detail")
+        worker.set("concurrency_limit", 4, host="example.com")
+        parent.merge(pickle.loads(pickle.dumps(worker)))
+        self.assertEqual(parent.counter("http_requests_total", status=200), 3)
+        self.assertEqual(parent.histogram("parse_seconds", page="detail").count, 2)
+        self.assertEqual(parent.to_dict()["gauges"]["concurrency_limit"][0]["value"], 4)
+
+    def test_labels_json_and_prometheus(self):
+        """Labelled metrics are kept apart and exported in both formats"""
+        metrics = Metrics()
+        metrics.inc("http_requests_total", status=200)
+        metrics.inc("http_requests_total", 2, status=200)
+        metrics.inc("http_requests_total", status=503)
+        metrics.set("concurrency_limit", 8, host="example.com")
+        with metrics.timer("parse_seconds", page="detail"):
+            pass
+        self.assertEqual(metrics.counter("http_requests_total", status=200), 3)
+
+        data = json.loads(json.dumps(metrics.to_dict()))
+        self.assertEqual(data["counters"]["http_requests_total"],
+                         [{"labels": {"status": "200"}, "value": 3}, {"labels": {"status": "503"}, "value": 1}])
+        self.assertEqual(data["histograms"]["parse_seconds"][0]["summary"]["count"], 1)
+
+        text = metrics.to_prometheus()
+        self.assertIn("# TYPE scraper_http_requests_total counter\n", text)
+        self.assertIn('scraper_http_requests_total{status="200"} 3\n', text)
+        self.assertIn('scraper_concurrency_limit{host="example.com"} 8\n', text)
+        self.assertIn('scraper_parse_seconds{page="detail",quantile="0.99"}', text)
+        self.assertIn('scraper_parse_seconds_count{page="detail"} 1\n', text)
+
+    def test_writer_flushes_are_timed(self):
+        """MultiBookWriter records every flush of every writer"""
+        tmp = tempfile.mkdtemp()
+        try:
+            metrics = Metrics()
+            with MultiBookWriter([JsonLinesBookWriter(os.path.join(tmp, "books.jsonl"), batch_size=2)],
+                                 metrics) as writer:
+                for book in make_books(5):
+                    writer.write(book)
+        finally:
+            shutil.rmtree(tmp)
+        # Two full batches, then the final flush on close.
+        self.assertEqual(metrics.histogram("writer_flush_seconds", writer="JsonLinesBookWriter").count, 3)
+
+    def test_null_metrics_records_nothing(self):
+        """The default NO_METRICS ignores everything"""
+        NO_METRICS.inc("x")
+        NO_METRICS.observe("y", 1.0)
+        with NO_METRICS.timer("z"):
+            pass
+        self.assertEqual(NO_METRICS.to_dict()["counters"], {})
+        self.assertIsNone(NO_METRICS.histogram("y"))
+
+
+class TestLogging(unittest.TestCase):
+    """Tests for the structured logging in utils.logging_setup."""
+
+    def make_record(self, msg, *args, level=logging.INFO, **extra):
+        return logging.getLogger("scraper.test").makeRecord(
+            "scraper.test", level, __file__, 1, msg, args, None, extra=extra)
+
+    def test_json_formatter_includes_extra_fields(self):
+        """Messages are merged and extra fields become JSON keys"""
+        data = json.loads(JsonFormatter().format(self.make_record("Fetched %s", "a.html", url="http://x/a.html")))
+        self.assertEqual((data["level"], data["logger"], data["msg"]), ("INFO", "scraper.test", "Fetched a.html"))
+        self.assertEqual(data["url"], "http://x/a.html")
+        self.assertTrue(data["ts"].endswith("+00:00"))
+
+    def test_sampling_keeps_one_in_n_debug_records(self):
+        """DEBUG records are sampled per message; INFO records always pass"""
+        sampler = SamplingFilter(rate=10)
+        kept = [sampler.filter(self.make_record("Category for %s", i, level=logging.DEBUG)) for i in range(25)]
+        self.assertEqual(kept.count(True), 3)
+        self.assertTrue(kept[0])
+        self.assertTrue(all(sampler.filter(self.make_record("Saved")) for _ in range(5)))
+
+    def test_queue_listener_writes_json_lines(self):
+        """Records travel through the queue and reach the log file as JSON"""
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        tmp = tempfile.mkdtemp()
+        path = os.path.join(tmp, "scraper.log")
+        try:
+            with patch("sys.stderr"):
+                listener = setup_logging("INFO", path)
+                try:
+                    logging.getLogger("scraper.test").warning("Request failed: %s", "timeout", extra={"attempt": 2})
+                    try:
+                        raise ValueError("bad page")
+                    except ValueError:
+                        logging.getLogger("scraper.test").exception("Parse error")
+                finally:
+                    listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+            with open(path, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f]
+        finally:
+            root.handlers[:] = handlers
+            root.setLevel(level)
+            shutil.rmtree(tmp)
+        self.assertEqual(lines[0]["msg"], "Request failed: timeout")
+        self.assertEqual(lines[0]["attempt"], 2)
+        self.assertIn("ValueError: bad page", lines[1]["exc"])
+
+    def test_forked_child_restarts_listener(self):
+        """A forked process logs through a listener of its own, which stop() flushes"""
+        import multiprocessing
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        tmp = tempfile.mkdtemp()
+        path = os.path.join(tmp, "scraper.log")
+        try:
+            with patch("sys.stderr"):
+                listener = setup_logging("INFO", path)
+                try:
+                    child = multiprocessing.get_context("fork").Process(
+                        target=lambda: logging.getLogger("scraper.test").warning("From child"))
+                    child.start()
+                    child.join()
+                finally:
+                    listener.stop()
+                self.assertFalse(listener.running)
+            for handler in listener.handlers:
+                handler.close()
+            with open(path, encoding="utf-8") as f:
+                messages = [json.loads(line)["msg"] for line in f]
+        finally:
+            root.handlers[:] = handlers
+            root.setLevel(level)
+            shutil.rmtree(tmp)
+        self.assertEqual(messages, ["From child"])
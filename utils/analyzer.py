@@ -2,22 +2,36 @@
 analyzer.py
 
 Provides data analysis tools on scraped data.
+
+Every function makes a single pass over its input, so it accepts any
+iterable of books, including the streaming loaders in utils.file_handler.
+They also accept a utils.book_table.BookTable, in which case the work is
+done with vectorized NumPy group-bys, a utils.book_store.SqliteBookStore,
+in which case the query runs in SQL, or a CategoryAggregator that was fed
+the books while they were being scraped.
 """
 
-from typing import List, Dict
-from models.data_models import Book
+from typing import Dict, Iterable, List, Optional, Union
+from models.data_models import Availability, Book
+from utils.book_store import SqliteBookStore
+from utils.book_table import BookTable, CategoryStats
+
+Books = Union[Iterable[Book], BookTable, SqliteBookStore, "CategoryAggregator"]
 
 
-def count_books_per_category(books: List[Book]) -> Dict[str, int]:
+def count_books_per_category(books: Books) -> Dict[str, int]:
     """
     Count books grouped by category.
 
     Args:
-        books (List[Book]): List of Book objects.
+        books (Books): Book objects, a BookTable, a SqliteBookStore or a
+            CategoryAggregator.
 
     Returns:
         Dict[str, int]: Mapping of category to count.
     """
+    if isinstance(books, (BookTable, SqliteBookStore, CategoryAggregator)):
+        return books.count_per_category()
     counts = {}
     for book in books:
         cat = book.category
@@ -25,41 +39,153 @@ def count_books_per_category(books: List[Book]) -> Dict[str, int]:
     return counts
 
 
-def average_price_per_category(books: List[Book]) -> Dict[str, float]:
+def average_price_per_category(books: Books) -> Dict[str, float]:
     """
     Compute average price per category.
 
     Args:
-        books (List[Book]): List of Book objects.
+        books (Books): Book objects, a BookTable, a SqliteBookStore or a
+            CategoryAggregator.
 
     Returns:
         Dict[str, float]: Category to average price mapping.
     """
+    if isinstance(books, (BookTable, SqliteBookStore, CategoryAggregator)):
+        return books.average_price_per_category()
     sums = {}
     counts = {}
     for book in books:
-        cat = book.category
-        price_str = book.price.strip().replace('Â', '').replace('£', '').replace('$', '')
-        try:
-            price_val = float(price_str)
-        except ValueError:
+        if book.price_pence is None:
             continue
-        sums[cat] = sums.get(cat, 0.0) + price_val
+        cat = book.category
+        sums[cat] = sums.get(cat, 0) + book.price_pence
         counts[cat] = counts.get(cat, 0) + 1
     averages = {}
     for cat in sums:
-        averages[cat] = sums[cat] / counts[cat]
+        averages[cat] = sums[cat] / counts[cat] / 100
     return averages
 
 
-def get_unavailable_books(books: List[Book]) -> List[Book]:
+def get_unavailable_books(books: Books) -> List[Book]:
     """
     List books that are currently unavailable/out of stock.
 
     Args:
-        books (List[Book]): List of Book objects.
+        books (Books): Book objects, a BookTable, a SqliteBookStore or a
+            CategoryAggregator.
 
     Returns:
         List[Book]: List of unavailable Book objects.
     """
-    return [book for book in books if 'out of stock' in book.availability.lower()]
\ No newline at end of file
+    if isinstance(books, (BookTable, SqliteBookStore, CategoryAggregator)):
+        return books.unavailable_books()
+    return [book for book in books if book.status is Availability.OUT_OF_STOCK]
+
+
+class CategoryAggregator:
+    """
+    Per-category statistics maintained incrementally as books stream in.
+
+    Each category keeps its count, priced count, price sum/min/max (in
+    pence), stock total and out-of-stock count; out-of-stock books are kept
+    by URL. Aggregators built by separate workers can be merged, and
+    snapshot() can be called at any time, including mid-crawl.
+    """
+
+    def __init__(self):
+        # category -> [count, priced, sum, min, max, stock, out_of_stock]
+        self._stats: Dict[str, list] = {}
+        self._unavailable: Dict[str, Book] = {}
+        self.total = 0
+
+    def add(self, book: Book):
+        """
+        Fold one book into the aggregates.
+
+        Args:
+            book (Book): Book to add.
+        """
+        stats = self._stats.get(book.category)
+        if stats is None:
+            stats = self._stats[book.category] = [0, 0, 0, None, None, 0, 0]
+        stats[0] += 1
+        pence = book.price_pence
+        if pence is not None:
+            stats[1] += 1
+            stats[2] += pence
+            stats[3] = pence if stats[3] is None else min(stats[3], pence)
+            stats[4] = pence if stats[4] is None else max(stats[4], pence)
+        if book.stock:
+            stats[5] += book.stock
+        if book.status is Availability.OUT_OF_STOCK:
+            stats[6] += 1
+            self._unavailable[book.url] = book
+        self.total += 1
+
+    def update(self, books: Iterable[Book]):
+        """
+        Fold several books into the aggregates.
+
+        Args:
+            books (Iterable[Book]): Books to add.
+        """
+        for book in books:
+            self.add(book)
+
+    def merge(self, other: "CategoryAggregator"):
+        """
+        Combine another aggregator (e.g. from a worker process) into this one.
+
+        Args:
+            other (CategoryAggregator): Aggregator to merge in; left unchanged.
+        """
+        for category, theirs in other._stats.items():
+            ours = self._stats.get(category)
+            if ours is None:
+                self._stats[category] = list(theirs)
+                continue
+            for i in (0, 1, 2, 5, 6):
+                ours[i] += theirs[i]
+            ours[3] = _pick(min, ours[3], theirs[3])
+            ours[4] = _pick(max, ours[4], theirs[4])
+        self._unavailable.update(other._unavailable)
+        self.total += other.total
+
+    def snapshot(self) -> Dict[str, CategoryStats]:
+        """
+        Return the current statistics; prices are in major units (pounds).
+
+        Returns:
+            Dict[str, CategoryStats]: Statistics keyed by category name.
+        """
+        return {
+            category: CategoryStats(
+                count=count,
+                priced=priced,
+                total=total / 100,
+                mean=total / priced / 100 if priced else None,
+                min=low / 100 if low is not None else None,
+                max=high / 100 if high is not None else None,
+                stock=stock,
+                out_of_stock=out_of_stock,
+            )
+            for category, (count, priced, total, low, high, stock, out_of_stock) in self._stats.items()
+        }
+
+    def count_per_category(self) -> Dict[str, int]:
+        return {category: stats[0] for category, stats in self._stats.items()}
+
+    def average_price_per_category(self) -> Dict[str, float]:
+        return {category: stats[2] / stats[1] / 100
+                for category, stats in self._stats.items() if stats[1]}
+
+    def unavailable_books(self) -> List[Book]:
+        return list(self._unavailable.values())
+
+
+def _pick(func, a: Optional[int], b: Optional[int]) -> Optional[int]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return func(a, b)
@@ -0,0 +1,349 @@
+"""
+book_store.py
+
+SQLite storage backend for scraped books.
+
+Books are upserted by URL in batches with ``executemany`` inside a single
+transaction per batch, with the database in WAL mode so readers (e.g. the
+GUI) are never blocked by a running scrape. Every scrape run is recorded,
+together with each book's price and availability in that run, so price
+history and "out of stock since" questions can be answered later.
+
+Aggregations are pushed down into SQL (GROUP BY over indexed columns), so
+analysis does not need to load every book into Python.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from models.data_models import Availability, Book
+from utils.book_table import CategoryStats
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS runs ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " started_at REAL NOT NULL,"
+    " finished_at REAL,"
+    " book_count INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE IF NOT EXISTS books ("
+    " url TEXT PRIMARY KEY,"
+    " title TEXT NOT NULL,"
+    " category TEXT NOT NULL,"
+    " price TEXT NOT NULL,"
+    " price_pence INTEGER,"
+    " currency TEXT,"
+    " availability TEXT NOT NULL,"
+    " status TEXT NOT NULL,"
+    " stock INTEGER,"
+    " status_since REAL NOT NULL,"
+    " first_seen REAL NOT NULL,"
+    " last_seen REAL NOT NULL,"
+    " run_id INTEGER NOT NULL REFERENCES runs (id))",
+    "CREATE INDEX IF NOT EXISTS books_category ON books (category)",
+    "CREATE INDEX IF NOT EXISTS books_price ON books (price_pence)",
+    "CREATE INDEX IF NOT EXISTS books_status ON books (status, status_since)",
+    "CREATE TABLE IF NOT EXISTS price_history ("
+    " url TEXT NOT NULL,"
+    " run_id INTEGER NOT NULL REFERENCES runs (id),"
+    " scraped_at REAL NOT NULL,"
+    " price_pence INTEGER,"
+    " status TEXT NOT NULL,"
+    " PRIMARY KEY (url, run_id))",
+    "CREATE INDEX IF NOT EXISTS price_history_scraped ON price_history (scraped_at)",
+)
+
+# status_since only moves when the availability status actually changes.
+# Missing values (e.g. from a short CSV row) are stored as "Unknown" or ""
+# to satisfy the NOT NULL columns.
+_UPSERT_BOOK = (
+    "INSERT INTO books (url, title, category, price, price_pence, currency, availability,"
+    " status, stock, status_since, first_seen, last_seen, run_id)"
+    " VALUES (?, ?, COALESCE(?, 'Unknown'), COALESCE(?, ''), ?, ?, COALESCE(?, ''),"
+    " ?, ?, ?, ?, ?, ?)"
+    " ON CONFLICT (url) DO UPDATE SET"
+    " title = excluded.title, category = excluded.category, price = excluded.price,"
+    " price_pence = excluded.price_pence, currency = excluded.currency,"
+    " availability = excluded.availability, stock = excluded.stock,"
+    " status_since = CASE WHEN books.status = excluded.status"
+    " THEN books.status_since ELSE excluded.status_since END,"
+    " status = excluded.status, last_seen = excluded.last_seen, run_id = excluded.run_id"
+)
+
+_UPSERT_HISTORY = (
+    "INSERT OR REPLACE INTO price_history (url, run_id, scraped_at, price_pence, status)"
+    " VALUES (?, ?, ?, ?, ?)"
+)
+
+_BOOK_COLUMNS = "title, price, url, availability, category"
+
+# Rows fetched per lock acquisition while streaming a query.
+_FETCH_SIZE = 500
+
+
+class PricePoint(NamedTuple):
+    """
+    A book's price and availability as seen by one scrape run.
+    """
+    run_id: int
+    scraped_at: float
+    price: Optional[float]
+    status: Availability
+
+
+class SqliteBookStore:
+    """
+    Book storage in a SQLite database, indexed on URL, category and price.
+
+    The store has the same write interface as the streaming writers in
+    utils.file_handler (write, write_many, flush, close, context manager),
+    so it can be combined with them in a MultiBookWriter.
+    """
+
+    def __init__(self, path: str = "data/books.db", batch_size: int = 500):
+        """
+        Open (or create) a book database.
+
+        Args:
+            path (str): SQLite database file (":memory:" for a throwaway store).
+            batch_size (int): Number of books buffered between upserts.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.count = 0
+        self.run_id: Optional[int] = None
+        self._buffer: List[Book] = []
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def write(self, book: Book):
+        """
+        Buffer one book, upserting the batch when it is full.
+
+        Args:
+            book (Book): Book to store.
+        """
+        self._buffer.append(book)
+        self.count += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, books: Iterable[Book]):
+        """
+        Buffer several books.
+
+        Args:
+            books (Iterable[Book]): Books to store.
+        """
+        for book in books:
+            self.write(book)
+
+    def flush(self):
+        """
+        Upsert buffered books and record them in the current run's history.
+
+        The first flush of a store starts a new run.
+        """
+        if not self._buffer:
+            return
+        now = time.time()
+        books = []
+        history = []
+        with self._lock:
+            if self.run_id is None:
+                self.run_id = self._conn.execute(
+                    "INSERT INTO runs (started_at) VALUES (?)", (now,)
+                ).lastrowid
+            for book in self._buffer:
+                books.append((book.url, book.title, book.category, book.price, book.price_pence,
+                              book.currency, book.availability, book.status.name, book.stock,
+                              now, now, now, self.run_id))
+                history.append((book.url, self.run_id, now, book.price_pence, book.status.name))
+            with self._conn:
+                self._conn.executemany(_UPSERT_BOOK, books)
+                self._conn.executemany(_UPSERT_HISTORY, history)
+                self._conn.execute("UPDATE runs SET book_count = ? WHERE id = ?", (self.count, self.run_id))
+        self._buffer.clear()
+
+    def close(self):
+        """
+        Flush pending books, mark the run finished and close the database.
+        """
+        self.flush()
+        with self._lock:
+            if self.run_id is not None:
+                with self._conn:
+                    self._conn.execute("UPDATE runs SET finished_at = ? WHERE id = ?",
+                                       (time.time(), self.run_id))
+            self._conn.close()
+
+    def abort(self):
+        """
+        Keep every book written so far but leave the run unfinished.
+        """
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _iter_query(self, sql: str, params: tuple = ()) -> Iterator[tuple]:
+        # Stream rows in chunks, taking the lock per chunk rather than for
+        # the whole iteration.
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(_FETCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+
+    def __len__(self) -> int:
+        return self._query("SELECT COUNT(*) FROM books")[0][0]
+
+    def iter_books(self, category: Optional[str] = None) -> Iterator[Book]:
+        """
+        Stream stored books ordered by title, without loading them all.
+
+        Args:
+            category (Optional[str]): Only return books in this category.
+
+        Returns:
+            Iterator[Book]: The books.
+        """
+        if category is None:
+            rows = self._iter_query(f"SELECT {_BOOK_COLUMNS} FROM books ORDER BY title")
+        else:
+            rows = self._iter_query(f"SELECT {_BOOK_COLUMNS} FROM books WHERE category = ? ORDER BY title",
+                                    (category,))
+        return (Book(*row) for row in rows)
+
+    def count_per_category(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Number of books per category.
+        """
+        return dict(self._query("SELECT category, COUNT(*) FROM books GROUP BY category"))
+
+    def average_price_per_category(self) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float]: Mean price per category (categories without
+            any parsable price are omitted).
+        """
+        rows = self._query(
+            "SELECT category, SUM(price_pence), COUNT(price_pence) FROM books"
+            " WHERE price_pence IS NOT NULL GROUP BY category"
+        )
+        return {category: total / priced / 100 for category, total, priced in rows}
+
+    def category_stats(self) -> Dict[str, CategoryStats]:
+        """
+        Compute count, sum, mean, min, max, stock total and out-of-stock
+        count for every category in one GROUP BY query.
+
+        Returns:
+            Dict[str, CategoryStats]: Statistics keyed by category name.
+        """
+        rows = self._query(
+            "SELECT category, COUNT(*), COUNT(price_pence), COALESCE(SUM(price_pence), 0),"
+            " MIN(price_pence), MAX(price_pence), COALESCE(SUM(MAX(stock, 0)), 0),"
+            " SUM(status = ?) FROM books GROUP BY category",
+            (Availability.OUT_OF_STOCK.name,)
+        )
+        return {
+            category: CategoryStats(
+                count=count,
+                priced=priced,
+                total=total / 100,
+                mean=total / priced / 100 if priced else None,
+                min=low / 100 if low is not None else None,
+                max=high / 100 if high is not None else None,
+                stock=stock,
+                out_of_stock=out_of_stock,
+            )
+            for category, count, priced, total, low, high, stock, out_of_stock in rows
+        }
+
+    def unavailable_books(self) -> List[Book]:
+        """
+        Returns:
+            List[Book]: Out-of-stock books.
+        """
+        return self.out_of_stock_since()
+
+    def out_of_stock_since(self, timestamp: Optional[float] = None) -> List[Book]:
+        """
+        List books that are out of stock and have been since at least ``timestamp``.
+
+        Args:
+            timestamp (Optional[float]): Unix time; None lists every
+                out-of-stock book.
+
+        Returns:
+            List[Book]: Matching books, ordered by title.
+        """
+        sql = f"SELECT {_BOOK_COLUMNS} FROM books WHERE status = ?"
+        params = (Availability.OUT_OF_STOCK.name,)
+        if timestamp is not None:
+            sql += " AND status_since <= ?"
+            params += (timestamp,)
+        return [Book(*row) for row in self._query(sql + " ORDER BY title", params)]
+
+    def books_in_price_range(self, low: float, high: float) -> List[Book]:
+        """
+        List books priced between ``low`` and ``high`` (inclusive), cheapest first.
+
+        Args:
+            low (float): Minimum price in major units.
+            high (float): Maximum price in major units.
+
+        Returns:
+            List[Book]: Matching books.
+        """
+        rows = self._query(
+            f"SELECT {_BOOK_COLUMNS} FROM books WHERE price_pence BETWEEN ? AND ?"
+            " ORDER BY price_pence, title",
+            (round(low * 100), round(high * 100))
+        )
+        return [Book(*row) for row in rows]
+
+    def price_history(self, url: str) -> List[PricePoint]:
+        """
+        Return what every run recorded for one book.
+
+        Args:
+            url (str): Product URL.
+
+        Returns:
+            List[PricePoint]: One point per run that saw the book, oldest first.
+        """
+        rows = self._query(
+            "SELECT run_id, scraped_at, price_pence, status FROM price_history"
+            " WHERE url = ? ORDER BY scraped_at, run_id", (url,)
+        )
+        return [PricePoint(run_id, scraped_at, pence / 100 if pence is not None else None, Availability[status])
+                for run_id, scraped_at, pence, status in rows]
@@ -0,0 +1,223 @@
+"""
+book_table.py
+
+Columnar, NumPy-backed representation of a book dataset.
+
+Categories are dictionary-encoded into integer codes and prices are kept as
+integer pence, so per-category statistics are computed with vectorized
+group-bys (np.bincount / ufunc.reduceat) instead of Python loops.
+"""
+
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from models.data_models import Availability, Book, format_availability, format_price
+
+# Availability <-> int8 code used in the status column.
+STATUSES = list(Availability)
+_STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+
+def _column(buffer: array, dtype) -> np.ndarray:
+    # Zero-copy view of an array.array buffer (frombuffer rejects empty ones).
+    return np.frombuffer(buffer, dtype=dtype) if len(buffer) else np.zeros(0, dtype)
+
+
+class CategoryStats(NamedTuple):
+    """
+    Aggregates for one category. Prices are in major units (pounds).
+    """
+    count: int
+    priced: int
+    total: float
+    mean: Optional[float]
+    min: Optional[float]
+    max: Optional[float]
+    stock: int
+    out_of_stock: int
+
+
+class BookTable:
+    """
+    Books stored column by column.
+
+    Attributes:
+        categories (List[str]): Category names; index = category code.
+        category_codes (np.ndarray): int32 category code per book.
+        price_pence (np.ndarray): int64 price in pence (0 where unknown).
+        has_price (np.ndarray): bool, False where the price was unparsable.
+        stock (np.ndarray): int32 stock count (-1 where unknown).
+        status (np.ndarray): int8 index into STATUSES.
+        titles (List[str]): Titles, kept for row lookups.
+        urls (List[str]): URLs, kept for row lookups.
+        currency (str): Currency code of the priced rows.
+    """
+
+    def __init__(self, categories: List[str], category_codes: np.ndarray, price_pence: np.ndarray,
+                 has_price: np.ndarray, stock: np.ndarray, status: np.ndarray,
+                 titles: List[str], urls: List[str], currency: str = "GBP"):
+        self.categories = categories
+        self.category_codes = category_codes
+        self.price_pence = price_pence
+        self.has_price = has_price
+        self.stock = stock
+        self.status = status
+        self.titles = titles
+        self.urls = urls
+        self.currency = currency
+
+    @classmethod
+    def from_books(cls, books: Iterable[Book]) -> "BookTable":
+        """
+        Build a table from any iterable of books in a single pass.
+
+        Columns are accumulated in compact ``array`` buffers, so a
+        streaming loader can feed this without materializing Book lists.
+
+        Args:
+            books (Iterable[Book]): Books to load.
+
+        Returns:
+            BookTable: The columnar table.
+
+        Raises:
+            ValueError: If the priced books use more than one currency, whose
+                prices could not be summed.
+        """
+        codes: Dict[str, int] = {}
+        category_codes = array("i")
+        price_pence = array("q")
+        has_price = array("b")
+        stock = array("i")
+        status = array("b")
+        titles, urls = [], []
+        currency = None
+        for book in books:
+            code = codes.get(book.category)
+            if code is None:
+                code = codes[book.category] = len(codes)
+            category_codes.append(code)
+            priced = book.price_pence is not None
+            price_pence.append(book.price_pence if priced else 0)
+            has_price.append(priced)
+            if priced:
+                if currency is None:
+                    currency = book.currency
+                elif book.currency != currency:
+                    raise ValueError(f"Mixed currencies: {currency} and {book.currency} ({book.url})")
+            stock.append(-1 if book.stock is None else book.stock)
+            status.append(_STATUS_CODES[book.status])
+            titles.append(book.title)
+            urls.append(book.url)
+        return cls(
+            categories=list(codes),
+            category_codes=_column(category_codes, np.int32),
+            price_pence=_column(price_pence, np.int64),
+            has_price=_column(has_price, np.int8).astype(bool),
+            stock=_column(stock, np.int32),
+            status=_column(status, np.int8),
+            titles=titles,
+            urls=urls,
+            currency=currency or "GBP",
+        )
+
+    def __len__(self) -> int:
+        return len(self.category_codes)
+
+    @property
+    def out_of_stock(self) -> np.ndarray:
+        """
+        np.ndarray: bool mask of out-of-stock rows.
+        """
+        return self.status == _STATUS_CODES[Availability.OUT_OF_STOCK]
+
+    def count_per_category(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Number of books per category.
+        """
+        counts = np.bincount(self.category_codes, minlength=len(self.categories))
+        return {name: int(n) for name, n in zip(self.categories, counts)}
+
+    def average_price_per_category(self) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float]: Mean price per category (categories without
+            any parsable price are omitted).
+        """
+        return {name: s.mean for name, s in self.category_stats().items() if s.priced}
+
+    def category_stats(self) -> Dict[str, CategoryStats]:
+        """
+        Compute count, sum, mean, min, max, stock total and out-of-stock
+        count for every category with vectorized group-bys.
+
+        Returns:
+            Dict[str, CategoryStats]: Statistics keyed by category name.
+        """
+        k = len(self.categories)
+        codes = self.category_codes
+        counts = np.bincount(codes, minlength=k)
+        out_counts = np.bincount(codes[self.out_of_stock], minlength=k)
+        stock_totals = np.bincount(codes, weights=np.maximum(self.stock, 0), minlength=k)
+
+        priced_codes = codes[self.has_price]
+        prices = self.price_pence[self.has_price]
+        priced_counts = np.bincount(priced_codes, minlength=k)
+        sums = np.bincount(priced_codes, weights=prices, minlength=k)
+
+        mins = np.zeros(k, dtype=np.int64)
+        maxs = np.zeros(k, dtype=np.int64)
+        if len(prices):
+            order = np.argsort(priced_codes, kind="stable")
+            sorted_codes = priced_codes[order]
+            sorted_prices = prices[order]
+            starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+            present = sorted_codes[starts]
+            mins[present] = np.minimum.reduceat(sorted_prices, starts)
+            maxs[present] = np.maximum.reduceat(sorted_prices, starts)
+
+        stats = {}
+        for code, name in enumerate(self.categories):
+            priced = int(priced_counts[code])
+            stats[name] = CategoryStats(
+                count=int(counts[code]),
+                priced=priced,
+                total=float(sums[code]) / 100,
+                mean=float(sums[code]) / priced / 100 if priced else None,
+                min=int(mins[code]) / 100 if priced else None,
+                max=int(maxs[code]) / 100 if priced else None,
+                stock=int(stock_totals[code]),
+                out_of_stock=int(out_counts[code]),
+            )
+        return stats
+
+    def book_at(self, index: int) -> Book:
+        """
+        Rebuild the Book stored in one row.
+
+        Args:
+            index (int): Row index.
+
+        Returns:
+            Book: The book (unparsable prices come back as "").
+        """
+        stock = int(self.stock[index])
+        status = STATUSES[self.status[index]]
+        availability = format_availability(status, stock if stock >= 0 else None)
+        return Book(
+            title=self.titles[index],
+            price=format_price(int(self.price_pence[index]), self.currency) if self.has_price[index] else "",
+            url=self.urls[index],
+            availability=availability,
+            category=self.categories[self.category_codes[index]],
+        )
+
+    def unavailable_books(self) -> List[Book]:
+        """
+        Returns:
+            List[Book]: Out-of-stock books.
+        """
+        return [self.book_at(i) for i in np.flatnonzero(self.out_of_stock)]
@@ -3,12 +3,476 @@ file_handler.py
 
 Handles saving and loading scraped data files (CSV, JSON)
 with error handling.
+
+The ``iter_books_from_*`` generators read one book at a time, so exports of
+any size can be processed in constant memory.
+
+The streaming writers append books as they are produced: rows are buffered
+and flushed in batches to ``<filename>.part``, which is renamed over the
+final filename only when the writer is closed cleanly. If the crawl dies,
+the ``.part`` file keeps everything flushed so far.
+
+Parquet and Arrow IPC (Feather v2) files store typed columns: the price as
+float64 plus a currency code, availability as a status plus an integer
+stock count, and category, currency and status dictionary-encoded. Each
+flush writes one row group / record batch. These formats need the optional
+pyarrow package, which is only imported when they are used.
 """
 
 import csv
+import io
 import json
-from typing import List
-from models.data_models import Book
+import logging
+import os
+from typing import Iterable, Iterator, List, Optional
+from models.data_models import Availability, Book, format_availability, format_price
+from utils.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+FIELDNAMES = ["title", "price", "url", "availability", "category"]
+ARROW_EXTENSIONS = (".arrow", ".feather")
+
+
+class BookWriter:
+    """
+    Base class for streaming, atomically renamed book writers.
+    """
+
+    def __init__(self, filename: str, batch_size: int = 100, fsync: bool = False):
+        """
+        Open ``<filename>.part`` for writing.
+
+        Args:
+            filename (str): Final output filename.
+            batch_size (int): Number of books buffered between flushes.
+            fsync (bool): Also fsync on every flush (survives OS crashes,
+                not just process crashes).
+        """
+        self.filename = filename
+        self.part_filename = filename + ".part"
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.count = 0
+        self._buffer: List[str] = []
+        self._file = open(self.part_filename, "w", encoding="utf-8", newline='')
+        self._write_header()
+
+    def _write_header(self):
+        pass
+
+    def _write_footer(self):
+        pass
+
+    def _format(self, book: Book) -> str:
+        raise NotImplementedError
+
+    def write(self, book: Book):
+        """
+        Append one book, flushing when the batch is full.
+
+        Args:
+            book (Book): Book to write.
+        """
+        self._buffer.append(self._format(book))
+        self.count += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, books: Iterable[Book]):
+        """
+        Append several books.
+
+        Args:
+            books (Iterable[Book]): Books to write.
+        """
+        for book in books:
+            self.write(book)
+
+    def flush(self):
+        """
+        Write buffered books to the ``.part`` file.
+        """
+        if self._buffer:
+            self._file.write("".join(self._buffer))
+            self._buffer.clear()
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        """
+        Finish the file and atomically move it to its final name.
+        """
+        self._write_footer()
+        self.flush()
+        self._file.close()
+        os.replace(self.part_filename, self.filename)
+
+    def abort(self):
+        """
+        Flush what has been written and leave it in the ``.part`` file.
+        """
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class JsonLinesBookWriter(BookWriter):
+    """
+    Writes one JSON object per line.
+    """
+
+    def _format(self, book: Book) -> str:
+        return json.dumps(book.to_dict(), ensure_ascii=False) + "\n"
+
+
+class JsonArrayBookWriter(BookWriter):
+    """
+    Writes a JSON array in the same layout as ``json.dump(..., indent=4)``.
+    """
+
+    def _write_header(self):
+        self._file.write("[")
+
+    def _format(self, book: Book) -> str:
+        item = json.dumps(book.to_dict(), ensure_ascii=False, indent=4).replace("\n", "\n    ")
+        return ("\n    " if self.count == 0 else ",\n    ") + item
+
+    def _write_footer(self):
+        self._buffer.append("\n]" if self.count else "]")
+
+
+class CsvBookWriter(BookWriter):
+    """
+    Writes CSV rows with a header line.
+    """
+
+    def _write_header(self):
+        self._row = io.StringIO()
+        self._csv = csv.DictWriter(self._row, fieldnames=FIELDNAMES)
+        self._csv.writeheader()
+        self._file.write(self._take_row())
+
+    def _take_row(self) -> str:
+        text = self._row.getvalue()
+        self._row.seek(0)
+        self._row.truncate()
+        return text
+
+    def _format(self, book: Book) -> str:
+        self._csv.writerow(book.to_dict())
+        return self._take_row()
+
+
+class MultiBookWriter:
+    """
+    Fans each book out to several writers and closes them together.
+    """
+
+    def __init__(self, writers: List[BookWriter], metrics: Optional[Metrics] = None):
+        """
+        Args:
+            writers (List[BookWriter]): Writers receiving every book.
+            metrics (Optional[Metrics]): Records the duration of every flush
+                of every writer in ``writer_flush_seconds``, labelled with
+                the writer's class.
+        """
+        self.writers = writers
+        if metrics is not None:
+            for writer in writers:
+                writer.flush = metrics.timed(writer.flush, "writer_flush_seconds",
+                                             writer=type(writer).__name__)
+
+    @property
+    def count(self) -> int:
+        return self.writers[0].count if self.writers else 0
+
+    def write(self, book: Book):
+        for writer in self.writers:
+            writer.write(book)
+
+    def write_many(self, books: Iterable[Book]):
+        """
+        Append several books to every writer.
+
+        Args:
+            books (Iterable[Book]): Books to write; consumed once.
+        """
+        for book in books:
+            self.write(book)
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+    def abort(self):
+        for writer in self.writers:
+            writer.abort()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def arrow_schema():
+    """
+    Build the Arrow schema used for Parquet and Arrow IPC files.
+
+    ``price_raw`` and ``availability_raw`` hold the original text only for
+    values that do not round-trip through the typed columns (e.g. "Free!").
+
+    Returns:
+        pyarrow.Schema: The book schema.
+    """
+    import pyarrow as pa
+    text = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("title", pa.string()),
+        ("url", pa.string()),
+        ("category", text),
+        ("price", pa.float64()),
+        ("currency", text),
+        ("status", text),
+        ("stock", pa.int32()),
+        ("price_raw", pa.string()),
+        ("availability_raw", pa.string()),
+    ])
+
+
+def _raw_text(raw: dict, field: str) -> Optional[str]:
+    # Raw values may be numbers (e.g. a price read from JSON); store them as text.
+    value = raw.get(field)
+    return None if value is None else str(value)
+
+
+def _books_from_batch(batch) -> Iterator[Book]:
+    columns = {name: batch.column(name).to_pylist() for name in batch.schema.names}
+    for title, url, category, price, currency, status, stock, price_raw, availability_raw in zip(
+            columns["title"], columns["url"], columns["category"], columns["price"], columns["currency"],
+            columns["status"], columns["stock"], columns["price_raw"], columns["availability_raw"]):
+        if price_raw is None and price is not None:
+            price_raw = format_price(round(price * 100), currency)
+        if availability_raw is None:
+            availability_raw = format_availability(Availability[status], stock)
+        yield Book(title=title, price=price_raw, url=url, availability=availability_raw, category=category)
+
+
+class ArrowBookWriter:
+    """
+    Streams books into an Arrow IPC file (Feather v2), one record batch per flush.
+
+    Like BookWriter, output goes to ``<filename>.part`` and is renamed on close.
+    """
+
+    def __init__(self, filename: str, batch_size: int = 10000, compression: Optional[str] = None):
+        """
+        Open ``<filename>.part`` for writing.
+
+        Args:
+            filename (str): Final output filename (.arrow or .feather).
+            batch_size (int): Number of books per record batch / row group.
+            compression (Optional[str]): Buffer compression ("zstd", "lz4"
+                or None). Uncompressed files can be memory-mapped without
+                copying.
+        """
+        import pyarrow as pa
+        self._pa = pa
+        self.filename = filename
+        self.part_filename = filename + ".part"
+        self.batch_size = batch_size
+        self.compression = compression
+        self.schema = arrow_schema()
+        self.count = 0
+        self._buffer: List[Book] = []
+        # Dictionaries only ever grow, so later batches are written as deltas
+        # (IPC files cannot replace a dictionary between batches).
+        self._dictionaries = {"category": {}, "currency": {}, "status": {}}
+        self._writer = self._open()
+
+    def _open(self):
+        options = self._pa.ipc.IpcWriteOptions(compression=self.compression, emit_dictionary_deltas=True)
+        return self._pa.ipc.new_file(self.part_filename, self.schema, options=options)
+
+    def _encode(self, field: str, values: List[Optional[str]]):
+        codes = self._dictionaries[field]
+        indices = [None if value is None else codes.setdefault(value, len(codes)) for value in values]
+        return self._pa.DictionaryArray.from_arrays(
+            self._pa.array(indices, self._pa.int32()), self._pa.array(list(codes), self._pa.string()))
+
+    def _batch(self, books: List[Book]):
+        pa = self._pa
+        raw = [book._raw or {} for book in books]
+        return pa.record_batch([
+            pa.array([book.title for book in books], pa.string()),
+            pa.array([book.url for book in books], pa.string()),
+            self._encode("category", [book.category for book in books]),
+            pa.array([book.price_value for book in books], pa.float64()),
+            self._encode("currency", [book.currency for book in books]),
+            self._encode("status", [book.status.name for book in books]),
+            pa.array([book.stock for book in books], pa.int32()),
+            pa.array([_raw_text(r, "price") for r in raw], pa.string()),
+            pa.array([_raw_text(r, "availability") for r in raw], pa.string()),
+        ], schema=self.schema)
+
+    def write(self, book: Book):
+        """
+        Append one book, writing a batch when the buffer is full.
+
+        Args:
+            book (Book): Book to write.
+        """
+        self._buffer.append(book)
+        self.count += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, books: Iterable[Book]):
+        """
+        Append several books.
+
+        Args:
+            books (Iterable[Book]): Books to write.
+        """
+        for book in books:
+            self.write(book)
+
+    def flush(self):
+        """
+        Write buffered books as one record batch.
+        """
+        if self._buffer:
+            self._write_batch(self._batch(self._buffer))
+            self._buffer.clear()
+
+    def _write_batch(self, batch):
+        self._writer.write_batch(batch)
+
+    def close(self):
+        """
+        Finish the file and atomically move it to its final name.
+        """
+        self.flush()
+        self._writer.close()
+        os.replace(self.part_filename, self.filename)
+
+    def abort(self):
+        """
+        Close the ``.part`` file without renaming it.
+        """
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ParquetBookWriter(ArrowBookWriter):
+    """
+    Streams books into a Parquet file, one row group per flush.
+    """
+
+    def __init__(self, filename: str, batch_size: int = 10000, compression: Optional[str] = "zstd"):
+        """
+        Open ``<filename>.part`` for writing.
+
+        Args:
+            filename (str): Final output filename (.parquet).
+            batch_size (int): Number of books per row group.
+            compression (Optional[str]): Parquet codec ("zstd", "snappy",
+                "gzip" or None).
+        """
+        super().__init__(filename, batch_size, compression)
+
+    def _open(self):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(self.part_filename, self.schema, compression=self.compression or "none")
+
+    def _write_batch(self, batch):
+        self._writer.write_batch(batch, row_group_size=self.batch_size)
+
+
+def read_books_table(filename: str, columns: Optional[List[str]] = None, memory_map: bool = True):
+    """
+    Read a Parquet or Arrow IPC book file as a pyarrow Table.
+
+    Only the requested columns are read from disk, and files are memory-mapped
+    instead of being copied into memory where the format allows it.
+
+    Args:
+        filename (str): Input filename (.parquet, .arrow or .feather).
+        columns (Optional[List[str]]): Columns to read; None reads all.
+        memory_map (bool): Memory-map the file.
+
+    Returns:
+        pyarrow.Table: The selected columns.
+
+    Raises:
+        ValueError: If the extension is not supported.
+    """
+    import pyarrow as pa
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".parquet":
+        import pyarrow.parquet as pq
+        return pq.read_table(filename, columns=columns, memory_map=memory_map)
+    if extension in ARROW_EXTENSIONS:
+        source = pa.memory_map(filename) if memory_map else pa.OSFile(filename)
+        table = pa.ipc.open_file(source).read_all()
+        return table.select(columns) if columns is not None else table
+    raise ValueError(f"Unsupported columnar file format: {filename}")
+
+
+def iter_books_from_parquet(filename: str, batch_size: int = 10000) -> Iterator[Book]:
+    """
+    Stream Book objects from a Parquet file, one record batch at a time.
+
+    Args:
+        filename (str): Input filename.
+        batch_size (int): Rows decoded per batch.
+
+    Yields:
+        Book: Books in file order.
+    """
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(filename, memory_map=True)
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        yield from _books_from_batch(batch)
+
+
+def iter_books_from_arrow(filename: str) -> Iterator[Book]:
+    """
+    Stream Book objects from a memory-mapped Arrow IPC (Feather v2) file.
+
+    Args:
+        filename (str): Input filename.
+
+    Yields:
+        Book: Books in file order.
+    """
+    import pyarrow as pa
+    with pa.memory_map(filename) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            yield from _books_from_batch(reader.get_batch(i))
 
 
 def save_books_to_json(books: List[Book], filename: str):
@@ -20,11 +484,11 @@ def save_books_to_json(books: List[Book], filename: str):
         filename (str): Output filename.
     """
     try:
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump([book.to_dict() for book in books], f, ensure_ascii=False, indent=4)
-        print(f"Saved {len(books)} books to {filename}")
+        with JsonArrayBookWriter(filename) as writer:
+            writer.write_many(books)
+        logger.info("Saved %d books to %s", writer.count, filename)
     except (IOError, TypeError) as e:
-        print(f"Error saving JSON: {e}")
+        logger.error("Error saving JSON: %s", e, extra={"file": filename})
 
 
 def load_books_from_json(filename: str) -> List[Book]:
@@ -38,11 +502,9 @@ def load_books_from_json(filename: str) -> List[Book]:
         List[Book]: List of Book objects.
     """
     try:
-        with open(filename, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return [Book(**item) for item in data]
+        return list(iter_books_from_json(filename))
     except (IOError, json.JSONDecodeError) as e:
-        print(f"Error loading JSON: {e}")
+        logger.error("Error loading JSON: %s", e, extra={"file": filename})
         return []
 
 
@@ -55,14 +517,11 @@ def save_books_to_csv(books: List[Book], filename: str):
         filename (str): Output filename.
     """
     try:
-        with open(filename, "w", encoding="utf-8", newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=["title", "price", "url", "availability", "category"])
-            writer.writeheader()
-            for book in books:
-                writer.writerow(book.to_dict())
-        print(f"Saved {len(books)} books to {filename}")
+        with CsvBookWriter(filename) as writer:
+            writer.write_many(books)
+        logger.info("Saved %d books to %s", writer.count, filename)
     except IOError as e:
-        print(f"Error saving CSV: {e}")
+        logger.error("Error saving CSV: %s", e, extra={"file": filename})
 
 
 def load_books_from_csv(filename: str) -> List[Book]:
@@ -77,10 +536,127 @@ def load_books_from_csv(filename: str) -> List[Book]:
     """
     books = []
     try:
-        with open(filename, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                books.append(Book(**row))
+        books.extend(iter_books_from_csv(filename))
     except IOError as e:
-        print(f"Error loading CSV: {e}")
-    return books
\ No newline at end of file
+        logger.error("Error loading CSV: %s", e, extra={"file": filename})
+    return books
+
+
+def iter_books_from_json(filename: str, chunk_size: int = 64 * 1024) -> Iterator[Book]:
+    """
+    Stream Book objects out of a JSON array file without loading it whole.
+
+    The file is read in chunks and each array element is decoded with
+    ``JSONDecoder.raw_decode`` as soon as it is complete.
+
+    Args:
+        filename (str): Input filename (a JSON array of book objects).
+        chunk_size (int): Characters read per chunk.
+
+    Yields:
+        Book: Books in file order.
+
+    Raises:
+        IOError: If the file cannot be read.
+        json.JSONDecodeError: If the file is not a JSON array of objects.
+    """
+    decoder = json.JSONDecoder()
+    with open(filename, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+        started = False
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ",")):
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    raise json.JSONDecodeError("Unterminated JSON array", buf, pos)
+                buf, pos = buf[pos:] + f.read(chunk_size), 0
+                eof = pos >= len(buf)
+                continue
+            if not started:
+                if buf[pos] != "[":
+                    raise json.JSONDecodeError("Expecting '['", buf, pos)
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            yield Book(**item)
+            pos = end
+
+
+def iter_books_from_jsonl(filename: str) -> Iterator[Book]:
+    """
+    Stream Book objects from a JSON Lines file.
+
+    Args:
+        filename (str): Input filename (one JSON object per line).
+
+    Yields:
+        Book: Books in file order; blank lines are skipped.
+
+    Raises:
+        IOError: If the file cannot be read.
+        json.JSONDecodeError: If a line is not valid JSON.
+    """
+    with open(filename, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield Book(**json.loads(line))
+
+
+def iter_books_from_csv(filename: str) -> Iterator[Book]:
+    """
+    Stream Book objects from a CSV file with a header row.
+
+    Args:
+        filename (str): Input filename.
+
+    Yields:
+        Book: Books in file order.
+
+    Raises:
+        IOError: If the file cannot be read.
+    """
+    with open(filename, "r", encoding="utf-8", newline='') as f:
+        for row in csv.DictReader(f):
+            yield Book(**row)
+
+
+def iter_books_from_file(filename: str) -> Iterator[Book]:
+    """
+    Stream Book objects from a .json, .jsonl, .csv, .parquet, .arrow or
+    .feather file.
+
+    Args:
+        filename (str): Input filename; the format is chosen by extension.
+
+    Yields:
+        Book: Books in file order.
+
+    Raises:
+        ValueError: If the extension is not supported.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".json":
+        return iter_books_from_json(filename)
+    if extension == ".jsonl":
+        return iter_books_from_jsonl(filename)
+    if extension == ".csv":
+        return iter_books_from_csv(filename)
+    if extension == ".parquet":
+        return iter_books_from_parquet(filename)
+    if extension in ARROW_EXTENSIONS:
+        return iter_books_from_arrow(filename)
+    raise ValueError(f"Unsupported book file format: {filename}")
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""
+logging_setup.py
+
+Structured, non-blocking logging for the scraper.
+
+Log calls only build a record and put it on an in-memory queue; a
+QueueListener thread formats it and does the console/file I/O, so logging
+never blocks the fetch and parse loops on stdout or the disk. Records are
+written as one JSON object per line (or classic text), including any
+``extra={...}`` fields passed by the caller, which makes them searchable.
+
+Per-item DEBUG events (one per book or page) are sampled: only the first of
+every ``sample_rate`` records with the same message template is kept, and
+it carries a ``sampled`` field with the rate.
+"""
+
+import datetime
+import json
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing import util as mp_util
+from typing import Optional
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as a single-line JSON object.
+
+    Fields: ``ts`` (ISO 8601, UTC), ``level``, ``logger``, ``msg``, every
+    ``extra`` field, and ``exc`` with the traceback if there is one.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+                                   .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one in ``rate`` records per message template at or below ``level``.
+    """
+
+    def __init__(self, rate: int = 100, level: int = logging.DEBUG):
+        """
+        Initialize a SamplingFilter.
+
+        Args:
+            rate (int): Keep the first of every ``rate`` records; 1 keeps all.
+            level (int): Only records at or below this level are sampled.
+        """
+        super().__init__()
+        self.rate = max(1, rate)
+        self.level = level
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate == 1 or record.levelno > self.level:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        if count % self.rate:
+            return False
+        record.sampled = self.rate
+        return True
+
+
+class StructuredQueueHandler(QueueHandler):
+    """
+    QueueHandler that keeps records structured.
+
+    The stock handler formats the whole record on the calling thread; this
+    one only merges the message arguments and renders the traceback (both
+    may refer to objects that change later) and leaves the formatting to the
+    listener's handlers.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+
+class _Listener(QueueListener):
+    """
+    QueueListener that records whether its thread is running, so a forked
+    child can tell whether to restart it.
+    """
+
+    running = False
+
+    def start(self):
+        super().start()
+        self.running = True
+
+    def stop(self):
+        if self.running:
+            self.running = False
+            super().stop()
+
+
+def setup_logging(level: str = "INFO", log_file: Optional[str] = "scraper.log", json_format: bool = True,
+                  sample_rate: int = 100) -> QueueListener:
+    """
+    Route all logging through a queue to the console and a log file.
+
+    Replaces any handlers already on the root logger.
+
+    Args:
+        level (str): Root log level, e.g. "INFO" or "DEBUG".
+        log_file (Optional[str]): File receiving the log (truncated); None
+            logs to the console only.
+        json_format (bool): One JSON object per line; False uses TEXT_FORMAT.
+        sample_rate (int): Keep one in this many DEBUG records per message.
+
+    Returns:
+        QueueListener: The started listener; call stop() before exiting so
+        queued records are written.
+    """
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, mode="w", encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(records)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    listener = _Listener(records, *handlers, respect_handler_level=True)
+    listener.start()
+
+    mp_util.register_after_fork(listener, _restart_in_child)
+    return listener
+
+
+def _restart_in_child(listener: _Listener):
+    # A forked worker process (e.g. a sharded crawl shard) inherits the queue
+    # but not the listener thread: stop the inherited listener (its thread is
+    # already gone, so this returns at once), drop the parent's pending
+    # records and the stop sentinel, start a listener of its own and flush
+    # it when the worker exits.
+    running = listener.running
+    listener.stop()
+    try:
+        while True:
+            listener.queue.get_nowait()
+    except queue.Empty:
+        pass
+    if running:
+        listener.start()
+        mp_util.Finalize(listener, listener.stop, exitpriority=10)
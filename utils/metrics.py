@@ -0,0 +1,380 @@
+"""
+metrics.py
+
+Run metrics: counters, gauges and HDR-style latency histograms.
+
+Histograms use log-linear buckets as in HdrHistogram: values are bucketed by
+their top ``significant_bits`` bits, so every recorded value is kept to
+within 1 / 2 ** (significant_bits - 1) of its true value (under 1% with
+the default 8 bits) whatever its magnitude, in a few hundred buckets.
+Recording is a dict increment under a lock, cheap enough for per-request
+and per-page use from several threads.
+
+Metrics are written at the end of a run as JSON, and optionally in the
+Prometheus text exposition format (histograms as summaries), e.g. for the
+node_exporter textfile collector.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, Optional, Tuple
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+PROMETHEUS_PREFIX = "scraper_"
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Histogram:
+    """
+    Log-linear histogram with bounded relative error.
+    """
+
+    def __init__(self, scale: float = 1e6, significant_bits: int = 8):
+        """
+        Initialize a Histogram.
+
+        Args:
+            scale (float): Values are multiplied by this and rounded to an
+                integer before bucketing; 1e6 gives microsecond resolution
+                for values in seconds.
+            significant_bits (int): Bits of each value that are kept.
+        """
+        self.scale = scale
+        self.bits = significant_bits
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._buckets: Dict[int, int] = {}
+
+    def _index(self, value: int) -> int:
+        shift = max(0, value.bit_length() - self.bits)
+        return (shift << self.bits) + (value >> shift)
+
+    def _upper(self, index: int) -> float:
+        # Highest value that falls into the bucket, in recorded units.
+        shift, mantissa = index >> self.bits, index & ((1 << self.bits) - 1)
+        return (((mantissa + 1) << shift) - 1) / self.scale
+
+    def record(self, value: float):
+        """
+        Record one value; negative values are clamped to 0.
+
+        Args:
+            value (float): The value.
+        """
+        value = max(0.0, value)
+        index = self._index(int(round(value * self.scale)))
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Args:
+            q (float): Quantile between 0 and 1.
+
+        Returns:
+            Optional[float]: Value at or below which a fraction ``q`` of the
+            recorded values lie (None if nothing was recorded).
+        """
+        if not self.count:
+            return None
+        rank = max(1, int(round(q * self.count)))
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                return min(self._upper(index), self.max)
+        return self.max
+
+    def merge(self, other: "Histogram"):
+        """
+        Add the values of another histogram with the same scale and precision.
+
+        Args:
+            other (Histogram): Histogram to merge in; left unchanged.
+        """
+        if (other.scale, other.bits) != (self.scale, self.bits):
+            raise ValueError("cannot merge histograms with different scale or precision")
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        self.count += other.count
+        self.sum += other.sum
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            dict: count, sum, min, max, mean and the QUANTILES (as "p50" etc.).
+        """
+        result = {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.sum / self.count if self.count else None,
+        }
+        for q in QUANTILES:
+            result[_quantile_name(q)] = self.percentile(q)
+        return result
+
+
+class Metrics:
+    """
+    Thread-safe registry of labelled counters, gauges and histograms.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[Key, float] = {}
+        self._gauges: Dict[Key, float] = {}
+        self._histograms: Dict[Key, Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """
+        Increase a counter.
+
+        Args:
+            name (str): Metric name, e.g. "http_requests_total".
+            value (float): Amount to add.
+            **labels: Label values, e.g. status=200.
+        """
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """
+        Set a gauge.
+
+        Args:
+            name (str): Metric name.
+            value (float): Current value.
+            **labels: Label values.
+        """
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """
+        Record a value in a histogram.
+
+        Args:
+            name (str): Metric name, e.g. "http_request_seconds".
+            value (float): Observed value.
+            **labels: Label values.
+        """
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.record(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """
+        Context manager recording the duration of its block, in seconds.
+
+        Args:
+            name (str): Histogram name.
+            **labels: Label values.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, func, name: str, **labels):
+        """
+        Wrap a function so each call is recorded with timer().
+
+        Args:
+            func: Function to wrap.
+            name (str): Histogram name.
+            **labels: Label values.
+
+        Returns:
+            The wrapped function.
+        """
+        def wrapper(*args, **kwargs):
+            with self.timer(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        """
+        Args:
+            name (str): Histogram name.
+            **labels: Label values.
+
+        Returns:
+            Optional[Histogram]: The histogram, or None if nothing was recorded.
+        """
+        return self._histograms.get(_key(name, labels))
+
+    def counter(self, name: str, **labels) -> float:
+        """
+        Args:
+            name (str): Counter name.
+            **labels: Label values.
+
+        Returns:
+            float: Current value (0 if never increased).
+        """
+        return self._counters.get(_key(name, labels), 0)
+
+    def merge(self, other: "Metrics"):
+        """
+        Add the metrics of another registry, e.g. one returned by a worker
+        process: counters are summed, histograms merged and gauges taken
+        from ``other``.
+
+        Args:
+            other (Metrics): Registry to merge in; left unchanged.
+        """
+        with self._lock:
+            for key, value in other._counters.items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            self._gauges.update(other._gauges)
+            for key, histogram in other._histograms.items():
+                mine = self._histograms.get(key)
+                if mine is None:
+                    mine = self._histograms[key] = Histogram(histogram.scale, histogram.bits)
+                mine.merge(histogram)
+
+    def __getstate__(self) -> dict:
+        # Picklable (for returning from worker processes) without the lock.
+        state = dict(vars(self))
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict):
+        vars(self).update(state)
+        self._lock = threading.Lock()
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict: JSON-serializable snapshot; every metric is a list of
+            {"labels": ..., "value"/"summary": ...} entries.
+        """
+        with self._lock:
+            return {
+                "started": self.started,
+                "elapsed_seconds": time.time() - self.started,
+                "counters": _group(self._counters, "value"),
+                "gauges": _group(self._gauges, "value"),
+                "histograms": _group({key: h.summary() for key, h in self._histograms.items()}, "summary"),
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Returns:
+            str: Metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for kind, metrics in (("counter", self._counters), ("gauge", self._gauges)):
+                for name in sorted({name for name, _ in metrics}):
+                    lines.append(f"# TYPE {PROMETHEUS_PREFIX}{name} {kind}")
+                    for (key_name, labels), value in sorted(metrics.items()):
+                        if key_name == name:
+                            lines.append(f"{PROMETHEUS_PREFIX}{name}{_labels(labels)} {value:g}")
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {PROMETHEUS_PREFIX}{name} summary")
+                for (key_name, labels), histogram in sorted(self._histograms.items(), key=lambda i: i[0]):
+                    if key_name != name:
+                        continue
+                    for q in QUANTILES:
+                        quantile = labels + (("quantile", f"{q:g}"),)
+                        lines.append(f"{PROMETHEUS_PREFIX}{name}{_labels(quantile)} {histogram.percentile(q):g}")
+                    lines.append(f"{PROMETHEUS_PREFIX}{name}_sum{_labels(labels)} {histogram.sum:g}")
+                    lines.append(f"{PROMETHEUS_PREFIX}{name}_count{_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, filename: str):
+        """
+        Write to_dict() to a JSON file.
+
+        Args:
+            filename (str): Output filename.
+        """
+        _write_atomic(filename, json.dumps(self.to_dict(), indent=2))
+
+    def write_prometheus(self, filename: str):
+        """
+        Write to_prometheus() to a file; it is replaced atomically, as the
+        textfile collector requires.
+
+        Args:
+            filename (str): Output filename (conventionally ``*.prom``).
+        """
+        _write_atomic(filename, self.to_prometheus())
+
+
+class NullMetrics(Metrics):
+    """
+    Metrics that records nothing; the default for uninstrumented runs.
+    """
+
+    def inc(self, name: str, value: float = 1, **labels):
+        pass
+
+    def set(self, name: str, value: float, **labels):
+        pass
+
+    def observe(self, name: str, value: float, **labels):
+        pass
+
+    def timer(self, name: str, **labels):
+        return nullcontext()
+
+    def timed(self, func, name: str, **labels):
+        return func
+
+
+NO_METRICS = NullMetrics()
+
+
+def _key(name: str, labels: dict) -> Key:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def _group(metrics: Dict[Key, object], field: str) -> Dict[str, list]:
+    grouped: Dict[str, list] = {}
+    for (name, labels), value in sorted(metrics.items(), key=lambda i: i[0]):
+        grouped.setdefault(name, []).append({"labels": dict(labels), field: value})
+    return grouped
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{label}="{value}"' for (label, _), value in zip(labels, escaped)) + "}"
+
+
+def _quantile_name(q: float) -> str:
+    return "p" + f"{q * 100:g}".replace(".", "")
+
+
+def _write_atomic(filename: str, text: str):
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    part = filename + ".part"
+    with open(part, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(part, filename)